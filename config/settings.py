@@ -12,12 +12,8 @@ import sys # Necessário para sys.exit
 from dotenv import load_dotenv
 import logging
 from pathlib import Path 
-from newspaper import Config as NewspaperConfig
-import nltk
 import pytz
 from config import settings
-from google.genai.types import GenerationConfig, SafetySetting, ThinkingConfig, GenerateContentConfig
-from google.adk.planners.built_in_planner import BuiltInPlanner
 
 
 
@@ -63,9 +59,15 @@ ACTIVE_DATABASE_URL = DATABASE_URL_POSTGRES
 # (Opcional) Configurações adicionais para o engine do SQLAlchemy
 SQLALCHEMY_ENGINE_OPTIONS = {
     "echo": os.getenv("SQLALCHEMY_ECHO", "False").lower() == "true",  # Loga todas as queries SQL geradas (bom para dev)
-    # "pool_size": int(os.getenv("SQLALCHEMY_POOL_SIZE", 5)), # Exemplo de configuração de pool
-    # "max_overflow": int(os.getenv("SQLALCHEMY_MAX_OVERFLOW", 10)), # Exemplo de configuração de pool
+    "pool_size": int(os.getenv("SQLALCHEMY_POOL_SIZE", 5)), # Conexões mantidas abertas no pool
+    "max_overflow": int(os.getenv("SQLALCHEMY_MAX_OVERFLOW", 10)), # Conexões extras abertas sob pico (fechadas ao devolver)
+    "pool_pre_ping": os.getenv("SQLALCHEMY_POOL_PRE_PING", "True").lower() == "true", # Descarta conexões mortas antes do uso
+    "pool_recycle": int(os.getenv("SQLALCHEMY_POOL_RECYCLE", 1800)), # Segundos até reabrir uma conexão (evita timeouts do servidor/proxy)
+    "pool_timeout": int(os.getenv("SQLALCHEMY_POOL_TIMEOUT", 30)), # Segundos esperando uma conexão livre antes de erro
 }
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0")) # statement_timeout de todas as conexões de db_utils (0 = sem limite; coletores e backfills fazem COPY/upserts longos)
+ANALYSIS_STATEMENT_TIMEOUT_MS = int(os.getenv("ANALYSIS_STATEMENT_TIMEOUT_MS", "60000")) # SET LOCAL statement_timeout nas transações do pipeline de análise (0 = sem limite)
+DB_EXECUTOR_MAX_WORKERS = int(os.getenv("DB_EXECUTOR_MAX_WORKERS", SQLALCHEMY_ENGINE_OPTIONS["pool_size"])) # Threads do executor de banco do pipeline assíncrono (<= pool_size)
 
 # --- Definições de Caminhos do Projeto ---
 # Define o diretório base do projeto (a pasta 'argus-analytics-adk-hackathon').
@@ -128,6 +130,22 @@ API_DELAYS = {
     "NEWSAPI": float(os.getenv("NEWSAPI_API_DELAY_SECONDS", "1.0")),
     "RSS": float(os.getenv("RSS_API_DELAY_SECONDS", "0.5")) # Atraso menor para RSS mockado
 }
+YFINANCE_DOWNLOAD_BATCH_SIZE = int(os.getenv("YFINANCE_DOWNLOAD_BATCH_SIZE", "200")) # Tickers por chamada ao yf.download (histórico em lote)
+INDICATOR_UPSERT_CHUNK_SIZE = int(os.getenv("INDICATOR_UPSERT_CHUNK_SIZE", "50000")) # Linhas por COPY + UPSERT em EconomicIndicatorValues
+
+# --- Coleta Agendada (src/pipelines/run_collection_pipeline.py) ---
+COLLECTION_MAX_WORKERS = int(os.getenv("COLLECTION_MAX_WORKERS", "6")) # Coletores executando ao mesmo tempo (threads)
+COLLECTION_TASK_TIMEOUT_SECONDS = int(os.getenv("COLLECTION_TASK_TIMEOUT_SECONDS", "1800")) # Timeout padrão por tentativa de uma tarefa
+COLLECTION_TASK_RETRIES = int(os.getenv("COLLECTION_TASK_RETRIES", "2")) # Retentativas após falha (não após timeout)
+COLLECTION_RETRY_BACKOFF_SECONDS = float(os.getenv("COLLECTION_RETRY_BACKOFF_SECONDS", "30")) # Espera antes da 1ª retentativa; dobra a cada nova
+# Máximo de tarefas simultâneas por grupo de fontes que dividem o mesmo provedor ou recurso
+COLLECTION_GROUP_LIMITS = {
+    "macro_br": int(os.getenv("COLLECTION_LIMIT_MACRO_BR", "3")), # BCB, IBGE, FGV
+    "macro_us": int(os.getenv("COLLECTION_LIMIT_MACRO_US", "2")), # FRED, EIA
+    "mercado": int(os.getenv("COLLECTION_LIMIT_MERCADO", "1")), # YFinance, Fundamentus (evita bloqueio por taxa)
+    "noticias": int(os.getenv("COLLECTION_LIMIT_NOTICIAS", "2")), # RSS, NewsAPI
+    "regulatorios": int(os.getenv("COLLECTION_LIMIT_REGULATORIOS", "1")), # CVM
+}
 
 # --- Feature Flags (para desenvolvimento modular e fases do MVP) ---
 # Permite ligar/desligar funcionalidades facilmente via variáveis de ambiente.
@@ -161,55 +179,79 @@ logger.info(f"Diretório base do projeto: {BASE_DIR}")
 logger.info(f"Logging configurado para nível: {LOGGING_LEVEL_STR}, arquivo: {LOG_FILE}")
 #modelos llm
 
-SAFETY_SETTINGS = [
-    SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="BLOCK_ONLY_HIGH"),
-    SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="BLOCK_ONLY_HIGH"),
-    SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="BLOCK_ONLY_HIGH"),
-    SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="BLOCK_ONLY_HIGH"),
-]
+def _build_safety_settings():
+    from google.genai.types import SafetySetting
+    return [
+        SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="BLOCK_ONLY_HIGH"),
+        SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="BLOCK_ONLY_HIGH"),
+        SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="BLOCK_ONLY_HIGH"),
+        SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="BLOCK_ONLY_HIGH"),
+    ]
 
-AGENT_PROFILES = {
-    # Perfil para agentes que orquestram e usam ferramentas. A temperatura baixa garante previsibilidade.
-    "orquestrador": {
-        "model_name": "gemini-2.5-flash",
-        "generate_content_config": GenerateContentConfig(
-            temperature=0.1,
-            safety_settings=SAFETY_SETTINGS
-        )
-    },
-    
-    # Perfil para agentes de análise que precisam de máxima qualidade e nuance.
-    "analista_profundo": {
-        "model_name": "gemini-2.5-flash",
-        "generate_content_config": GenerateContentConfig(
-            temperature=0.5,
-            safety_settings=SAFETY_SETTINGS
-        ),
-        "planner": BuiltInPlanner(
-            thinking_config=ThinkingConfig(thinking_budget=0)
-        )
-    },
-    
-    # Perfil para agentes de análise factual e rápida (Resumo, Entidades).
-    "analista_rapido": {
-        "model_name": "gemini-2.5-flash",
-        "generate_content_config": GenerateContentConfig(
-            temperature=0.2,
-            safety_settings=SAFETY_SETTINGS
-        ),
-        "planner": BuiltInPlanner(
-            thinking_config=ThinkingConfig(thinking_budget=0)
-        )
-        
-    },
 
-    # Perfil específico para o Avaliador CRAAP com Grounding.
-    "avaliador_craap": {
-        "model_name": "gemini-2.5-flash",
-        "generate_content_config": GenerateContentConfig(temperature=0.2)
+def _build_agent_profiles():
+    # O ADK (que importa o SDK do Vertex AI) só é carregado por quem usa os perfis, ou seja, pelos agentes
+    from google.genai.types import ThinkingConfig, GenerateContentConfig
+    from google.adk.planners.built_in_planner import BuiltInPlanner
+    safety_settings = sys.modules[__name__].SAFETY_SETTINGS # Passa pelo __getattr__ do módulo
+    return {
+        # Perfil para agentes que orquestram e usam ferramentas. A temperatura baixa garante previsibilidade.
+        "orquestrador": {
+            "model_name": "gemini-2.5-flash",
+            "generate_content_config": GenerateContentConfig(
+                temperature=0.1,
+                safety_settings=safety_settings
+            )
+        },
+
+        # Perfil para agentes de análise que precisam de máxima qualidade e nuance.
+        "analista_profundo": {
+            "model_name": "gemini-2.5-flash",
+            "generate_content_config": GenerateContentConfig(
+                temperature=0.5,
+                safety_settings=safety_settings
+            ),
+            "planner": BuiltInPlanner(
+                thinking_config=ThinkingConfig(thinking_budget=0)
+            )
+        },
+
+        # Perfil para agentes de análise factual e rápida (Resumo, Entidades).
+        "analista_rapido": {
+            "model_name": "gemini-2.5-flash",
+            "generate_content_config": GenerateContentConfig(
+                temperature=0.2,
+                safety_settings=safety_settings
+            ),
+            "planner": BuiltInPlanner(
+                thinking_config=ThinkingConfig(thinking_budget=0)
+            )
+
+        },
+
+        # Perfil específico para o Avaliador CRAAP com Grounding.
+        "avaliador_craap": {
+            "model_name": "gemini-2.5-flash",
+            "generate_content_config": GenerateContentConfig(temperature=0.2)
+        }
     }
+
+
+# Configurações construídas só no primeiro acesso (settings.SAFETY_SETTINGS, settings.AGENT_PROFILES),
+# para que importar settings (db_utils, coletores, dashboard) não carregue o ADK nem o Vertex AI.
+_LAZY_SETTINGS = {
+    "SAFETY_SETTINGS": _build_safety_settings,
+    "AGENT_PROFILES": _build_agent_profiles,
 }
 
+
+def __getattr__(name):
+    builder = _LAZY_SETTINGS.get(name)
+    if builder is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = globals()[name] = builder()
+    return value
+
 USER_AGENTS = [
      # Windows - Chrome (Latest)
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
@@ -238,6 +280,7 @@ USER_AGENTS = [
 
 # Substitua a função get_newspaper3k_config pela versão abaixo
 def get_newspaper3k_config():
+    from newspaper import Config as NewspaperConfig # Importado aqui: só os extratores de artigos precisam dele
     config = NewspaperConfig()
     # A CADA CHAMADA, UM NOVO USER-AGENT É ESCOLHIDO ALEATORIAMENTE
     config.browser_user_agent = random.choice(USER_AGENTS)
@@ -250,8 +293,83 @@ def get_newspaper3k_config():
 PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT", "argus-analytics")
 LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1") 
 TEXT_EMBBEDING = os.getenv("GOOGLE_TEXT_EMBBEDING ", "text-embedding-005") 
+MODEL_INIT_RETRY_SECONDS = int(os.getenv("MODEL_INIT_RETRY_SECONDS", "300")) # Espera antes de tentar carregar de novo um modelo que falhou (ver src/utils/model_registry.py)
 MAX_LLM_ANALYSIS_RETRIES = 3 # Número máximo de vezes que um artigo será reenviado para reanálise LLM por falhas de integridade
 BASE_RETRY_DELAY_SECONDS = 60 # Atraso base (em segundos) para a próxima retentativa de análise LLM (exponencial)
+ANALYSIS_LEASE_SECONDS = int(os.getenv("ANALYSIS_LEASE_SECONDS", "900")) # Duração da reserva de um artigo por um worker de análise
+ANALYSIS_MAX_TOKENS_BEFORE_COMPRESSION = 1500 # Acima disso (len(texto) // 4) o pipeline comprime o texto antes da análise
+
+# --- CACHE DE ANÁLISES (LRU EM MEMÓRIA + DISKCACHE) ---
+ANALYSIS_CACHE_DIR = BASE_DIR / ".analysis_cache"
+ANALYSIS_CACHE_MEMORY_ITEMS = int(os.getenv("ANALYSIS_CACHE_MEMORY_ITEMS", "1000"))
+ANALYSIS_CACHE_SIZE_LIMIT_BYTES = int(os.getenv("ANALYSIS_CACHE_SIZE_LIMIT_MB", "512")) * 1024 * 1024
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_DAYS", "30")) * 24 * 3600
+STAGE_MEMO_DIR = ANALYSIS_CACHE_DIR / "estagios" # Resultados por sub-agente, reaproveitados em retentativas
+STAGE_MEMO_SIZE_LIMIT_BYTES = int(os.getenv("STAGE_MEMO_SIZE_LIMIT_MB", "256")) * 1024 * 1024
+STAGE_MEMO_TTL_SECONDS = int(os.getenv("STAGE_MEMO_TTL_DAYS", "7")) * 24 * 3600
+
+# --- GRAVAÇÃO EM LOTE (WRITE-BEHIND) DAS ANÁLISES ---
+ANALYSIS_WRITE_BATCH_SIZE = int(os.getenv("ANALYSIS_WRITE_BATCH_SIZE", "50")) # Análises por UPDATE em lote
+ANALYSIS_WRITE_FLUSH_MS = int(os.getenv("ANALYSIS_WRITE_FLUSH_MS", "500")) # Espera máxima de uma análise no buffer
+# Fora de ANALYSIS_CACHE_DIR: o cache é descartável, mas o journal é a única cópia das análises ainda não gravadas no banco
+ANALYSIS_WRITE_JOURNAL_DIR = Path(os.getenv("ANALYSIS_WRITE_JOURNAL_DIR", str(BASE_DIR / ".analysis_journal"))) # Um journal por worker (write_journal_<worker>.jsonl)
+ANALYSIS_WRITE_JOURNAL = Path(os.environ["ANALYSIS_WRITE_JOURNAL"]) if os.getenv("ANALYSIS_WRITE_JOURNAL") else None # Caminho fixo opcional; nunca compartilhe entre processos
+
+# --- BACKFILLS EM LOTE (scripts/maintence) ---
+BACKFILL_CHECKPOINT_DIR = BASE_DIR / ".backfill_checkpoints" # Último ID gravado por backfill, para retomar após interrupção
+BACKFILL_CHUNK_SIZE = int(os.getenv("BACKFILL_CHUNK_SIZE", "5000")) # Linhas por pedaço (uma leitura + um UPDATE em lote)
+
+# --- ÍNDICE VETORIAL LOCAL (DEDUPLICAÇÃO RAG) ---
+VECTOR_INDEX_ENABLED = os.getenv("VECTOR_INDEX_ENABLED", "true").lower() == "true"
+VECTOR_INDEX_DIR = BASE_DIR / ".analysis_cache" / "vector_index"
+VECTOR_INDEX_INITIAL_CAPACITY = 10000 # Capacidade inicial do HNSW (cresce sob demanda)
+VECTOR_INDEX_M = 16 # Conexões por nó do grafo HNSW
+VECTOR_INDEX_EF_CONSTRUCTION = 200
+VECTOR_INDEX_EF_SEARCH = 64 # Maior = busca mais precisa e mais lenta
+VECTOR_INDEX_SYNC_EVERY = int(os.getenv("VECTOR_INDEX_SYNC_EVERY", "50")) # Artigos processados entre sincronizações incrementais com o banco (embeddings de outros workers)
+
+# --- ÍNDICE PGVECTOR EM NewsArticles.embedding ---
+PGVECTOR_INDEX_TYPE = os.getenv("PGVECTOR_INDEX_TYPE", "hnsw").lower() # "hnsw" ou "ivfflat"
+PGVECTOR_HNSW_M = int(os.getenv("PGVECTOR_HNSW_M", "16"))
+PGVECTOR_HNSW_EF_CONSTRUCTION = int(os.getenv("PGVECTOR_HNSW_EF_CONSTRUCTION", "64"))
+PGVECTOR_HNSW_EF_SEARCH = int(os.getenv("PGVECTOR_HNSW_EF_SEARCH", "40")) # Aplicado por consulta (SET LOCAL hnsw.ef_search)
+PGVECTOR_IVFFLAT_LISTS = int(os.getenv("PGVECTOR_IVFFLAT_LISTS", "100")) # Recomendação pgvector: linhas/1000 até 1M linhas
+PGVECTOR_IVFFLAT_PROBES = int(os.getenv("PGVECTOR_IVFFLAT_PROBES", "10")) # Aplicado por consulta (SET LOCAL ivfflat.probes)
+
+# Métricas quantitativas (Etapa 1): "thread" calcula no próprio processo (em thread), "process" usa um
+# pool de processos e "agent" mantém a chamada via SubAgenteQuantitativo_ADK (Runner do ADK)
+QUANT_METRICS_MODE = os.getenv("QUANT_METRICS_MODE", "thread").lower()
+QUANT_METRICS_PROCESS_WORKERS = int(os.getenv("QUANT_METRICS_PROCESS_WORKERS", "2"))
+
+AGENT_SESSION_RETENTION = int(os.getenv("AGENT_SESSION_RETENTION", "0")) # Sessões recentes mantidas em memória por agente (0 = apaga ao fim de cada chamada)
+
+# --- LIMITES DE TAXA (TOKEN BUCKET) POR ORÇAMENTO ---
+# Chaves: "embedding", "compressao" e o nome de cada modelo LLM usado pelos sub-agentes.
+# requests/tokens_per_minute: cota sustentada | burst_*: rajada permitida | output_tokens_estimate: tokens de saída previstos por chamada
+RATE_LIMITS = {
+    "embedding": {
+        "requests_per_minute": int(os.getenv("RATE_LIMIT_EMBEDDING_RPM", "300")),
+        "tokens_per_minute": int(os.getenv("RATE_LIMIT_EMBEDDING_TPM", "200000")),
+        "burst_requests": 10,
+    },
+    "compressao": {
+        "requests_per_minute": int(os.getenv("RATE_LIMIT_COMPRESSAO_RPM", "30")),
+        "tokens_per_minute": int(os.getenv("RATE_LIMIT_COMPRESSAO_TPM", "250000")),
+        "burst_requests": 5,
+        "output_tokens_estimate": 500,
+    },
+    "gemini-2.5-flash": {
+        "requests_per_minute": int(os.getenv("RATE_LIMIT_GEMINI_FLASH_RPM", "60")),
+        "tokens_per_minute": int(os.getenv("RATE_LIMIT_GEMINI_FLASH_TPM", "1000000")),
+        "burst_requests": 10,
+        "output_tokens_estimate": 1500,
+    },
+}
+DEFAULT_LLM_RATE_LIMIT = {"requests_per_minute": 30, "tokens_per_minute": 250000, "burst_requests": 5, "output_tokens_estimate": 1500}
+RATE_LIMIT_MAX_RETRIES = 3 # Retentativas de uma chamada que recebeu 429
+RATE_LIMIT_BACKOFF_SECONDS = 10 # Pausa inicial após um 429 (dobra a cada 429 consecutivo)
+RATE_LIMIT_MAX_BACKOFF_SECONDS = 120
+RATE_LIMIT_MIN_RATE_FACTOR = 0.1 # Fração mínima da taxa configurada após reduções por 429
 
 TIMEZONE = pytz.timezone('America/Sao_Paulo')
 
@@ -263,25 +381,9 @@ BASE_RETRY_DELAY_SECONDS = 60
 
 
 
-def setup_nltk_resources():
-    """
-    Verifica e baixa os recursos necessários do NLTK de forma idempotente.
-    """
-    # Usando seu dicionário que estava mais completo e correto!
-    resources = {
-        "punkt": "tokenizers/punkt",
-        "stopwords": "corpus/stopwords",
-        "rslp": "stemmers/rslp"
-    }
-    for resource_name, resource_path in resources.items():
-        try:
-            # A verificação correta, usando o caminho completo
-            nltk.data.find(resource_path)
-            settings.logger.info(f"Recurso NLTK '{resource_name}' já existe.")
-        except LookupError:
-            settings.logger.info(f"Recurso NLTK '{resource_name}' não encontrado. Baixando agora...")
-            nltk.download(resource_name, quiet=True)
-            settings.logger.info(f"Recurso '{resource_name}' baixado com sucesso.")
-
-# Executa a inicialização UMA VEZ, no local correto, quando o módulo é carregado.
-setup_nltk_resources()
\ No newline at end of file
+# --- Recursos de NLP (NLTK) ---
+# Os recursos são verificados sob demanda em src/utils/nlp_resources.py, sem acessar a rede no import.
+# Provisione com `python -m src.utils.nlp_resources` (ou habilite NLTK_ALLOW_DOWNLOAD em desenvolvimento).
+NLTK_DATA_DIR = Path(os.getenv("NLTK_DATA_DIR")) if os.getenv("NLTK_DATA_DIR") else None # Diretório extra consultado antes dos padrões do NLTK
+NLTK_ALLOW_DOWNLOAD = os.getenv("NLTK_ALLOW_DOWNLOAD", "False").lower() == "true"
+NLP_CACHE_DIR = ANALYSIS_CACHE_DIR / "nlp" # Keywords já processadas (stemming), invalidadas pelo mtime do JSON
@@ -0,0 +1,201 @@
+# scripts/maintenance/benchmark_startup.py
+#
+# Mede o tempo de inicialização dos pontos de entrada (pipeline de análise, dashboard,
+# orquestrador de coleta, ...): cada um roda num interpretador novo, que registra o tempo
+# de import e o tempo até o primeiro trabalho local (sem rede nem banco). Uma segunda
+# execução com `-X importtime` dá a quebra por pacote de topo. Os resultados são
+# acrescentados a reports/startup_benchmark.jsonl e cada ponto de entrada é comparado com
+# o melhor resultado recente: regressões acima da tolerância fazem o script sair com erro.
+#
+# Uso: python scripts/maintence/benchmark_startup.py [--entry nome] [--runs N] [--no-record]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+# Adiciona o root do projeto ao path para permitir imports
+try:
+    CURRENT_SCRIPT_DIR = Path(__file__).resolve().parent
+    PROJECT_ROOT = CURRENT_SCRIPT_DIR.parent.parent
+except NameError:
+    PROJECT_ROOT = Path.cwd()
+
+RESULTS_FILE = PROJECT_ROOT / "reports" / "startup_benchmark.jsonl"
+DEFAULT_RUNS = 3 # Execuções por ponto de entrada; vale a mediana
+HISTORY_WINDOW = 10 # Resultados anteriores considerados na comparação
+TOLERANCE = 0.25 # Regressão aceita sobre o melhor resultado recente (25%)
+ABSOLUTE_SLACK_SECONDS = 0.3 # Folga fixa, para ruído em pontos de entrada rápidos
+TOP_PACKAGES = 12 # Pacotes listados na quebra do -X importtime
+
+# Ponto de entrada -> módulos importados e primeiro trabalho local (código executado após os imports)
+ENTRY_POINTS = {
+    "pipeline_analise": {
+        "imports": ["src.pipelines.run_llm_analysis_pipeline"],
+        "first_work": "mod.count_tokens('aquecimento'); settings.AGENT_PROFILES",
+    },
+    "dashboard": {
+        # Mesmos imports de dashboard.py (o script em si só roda dentro do streamlit)
+        "imports": ["streamlit", "plotly.graph_objects", "src.data_analysis.data_handler"],
+        "first_work": None,
+    },
+    "orquestrador_coleta": {
+        "imports": ["src.agents.coletores.agente_orquestrador_coleta_adk.agent"],
+        "first_work": None,
+    },
+    "metricas_texto": {
+        "imports": ["src.agents.analistas.sub_agentes_analise.sub_agente_quantitativo_adk.tools.tool_calculate_text_metrics"],
+        "first_work": "mod.analyze_text_metrics('O lucro da empresa cresceu no trimestre.')",
+    },
+    "db_utils": {
+        "imports": ["src.database.db_utils"],
+        "first_work": None,
+    },
+}
+
+PROBE = """
+import importlib, json, sys, time
+started_at = time.perf_counter()
+mod = None
+for name in {imports!r}:
+    mod = importlib.import_module(name)
+imported_at = time.perf_counter()
+from config import settings
+{first_work}
+finished_at = time.perf_counter()
+print("@@BENCH@@" + json.dumps({{"import_s": imported_at - started_at, "first_work_s": finished_at - imported_at}}))
+"""
+
+
+def _run_probe(entry: dict, importtime: bool = False) -> subprocess.CompletedProcess:
+    code = PROBE.format(imports=entry["imports"], first_work=entry["first_work"] or "pass")
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT) + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    return subprocess.run(command, cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, timeout=600)
+
+
+def _parse_probe(completed: subprocess.CompletedProcess) -> dict:
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith("@@BENCH@@"):
+            return json.loads(line[len("@@BENCH@@"):])
+    # Os módulos do projeto logam o erro (no stdout) e chamam sys.exit(1): procura a linha do erro
+    lines = [line for line in (completed.stdout + completed.stderr).splitlines() if line.strip()]
+    errors = [line for line in lines if "Error" in line or "CRITICAL" in line]
+    detail = (errors or lines or ["sem saída"])[-1]
+    raise RuntimeError(f"código de saída {completed.returncode}: {detail.strip()[:300]}")
+
+
+def importtime_breakdown(stderr: str) -> list[tuple[str, float]]:
+    """Soma o tempo próprio (self) de cada módulo por pacote de topo, em segundos, do maior para o menor."""
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, _cumulative_us, name = line[len("import time:"):].split("|")
+            totals[name.strip().split(".")[0]] += int(self_us)
+        except ValueError:
+            continue
+    return [(package, round(us / 1e6, 3)) for package, us in sorted(totals.items(), key=lambda item: -item[1])[:TOP_PACKAGES]]
+
+
+def benchmark_entry(name: str, runs: int) -> dict:
+    entry = ENTRY_POINTS[name]
+    samples = []
+    for _ in range(runs):
+        started_at = time.perf_counter()
+        completed = _run_probe(entry)
+        wall_s = time.perf_counter() - started_at
+        sample = _parse_probe(completed)
+        sample["wall_s"] = wall_s # Inclui a partida do interpretador
+        samples.append(sample)
+
+    breakdown = importtime_breakdown(_run_probe(entry, importtime=True).stderr)
+    return {
+        "entry": name,
+        "import_s": round(statistics.median(s["import_s"] for s in samples), 3),
+        "first_work_s": round(statistics.median(s["first_work_s"] for s in samples), 3),
+        "time_to_first_work_s": round(statistics.median(s["import_s"] + s["first_work_s"] for s in samples), 3),
+        "wall_s": round(statistics.median(s["wall_s"] for s in samples), 3),
+        "top_packages": breakdown,
+    }
+
+
+def load_history(name: str) -> list[dict]:
+    if not RESULTS_FILE.exists():
+        return []
+    history = []
+    with open(RESULTS_FILE, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("entry") == name and record.get("status") == "ok":
+                history.append(record)
+    return history[-HISTORY_WINDOW:]
+
+
+def check_regression(result: dict, history: list[dict]) -> str | None:
+    """Mensagem de regressão se o tempo até o primeiro trabalho passou do limite, senão None."""
+    if not history:
+        return None
+    best = min(record["time_to_first_work_s"] for record in history)
+    limit = best * (1 + TOLERANCE) + ABSOLUTE_SLACK_SECONDS
+    if result["time_to_first_work_s"] > limit:
+        return f"{result['time_to_first_work_s']:.2f}s > limite {limit:.2f}s (melhor recente {best:.2f}s)"
+    return None
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, timeout=30).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização dos pontos de entrada.")
+    parser.add_argument("--entry", action="append", choices=sorted(ENTRY_POINTS), help="Ponto de entrada (pode repetir; padrão: todos)")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--no-record", action="store_true", help="Não grava os resultados em reports/startup_benchmark.jsonl")
+    args = parser.parse_args()
+
+    revision = _git_revision()
+    failures = 0
+    records = []
+    for name in args.entry or list(ENTRY_POINTS):
+        record = {"timestamp": datetime.now().isoformat(), "revision": revision, "python": sys.version.split()[0]}
+        try:
+            result = benchmark_entry(name, args.runs)
+        except Exception as e:
+            failures += 1
+            print(f"[ERRO] {name}: {e}")
+            records.append({**record, "entry": name, "status": "error", "error": str(e)[:500]})
+            continue
+
+        regression = check_regression(result, load_history(name))
+        failures += regression is not None
+        records.append({**record, **result, "status": "regression" if regression else "ok"})
+        print(f"[{'REGRESSÃO' if regression else 'OK'}] {name}: import {result['import_s']:.2f}s | "
+              f"primeiro trabalho {result['first_work_s']:.2f}s | total {result['time_to_first_work_s']:.2f}s | "
+              f"processo {result['wall_s']:.2f}s" + (f" | {regression}" if regression else ""))
+        print("    " + ", ".join(f"{package} {seconds:.2f}s" for package, seconds in result["top_packages"]))
+
+    if not args.no_record:
+        RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(RESULTS_FILE, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
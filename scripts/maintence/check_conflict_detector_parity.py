@@ -0,0 +1,113 @@
+# scripts/maintenance/check_conflict_detector_parity.py
+#
+# Verifica que a versão colunar (vectorized_conflict_detector) produz exatamente os mesmos
+# confidence_score e conflitos que ConflictDetector.run(), sobre análises geradas cobrindo
+# os limites de cada regra, e mede a vazão da versão colunar.
+#
+# Uso: python scripts/maintence/check_conflict_detector_parity.py [quantidade]
+
+import random
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Adiciona o root do projeto ao path para permitir imports
+try:
+    CURRENT_SCRIPT_DIR = Path(__file__).resolve().parent
+    PROJECT_ROOT = CURRENT_SCRIPT_DIR.parent.parent
+    if str(PROJECT_ROOT) not in sys.path: sys.path.insert(0, str(PROJECT_ROOT))
+except NameError:
+    PROJECT_ROOT = Path.cwd()
+    if str(PROJECT_ROOT) not in sys.path: sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.data_processing.conflict_detector import ConflictDetector
+from src.data_processing.vectorized_conflict_detector import (
+    conflict_mask_from_messages, detect_conflicts_frame, flatten_analyses
+)
+
+SEED = 42
+DEFAULT_SAMPLES = 200000
+BENCHMARK_ROWS = 2000000
+
+MISSING = object() # Marca chaves que não devem existir no dict gerado
+
+# Valores nos limites das regras (0.4, 0.5, 0.6, 0.7) e fora deles
+SENTIMENT_SCORES = [MISSING, -1.0, -0.71, -0.7, -0.61, -0.6, 0.0, 0.5, 0.51, 0.6, 0.61, 0.7, 0.71, 1.0]
+RELEVANCES = [MISSING, 0.0, 0.39, 0.4, 0.41, 1.0]
+INTENSITIES = [MISSING, None, 'Nula', 'Leve', 'Moderada', 'Forte']
+LABELS = [MISSING, None, 'Positivo', 'Negativo', 'Neutro']
+IMPACTS = [None, 'Positivo', 'Negativo', 'Neutro']
+MASLOW_CATEGORIES = [MISSING, None, 'Segurança', 'Fisiológica', 'Estima']
+
+
+def _maybe(section: dict, key: str, options: list, rng: random.Random):
+    value = rng.choice(options)
+    if value is not MISSING:
+        section[key] = value
+
+
+def random_analysis(rng: random.Random) -> dict:
+    analysis = {}
+    if rng.random() < 0.9:
+        analysis['analise_resumo'] = {'summary': rng.choice(['', None, 'Resumo da notícia.'])}
+    if rng.random() < 0.9:
+        section = analysis['analise_sentimento'] = {}
+        _maybe(section, 'sentiment_score', SENTIMENT_SCORES, rng)
+        _maybe(section, 'intensity', INTENSITIES, rng)
+        _maybe(section, 'sentiment_label', LABELS, rng)
+    if rng.random() < 0.9:
+        section = analysis['analise_entidades'] = {}
+        _maybe(section, 'entidades_identificadas', [MISSING, [], [{'entidade': 'Petrobras'}]], rng)
+        _maybe(section, 'relevancia_mercado_financeiro', RELEVANCES, rng)
+        _maybe(section, 'alertas', [MISSING, [], ['a'], ['a', 'b'], ['a', 'b', 'c', 'd', 'e']], rng)
+    if rng.random() < 0.9:
+        stakeholders = []
+        for _ in range(rng.randint(0, 3)):
+            stakeholders.append({
+                'stakeholder_group': rng.choice(['Acionistas/Investidores', 'Governo', 'Clientes']),
+                'impact_direction': rng.choice(IMPACTS),
+            })
+        analysis['analise_stakeholders'] = {} if rng.random() < 0.1 else {'stakeholder_analysis': stakeholders}
+    if rng.random() < 0.9:
+        section = analysis['analise_impacto_maslow'] = {}
+        _maybe(section, 'score_maslow', [MISSING, None, 0, 0.8], rng)
+        _maybe(section, 'maslow_impact_primary_category', MASLOW_CATEGORIES, rng)
+    return analysis
+
+
+def check_parity(samples: int) -> int:
+    rng = random.Random(SEED)
+    analyses = [random_analysis(rng) for _ in range(samples)]
+
+    expected = [ConflictDetector(analysis).run() for analysis in analyses]
+    result = detect_conflicts_frame(flatten_analyses(analyses))
+
+    mismatches = 0
+    for i, (reference, row) in enumerate(zip(expected, result.itertuples(index=False))):
+        expected_mask = conflict_mask_from_messages(reference["conflicts"])
+        if reference["confidence_score"] != row.confidence_score or expected_mask != row.conflict_mask:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"Divergência #{i}: esperado ({reference['confidence_score']}, {expected_mask:#06x}), "
+                      f"obtido ({row.confidence_score}, {row.conflict_mask:#06x}) para {analyses[i]}")
+    print(f"Paridade: {samples - mismatches}/{samples} análises idênticas.")
+    return mismatches
+
+
+def benchmark(rows: int):
+    rng = random.Random(SEED)
+    base = flatten_analyses([random_analysis(rng) for _ in range(10000)])
+    frame = pd.concat([base] * (rows // len(base)), ignore_index=True)
+    started_at = time.perf_counter()
+    detect_conflicts_frame(frame)
+    elapsed = time.perf_counter() - started_at
+    print(f"Vazão da versão colunar: {len(frame) / elapsed:,.0f} linhas/s ({len(frame):,} linhas em {elapsed:.2f}s).")
+
+
+if __name__ == "__main__":
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SAMPLES
+    mismatches = check_parity(samples)
+    benchmark(BENCHMARK_ROWS)
+    sys.exit(1 if mismatches else 0)
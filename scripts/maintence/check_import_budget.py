@@ -0,0 +1,68 @@
+# scripts/maintenance/check_import_budget.py
+#
+# Verifica que importar os módulos de infraestrutura (db_utils e settings) continua rápido e
+# sem efeitos colaterais: cada import roda num interpretador novo, deve caber no orçamento
+# de tempo e não pode carregar o SDK do Vertex AI, o ADK ou o NLTK (que só devem ser
+# inicializados no primeiro uso; ver src/utils/model_registry.py e src/utils/nlp_resources.py).
+#
+# Uso: python scripts/maintence/check_import_budget.py [orçamento_em_segundos]
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# Adiciona o root do projeto ao path para permitir imports
+try:
+    CURRENT_SCRIPT_DIR = Path(__file__).resolve().parent
+    PROJECT_ROOT = CURRENT_SCRIPT_DIR.parent.parent
+except NameError:
+    PROJECT_ROOT = Path.cwd()
+
+DEFAULT_BUDGET_SECONDS = 3.0
+RUNS = 3 # Execuções por módulo; vale a mediana
+
+# Módulo -> pacotes que não podem ter sido importados ao final do import
+CHECKS = {
+    "config.settings": ["vertexai", "google.adk", "google.cloud.aiplatform", "nltk"],
+    "src.database.db_utils": ["vertexai", "google.adk", "google.cloud.aiplatform", "nltk"],
+}
+
+PROBE = """
+import json, sys, time
+started_at = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started_at
+print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str, forbidden: list[str]) -> dict:
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT) + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, forbidden=forbidden)],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, timeout=120
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {module}:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(budget: float) -> int:
+    failures = 0
+    for module, forbidden in CHECKS.items():
+        results = [measure(module, forbidden) for _ in range(RUNS)]
+        elapsed = statistics.median(result["elapsed"] for result in results)
+        loaded = sorted({name for result in results for name in result["loaded"]})
+        ok = elapsed <= budget and not loaded
+        failures += not ok
+        print(f"[{'OK' if ok else 'FALHA'}] import {module}: {elapsed:.2f}s (orçamento {budget:.2f}s)"
+              + (f" | importou indevidamente: {', '.join(loaded)}" if loaded else ""))
+    return failures
+
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_SECONDS
+    sys.exit(1 if main(budget) else 0)
@@ -1,195 +1,195 @@
-# scripts/maintenance/fill_missing_confidence_scores.py (Atualizado com logging aprimorado)
+# scripts/maintenance/fill_missing_confidence_scores.py (Backfill em lote, retomável)
+# Uso: python scripts/maintence/fill_missing_confidence_scores.py [--restart] [--recompute-metrics]
 
 import os
 import sys
-import asyncio
-import time
-import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
-import traceback
+
+import numpy as np
+import pandas as pd
 
 # Adiciona o root do projeto ao path para permitir imports
 try:
     CURRENT_SCRIPT_DIR = Path(__file__).resolve().parent
-    PROJECT_ROOT = CURRENT_SCRIPT_DIR.parent.parent 
+    PROJECT_ROOT = CURRENT_SCRIPT_DIR.parent.parent
     if str(PROJECT_ROOT) not in sys.path: sys.path.insert(0, str(PROJECT_ROOT))
 except NameError:
     PROJECT_ROOT = Path.cwd()
     if str(PROJECT_ROOT) not in sys.path: sys.path.insert(0, str(PROJECT_ROOT))
 
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
 from config import settings
-from src.database.db_utils import get_db_session
+from src.database.backfill import bulk_update_from_frame, run_keyset_backfill
 from src.database.create_db_tables import NewsArticle, NewsSource
-from sqlalchemy.orm import joinedload
-from src.data_processing.conflict_detector import ConflictDetector 
+from src.data_processing.conflict_detector import ConflictDetector
+from src.agents.analistas.sub_agentes_analise.sub_agente_quantitativo_adk.tools.tool_calculate_text_metrics import analyze_text_metrics_batch
 
 # --- CONFIGURAÇÕES DO SCRIPT ---
-BATCH_SIZE = 100000 # Quantidade de artigos a processar por vez
-SLEEP_BETWEEN_BATCHES_SECONDS = 5 # Pausa entre cada lote
-
-# --- FUNÇÃO AUXILIAR PARA CALCULAR OVERALL CONFIDENCE ---
-def calculate_overall_confidence(llm_analysis_json: dict, conflict_analysis_json: dict, current_source_credibility: float) -> float:
-    shannon_entropy = llm_analysis_json.get("analise_quantitativa", {}).get("shannon_relative_entropy", 0.0)
-    relevance_score = llm_analysis_json.get("analise_entidades", {}).get("relevancia_mercado_financeiro", 0.0)
-    
-    internal_confidence_score = conflict_analysis_json.get("confidence_score", 0) / 100.0 
+BACKFILL_NAME = "fill_missing_confidence_scores"
+CHUNK_SIZE = settings.BACKFILL_CHUNK_SIZE # Artigos lidos e gravados por vez
+RESTART = "--restart" in sys.argv # Ignora o checkpoint e recomeça do primeiro artigo
+# Opcional: recalcula a analise_quantitativa dos artigos que não a têm (altera o llm_analysis_json).
+# Só para textos que o pipeline analisaria sem compressão, para que as métricas sejam as mesmas.
+RECOMPUTE_METRICS = "--recompute-metrics" in sys.argv
+METRICS_PROCESSES = settings.QUANT_METRICS_PROCESS_WORKERS
+_metrics_executor: ProcessPoolExecutor | None = None # Um pool para a execução inteira (ver main)
 
-    overall_score = current_source_credibility * shannon_entropy * relevance_score * internal_confidence_score * 100
-    return min(100, max(0, overall_score))
 
-async def fill_missing_scores_for_article(article_id: int):
+def build_query():
     """
-    Recarrega um artigo, garante que o source_credibility e conflict_analysis_json
-    estejam preenchidos/recalculados, e recalcula o overall_confidence_score.
+    Artigos com análise completa. Os campos usados no score são extraídos dos JSONs no próprio
+    SQL; o llm_analysis_json inteiro só vem quando falta o confidence_score (ConflictDetector).
+    Com --recompute-metrics, também vêm o JSON e o texto dos artigos sem entropia cujo texto
+    não passaria pela compressão (mesma conta de count_tokens do pipeline: len // 4).
     """
-    
+    confidence_text = NewsArticle.conflict_analysis_json["confidence_score"].as_string()
+    shannon_text = NewsArticle.llm_analysis_json[("analise_quantitativa", "shannon_relative_entropy")].as_string()
+    needs_json = confidence_text.is_(None)
+    metrics_columns = []
+    if RECOMPUTE_METRICS:
+        recomputable = shannon_text.is_(None) & (
+            func.length(NewsArticle.article_text_content) / 4 <= settings.ANALYSIS_MAX_TOKENS_BEFORE_COMPRESSION
+        )
+        needs_json = needs_json | recomputable
+        metrics_columns = [case((recomputable, NewsArticle.article_text_content), else_=None).label("article_text")]
+    return (
+        select(
+            NewsArticle.news_article_id,
+            NewsArticle.source_credibility.label("current_source_credibility"),
+            NewsArticle.overall_confidence_score.label("current_overall_score"),
+            func.coalesce(NewsSource.base_credibility_score, 0.5).label("source_credibility"),
+            shannon_text.label("shannon_entropy"),
+            NewsArticle.llm_analysis_json[("analise_entidades", "relevancia_mercado_financeiro")].as_string().label("relevance_score"),
+            confidence_text.label("confidence_score"),
+            case((needs_json, NewsArticle.llm_analysis_json), else_=None).label("llm_analysis_json"),
+            *metrics_columns,
+        )
+        .outerjoin(NewsSource, NewsArticle.news_source_id == NewsSource.news_source_id)
+        .where(
+            NewsArticle.processing_status == 'analysis_complete',
+            NewsArticle.llm_analysis_json.isnot(None) # Garante que já tem uma análise principal
+        )
+    )
+
+
+def audit_missing_confidence(llm_analysis_json: dict) -> dict:
+    """Recalcula o conflict_analysis_json de um artigo sem confidence_score."""
     try:
-        with get_db_session() as session: 
-            article_obj = (
-                session.query(NewsArticle)
-                .options(joinedload(NewsArticle.news_source))
-                .filter(NewsArticle.news_article_id == article_id)
-                .first()
-            )
-            
-            if not article_obj:
-                settings.logger.error(f"Artigo com ID {article_id} não encontrado na sessão de preenchimento. Pode ter sido excluído.")
-                return {"id": article_id, "status": "not_found"}
-
-            source_credibility = article_obj.news_source.base_credibility_score if article_obj.news_source else 0.5
-            
-            llm_analysis_json_from_db = article_obj.llm_analysis_json
-            conflict_analysis_json_from_db = article_obj.conflict_analysis_json
-
-            if not llm_analysis_json_from_db:
-                settings.logger.warning(f"Artigo {article_id} sem llm_analysis_json. Pulando preenchimento de scores.")
-                return {"id": article_id, "status": "skipped_no_llm_json"}
-
-            # Flag para saber se houve alguma alteração que justifique o commit
-            changed = False
-
-            # 1. Garantir que o source_credibility da coluna do artigo esteja preenchido
-            if article_obj.source_credibility is None or article_obj.source_credibility != source_credibility: 
-                article_obj.source_credibility = source_credibility
-                settings.logger.info(f"Artigo {article_id}: Preenchido/Atualizado source_credibility com {source_credibility}.")
-                changed = True
-
-            # 2. Garantir que conflict_analysis_json tenha um confidence_score. Se não tiver, recalcular com ConflictDetector.
-            current_conflict_json = conflict_analysis_json_from_db if conflict_analysis_json_from_db else {}
-            
-            if "confidence_score" not in current_conflict_json or current_conflict_json["confidence_score"] is None:
-                settings.logger.info(f"Artigo {article_id}: confidence_score ausente em conflict_analysis_json. Recalculando com ConflictDetector.")
-                try:
-                    detector = ConflictDetector(llm_analysis_json_from_db)
-                    audit_result = detector.run() 
-                    current_conflict_json = audit_result 
-                    settings.logger.info(f"Artigo {article_id}: Recalculado confidence_score para {current_conflict_json.get('confidence_score')}.")
-                    changed = True
-                except Exception as e:
-                    settings.logger.warning(f"Artigo {article_id}: Falha ao recalcular confidence_score com ConflictDetector: {e}. Defaulting to 0.")
-                    current_conflict_json["confidence_score"] = 0 
-                    current_conflict_json["conflicts"] = current_conflict_json.get("conflicts", []) + ["Erro ao recalcular confiança interna durante preenchimento"]
-                    current_conflict_json["audited_by"] = current_conflict_json.get("audited_by", "ConflictDetector_Fallback")
-                    current_conflict_json["audit_timestamp"] = current_conflict_json.get("audit_timestamp", datetime.now().isoformat())
-                    changed = True
-            
-            # Se o JSON de conflito na coluna do DB for diferente do que temos agora, atualiza
-            if article_obj.conflict_analysis_json != current_conflict_json:
-                article_obj.conflict_analysis_json = current_conflict_json
-                changed = True
-
-            # 3. Calcular e preencher overall_confidence_score
-            new_overall_score = calculate_overall_confidence(llm_analysis_json_from_db, current_conflict_json, source_credibility)
-            
-            if abs((article_obj.overall_confidence_score if article_obj.overall_confidence_score is not None else -1) - new_overall_score) > 0.01:
-                article_obj.overall_confidence_score = new_overall_score
-                settings.logger.info(f"Artigo {article_id}: overall_confidence_score atualizado para {new_overall_score:.2f}.")
-                changed = True
-            
-            if changed:
-                session.add(article_obj)
-                session.commit()
-                return {"id": article_id, "status": "filled_scores", "overall_confidence": new_overall_score}
-            else:
-                settings.logger.info(f"Artigo {article_id}: Nenhum preenchimento ou recalculo necessário. Pulado.")
-                return {"id": article_id, "status": "skipped_no_change"}
-
+        return ConflictDetector(llm_analysis_json).run()
     except Exception as e:
-        settings.logger.error(f"Erro ao preencher scores para o artigo {article_id}: {e}", exc_info=True)
-        return {"id": article_id, "status": "fill_failed", "error": str(e)}
+        settings.logger.warning(f"Falha ao recalcular confidence_score com ConflictDetector: {e}. Defaulting to 0.")
+        return {
+            "confidence_score": 0,
+            "conflicts": ["Erro ao recalcular confiança interna durante preenchimento"],
+            "audited_by": "ConflictDetector_Fallback",
+            "audit_timestamp": datetime.now().isoformat()
+        }
 
-async def main():
-    settings.logger.info("--- INICIANDO SCRIPT DE PREENCHIMENTO/RECALCULO DE SCORES E CONFIANÇA GERAL ---")
-    
-    total_processed_articles_overall = 0 
-    total_updated_correctly_overall = 0 
-    total_skipped_no_change_overall = 0
-    total_failed_overall = 0 
-    
-    current_batch_number = 1 
-
-    while True:
-        articles_to_process_ids = []
-        with get_db_session() as session_for_ids: 
-            articles_to_process_objs = (
-                session_for_ids.query(NewsArticle.news_article_id)
-                .filter(
-                    NewsArticle.processing_status == 'analysis_complete',
-                    NewsArticle.llm_analysis_json.isnot(None) # Garante que já tem uma análise principal
-                )
-                .order_by(NewsArticle.news_article_id) # Opcional: Para processar em ordem de ID
-                .limit(BATCH_SIZE)
-                .all()
-            )
-            articles_to_process_ids = [art.news_article_id for art in articles_to_process_objs]
-
-        if not articles_to_process_ids:
-            settings.logger.info(f"Fim dos artigos. Nenhum novo artigo encontrado para preenchimento/recalculo de scores. Processo concluído após {current_batch_number - 1} batches.")
-            break 
-
-        settings.logger.info(f"--- Processando Batch {current_batch_number} ---")
-        # Log de artigos encontrados para este batch
-        settings.logger.info(f"Artigos encontrados para este batch ({len(articles_to_process_ids)} IDs): {articles_to_process_ids}")
-        
-        tasks = []
-        for article_id in articles_to_process_ids:
-            tasks.append(fill_missing_scores_for_article(article_id))
-        
-        results = await asyncio.gather(*tasks)
-        
-        processed_in_batch = 0
-        updated_in_batch = 0
-        skipped_in_batch = 0
-        failed_in_batch = 0
-
-        for result in results:
-            processed_in_batch += 1
-            if result.get("status") == "filled_scores":
-                updated_in_batch += 1
-                settings.logger.info(f"Artigo {result['id']} ATUALIZADO/RECALCULADO. Novo overall_confidence_score: {result.get('overall_confidence'):.2f}")
-            elif result.get("status") == "skipped_no_change":
-                skipped_in_batch += 1
-                settings.logger.info(f"Artigo {result['id']} PULADO (sem mudanças).")
-            else: # Covers "fill_failed", "not_found", "skipped_no_llm_json"
-                failed_in_batch += 1
-                settings.logger.error(f"Artigo {result['id']} FALHOU ou foi pulado (Motivo: {result.get('status')}). Detalhes: {result.get('error', result.get('message', 'N/A'))}")
-
-        total_processed_articles_overall += processed_in_batch
-        total_updated_correctly_overall += updated_in_batch
-        total_skipped_no_change_overall += skipped_in_batch
-        total_failed_overall += failed_in_batch
-
-        settings.logger.info(f"Resumo do Batch {current_batch_number}: Processados={processed_in_batch} | Atualizados={updated_in_batch} | Pulados={skipped_in_batch} | Falhas={failed_in_batch}")
-        
-        current_batch_number += 1
-        await asyncio.sleep(SLEEP_BETWEEN_BATCHES_SECONDS) 
 
+def recompute_missing_text_metrics(chunk: pd.DataFrame) -> pd.Series:
+    """
+    (--recompute-metrics) Recalcula a analise_quantitativa dos artigos selecionados em build_query,
+    no pool da execução. Retorna o llm_analysis_json atualizado dessas linhas (None nas demais)
+    e preenche a coluna shannon_entropy do pedaço.
+    """
+    llm_json = pd.Series([None] * len(chunk), index=chunk.index, dtype=object)
+    if "article_text" not in chunk:
+        return llm_json
+    rows = chunk.index[chunk["article_text"].notna()]
+    if not len(rows):
+        return llm_json
+
+    metrics = analyze_text_metrics_batch(chunk.loc[rows, "article_text"].tolist(), executor=_metrics_executor)
+    for row, article_metrics in zip(rows, metrics):
+        if article_metrics.get("status") != "success":
+            continue
+        llm_json[row] = {**(chunk.at[row, "llm_analysis_json"] or {}), "analise_quantitativa": article_metrics}
+        chunk.at[row, "shannon_entropy"] = str(article_metrics["shannon_relative_entropy"])
+    settings.logger.info(f"Métricas quantitativas recalculadas para {int(llm_json.notna().sum())} artigos sem entropia.")
+    return llm_json
+
+
+def transform(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Mesmo cálculo de calculate_overall_confidence do pipeline, vetorizado:
+    credibilidade * entropia * relevância * (confidence_score / 100) * 100, limitado a [0, 100].
+    Campos ausentes valem 0; valores não numéricos deixam o artigo de fora (como antes, quando
+    o cálculo falhava para ele).
+    """
+    def numeric(column: str) -> pd.Series:
+        raw = chunk[column]
+        return pd.to_numeric(raw.where(raw.notna(), "0"), errors="coerce")
+
+    llm_json = recompute_missing_text_metrics(chunk)
+    needs_audit = chunk["confidence_score"].isna()
+    conflict_json = pd.Series([None] * len(chunk), index=chunk.index, dtype=object)
+    confidence = numeric("confidence_score")
+    if needs_audit.any():
+        audited = chunk.loc[needs_audit, "llm_analysis_json"].map(audit_missing_confidence)
+        conflict_json[needs_audit] = audited
+        confidence[needs_audit] = audited.map(lambda result: result.get("confidence_score", 0)).astype(float)
+
+    credibility = chunk["source_credibility"].astype(float)
+    overall = (credibility * numeric("shannon_entropy") * numeric("relevance_score") * confidence / 100.0 * 100).clip(0, 100)
+
+    valid = overall.notna()
+    current_overall = chunk["current_overall_score"].astype(float).fillna(-1)
+    changed = (
+        chunk["current_source_credibility"].isna()
+        | (chunk["current_source_credibility"].astype(float) != credibility)
+        | needs_audit
+        | llm_json.notna()
+        | ((current_overall - overall).abs() > 0.01)
+    )
+    skipped = int((~valid).sum())
+    if skipped:
+        settings.logger.warning(f"{skipped} artigos com campos não numéricos no JSON foram pulados: {chunk.loc[~valid, 'news_article_id'].tolist()}")
+
+    selected = valid & changed
+    return pd.DataFrame({
+        "news_article_id": chunk.loc[selected, "news_article_id"],
+        "source_credibility": credibility[selected],
+        "overall_confidence_score": overall[selected].astype(np.float64),
+        "conflict_analysis_json": conflict_json[selected],
+        "llm_analysis_json": llm_json[selected],
+    })
+
+
+def write(session: Session, updates: pd.DataFrame) -> int:
+    updated = bulk_update_from_frame(
+        session, "NewsArticles", "news_article_id", updates,
+        {"source_credibility": "double precision", "overall_confidence_score": "double precision"}
+    )
+    # O conflict_analysis_json só é regravado nos artigos que passaram pelo ConflictDetector
+    audited = updates[updates["conflict_analysis_json"].notna()]
+    bulk_update_from_frame(session, "NewsArticles", "news_article_id", audited, {"conflict_analysis_json": "json"})
+    # E o llm_analysis_json só nos que tiveram a analise_quantitativa recalculada (--recompute-metrics)
+    with_metrics = updates[updates["llm_analysis_json"].notna()]
+    bulk_update_from_frame(session, "NewsArticles", "news_article_id", with_metrics, {"llm_analysis_json": "json"})
+    return updated
+
+
+def main():
+    global _metrics_executor
+    settings.logger.info("--- INICIANDO SCRIPT DE PREENCHIMENTO/RECALCULO DE SCORES E CONFIANÇA GERAL ---")
+    if RECOMPUTE_METRICS:
+        settings.logger.warning("--recompute-metrics: a analise_quantitativa ausente será recalculada e gravada no llm_analysis_json.")
+        if METRICS_PROCESSES > 1: # Com 1, calcula no próprio processo (o cache de radicais já dura a execução inteira)
+            _metrics_executor = ProcessPoolExecutor(max_workers=METRICS_PROCESSES)
+    try:
+        counters = run_keyset_backfill(
+            BACKFILL_NAME, build_query(), NewsArticle.news_article_id,
+            transform, write, chunk_size=CHUNK_SIZE, restart=RESTART
+        )
+    finally:
+        if _metrics_executor is not None:
+            _metrics_executor.shutdown()
     settings.logger.info(f"--- SCRIPT DE PREENCHIMENTO/RECALCULO CONCLUÍDO ---")
-    settings.logger.info(f"RESUMO FINAL: Total de artigos processados: {total_processed_articles_overall}.")
-    settings.logger.info(f"Total de artigos com scores recalculados/preenchidos: {total_updated_correctly_overall}.")
-    settings.logger.info(f"Total de artigos pulados (sem mudanças): {total_skipped_no_change_overall}.")
-    settings.logger.info(f"Total de artigos que falharam ou foram pulados (outros motivos): {total_failed_overall}.")
+    settings.logger.info(f"RESUMO FINAL: Total de artigos lidos: {counters['lidos']} | Atualizados: {counters['atualizados']}.")
+
 if __name__ == "__main__":
     os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "True"
-    asyncio.run(main())
\ No newline at end of file
+    main()
@@ -1,10 +1,12 @@
 # scripts/maintenance/reanalyze_low_confidence_articles.py
 
 import os
+import socket
 import sys
 import asyncio
 import time
 import json
+from datetime import datetime
 from pathlib import Path
 import traceback
 
@@ -22,12 +24,17 @@ except NameError:
     if str(PROJECT_ROOT) not in sys.path: sys.path.insert(0, str(PROJECT_ROOT))
 
 from config import settings
-from src.database.db_utils import get_db_session, update_article_with_analysis
-from src.database.create_db_tables import NewsArticle, NewsSource 
-from sqlalchemy.orm import joinedload
+from src.database.db_utils import (
+    get_db_session,
+    batch_update_articles_with_analysis,
+    claim_articles_for_analysis,
+    release_article_claims
+)
+from src.database.async_db import run_db, shutdown_db_executor, lease_renewer
+from src.database.create_db_tables import NewsArticle
 from src.agents.agent_utils import run_agent_and_get_final_response
 # Verifique o caminho exato do AgenteGerenciadorAnalise_ADK
-from src.agents.analistas.agente_gerenciador_analise_adk.agent import AgenteGerenciadorAnalise_ADK 
+from src.agents.analistas.agente_gerenciador_analise_adk.agent import AgenteGerenciadorAnalise_ADK, bypass_stage_memo
 from src.data_processing.conflict_detector import ConflictDetector 
 from src.utils.parser_utils import parse_llm_json_response
 from google.genai.types import Content, Part
@@ -40,6 +47,8 @@ BATCH_SIZE = 5
 # Pausa entre cada artigo processado (para evitar sobrecarga de API)
 SLEEP_BETWEEN_ARTICLES_SECONDS = 15 # Ajuste conforme seu rate limit de LLM
 SLEEP_BETWEEN_BATCHES_SECONDS = 15
+# Identifica esta execução nas reservas (leases) de artigos
+WORKER_ID = os.getenv("ANALYSIS_WORKER_ID", f"reanalysis:{socket.gethostname()}:{os.getpid()}")
 
 # --- FUNÇÃO AUXILIAR PARA CALCULAR OVERALL CONFIDENCE (MESMA DO PIPELINE PRINCIPAL) ---
 def calculate_overall_confidence(llm_analysis_json: dict, conflict_analysis_json: dict, current_source_credibility: float) -> float:
@@ -62,6 +71,8 @@ async def reanalyze_article(article_data: dict):
         return {"id": article_id, "status": "skipped_no_content"}
 
     settings.logger.info(f"Reanalisando artigo {article_id} (fonte: {news_source_url}, credibilidade: {source_credibility})...")
+    # Sem isso os estágios aprovados na integridade viriam da memoização e o resultado seria o mesmo
+    bypass_stage_memo.set(True)
     
     try:
         # <<< AQUI ESTÁ A CORREÇÃO: ENCAPSULAR O TEXTO EM UM Content OBJECT >>>
@@ -92,7 +103,15 @@ async def reanalyze_article(article_data: dict):
             "processing_status": final_processing_status
         }
 
-        update_article_with_analysis(article_id, data_to_persist)
+        # Gravação barrada pela reserva: se ela expirou e o artigo foi reservado por outro
+        # worker, a reanálise é descartada em vez de sobrescrever a dele
+        updated = await run_db(
+            batch_update_articles_with_analysis,
+            [(article_id, data_to_persist, datetime.now(settings.TIMEZONE))],
+            worker_id=WORKER_ID
+        )
+        if not updated:
+            return {"id": article_id, "status": "lease_lost"}
         settings.logger.info(f"Artigo {article_id} reanalisado e atualizado com sucesso. Novo overall_confidence_score: {overall_confidence_score:.2f}, Status: {final_processing_status}")
         return {"id": article_id, "status": final_processing_status, "new_confidence": overall_confidence_score}
 
@@ -104,63 +123,84 @@ async def reanalyze_article(article_data: dict):
 async def main():
     settings.logger.info("--- INICIANDO SCRIPT DE REANÁLISE DE ARTIGOS COM BAIXA CONFIANÇA ---")
     
-    total_processed_count = 0
-    total_reanalyzed_success = 0
-    total_reanalyzed_failed = 0
-    
-    current_batch_number = 1 
+    totals = {"processed": 0, "success": 0, "failed": 0}
+
+    processed_ids = []
+    # Artigos reservados e ainda não gravados/liberados; o renovador mantém as reservas
+    # enquanto o batch espera entre artigos e nas chamadas ao LLM
+    in_flight: set[int] = set()
+    renewer = asyncio.create_task(lease_renewer(in_flight, WORKER_ID))
+
+    try:
+        await reanalyze_batches(processed_ids, in_flight, totals)
+    finally:
+        renewer.cancel()
+        # Queda no meio do batch: devolve as reservas restantes sem rebaixar os artigos
+        if in_flight:
+            with get_db_session() as session:
+                release_article_claims(session, list(in_flight), WORKER_ID, release_status='analysis_complete')
+        shutdown_db_executor()
+
+    settings.logger.info(f"--- SCRIPT DE REANÁLISE CONCLUÍDO ---")
+    settings.logger.info(f"RESUMO FINAL: Total de artigos processados: {totals['processed']}.")
+    settings.logger.info(f"Total de artigos reanalisados com sucesso: {totals['success']}.")
+    settings.logger.info(f"Total de artigos que falharam na reanálise: {totals['failed']}.")
+
+
+async def reanalyze_batches(processed_ids: list[int], in_flight: set[int], totals: dict):
+    current_batch_number = 1
 
     while True:
-        articles_to_process_objs = []
+        # Reserva os artigos (FOR UPDATE SKIP LOCKED) para que outra cópia do script ou o
+        # pipeline principal não reanalise os mesmos artigos em paralelo.
         with get_db_session() as session:
-            articles_to_process_objs = (
-                session.query(NewsArticle)
-                .options(joinedload(NewsArticle.news_source)) 
-                .filter(
-                    NewsArticle.processing_status == 'analysis_complete', # Apenas artigos que já foram analisados
+            articles_to_process = claim_articles_for_analysis(
+                session,
+                WORKER_ID,
+                limit=BATCH_SIZE,
+                source_status='analysis_complete', # Apenas artigos que já foram analisados
+                extra_filters=[
                     NewsArticle.llm_analysis_json.isnot(None), # Que tenham um JSON de análise principal
                     NewsArticle.conflict_analysis_json.isnot(None), # Que tenham um JSON de conflito (com score)
-                    # AQUI ESTÁ A CORREÇÃO MAIS FIEL À SUA QUERY MANUAL
                     # Seleciona artigos cujo confidence_score no conflict_analysis_json é < REANALYSIS_THRESHOLD
-                    NewsArticle.conflict_analysis_json.op('->>')('confidence_score').cast(Float) < REANALYSIS_THRESHOLD
-                )
-                .limit(BATCH_SIZE)
-                .all()
+                    NewsArticle.conflict_analysis_json.op('->>')('confidence_score').cast(Float) < REANALYSIS_THRESHOLD,
+                    # Não reanalisa de novo, nesta execução, artigos que continuaram com baixa confiança
+                    NewsArticle.news_article_id.notin_(processed_ids)
+                ]
             )
             
-        if not articles_to_process_objs:
+        if not articles_to_process:
             settings.logger.info(f"Fim dos artigos. Nenhum novo artigo encontrado para reanálise. Processo concluído após {current_batch_number - 1} batches.")
             break 
 
         settings.logger.info(f"--- Processando Batch {current_batch_number} ---")
         # Log de artigos encontrados para este batch
-        articles_in_batch_ids = [art.news_article_id for art in articles_to_process_objs]
+        articles_in_batch_ids = [art["news_article_id"] for art in articles_to_process]
+        processed_ids.extend(articles_in_batch_ids)
+        in_flight.update(articles_in_batch_ids)
         settings.logger.info(f"Artigos encontrados para este batch ({len(articles_in_batch_ids)} IDs): {articles_in_batch_ids}")
         
         tasks = []
-        for article_obj in articles_to_process_objs: # Itera sobre os objetos, não IDs simples
-            # Mapeia o objeto SQLAlchemy para o dicionário esperado pela função reanalyze_article
-            source_credibility = article_obj.news_source.base_credibility_score if article_obj.news_source else 0.5
-            news_source_url = article_obj.news_source.url_base if article_obj.news_source and article_obj.news_source.url_base else article_obj.article_link
-            
-            article_dict = {
-                "news_article_id": article_obj.news_article_id,
-                "article_text_content": article_obj.article_text_content, 
-                "source_credibility": source_credibility,
-                "news_source_url": news_source_url,
-            }
+        for article_dict in articles_to_process:
             tasks.append(reanalyze_article(article_dict))
             
             await asyncio.sleep(SLEEP_BETWEEN_ARTICLES_SECONDS)
 
         results = await asyncio.gather(*tasks)
         
+        # Artigos cuja reanálise falhou voltam ao status anterior, liberando a reserva
+        failed_ids = [r["id"] for r in results if r.get("status") in ("reanalysis_failed", "skipped_no_content")]
+        if failed_ids:
+            with get_db_session() as session:
+                release_article_claims(session, failed_ids, WORKER_ID, release_status='analysis_complete')
+        in_flight.difference_update(articles_in_batch_ids)
+
         for result in results:
-            total_processed_count += 1
+            totals["processed"] += 1
             if result.get("status") in ['analysis_complete', 'analysis_rejected']: # Sucesso na reanálise, mesmo se rejeitado
-                total_reanalyzed_success += 1
+                totals["success"] += 1
             else:
-                total_reanalyzed_failed += 1
+                totals["failed"] += 1
                 settings.logger.error(f"Artigo {result['id']} falhou na reanálise. Status: {result.get('status')}. Erro: {result.get('error', 'N/A')}")
 
         settings.logger.info(f"Resumo do Batch {current_batch_number}: Processados={len(results)} | Reanalisados (sucesso)={len([r for r in results if r.get('status') in ['analysis_complete', 'analysis_rejected']])} | Falhas={len([r for r in results if r.get('status') not in ['analysis_complete', 'analysis_rejected']])}")
@@ -168,10 +208,6 @@ async def main():
         current_batch_number += 1
         await asyncio.sleep(SLEEP_BETWEEN_BATCHES_SECONDS) 
 
-    settings.logger.info(f"--- SCRIPT DE REANÁLISE CONCLUÍDO ---")
-    settings.logger.info(f"RESUMO FINAL: Total de artigos processados: {total_processed_count}.")
-    settings.logger.info(f"Total de artigos reanalisados com sucesso: {total_reanalyzed_success}.")
-    settings.logger.info(f"Total de artigos que falharam na reanálise: {total_reanalyzed_failed}.")
 
 if __name__ == "__main__":
     os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "True"
@@ -1,9 +1,11 @@
 # Em: scripts/maintenance/run_conflict_detection_backfill.py
 
 import sys
-import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import pandas as pd
+
 # Adiciona o root do projeto ao path para permitir imports
 try:
     CURRENT_SCRIPT_DIR = Path(__file__).resolve().parent
@@ -13,67 +15,61 @@ except NameError:
     PROJECT_ROOT = Path.cwd()
     if str(PROJECT_ROOT) not in sys.path: sys.path.insert(0, str(PROJECT_ROOT))
 
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 from config import settings
-from src.database.db_utils import get_db_session
-from src.database.create_db_tables import NewsArticle, NewsSource
+from src.database.backfill import bulk_update_from_frame, run_keyset_backfill
+from src.database.create_db_tables import NewsArticle
 from src.data_processing.conflict_detector import ConflictDetector
 
-def get_articles_for_reprocessing(session: Session, limit: int = 5000):
-    """Busca artigos que já têm análise mas ainda não passaram pelo detector de conflitos."""
-    settings.logger.info(f"Buscando até {limit} artigos para reprocessamento de conflitos...")
+BACKFILL_NAME = "conflict_detection"
+CHUNK_SIZE = settings.BACKFILL_CHUNK_SIZE
+RESTART = "--restart" in sys.argv # Ignora o checkpoint e recomeça do primeiro artigo
+MAX_WORKERS = None # Processos do ConflictDetector (None = todos os núcleos)
+AUDIT_TASK_SIZE = 200 # Análises por tarefa enviada ao pool
+
+
+def build_query():
+    """Artigos que já têm análise mas ainda não passaram pelo detector de conflitos."""
     return (
-        session.query(NewsArticle)
-        .options(joinedload(NewsArticle.news_source))
-        .filter(
+        select(NewsArticle.news_article_id, NewsArticle.llm_analysis_json)
+        .where(
             NewsArticle.processing_status == 'analysis_complete',
             NewsArticle.llm_analysis_json.isnot(None),
             NewsArticle.conflict_analysis_json.is_(None) # Pega apenas os que não foram auditados
         )
-        .limit(limit)
-        .all()
     )
 
-async def main():
+
+def make_transform(executor: ProcessPoolExecutor):
+    """Audita cada pedaço lido em todos os núcleos, reaproveitando o mesmo pool entre pedaços."""
+    def transform(chunk: pd.DataFrame) -> pd.DataFrame:
+        results = ConflictDetector.run_many(chunk["llm_analysis_json"], executor=executor, chunksize=AUDIT_TASK_SIZE)
+        return pd.DataFrame({
+            "news_article_id": chunk["news_article_id"],
+            "conflict_analysis_json": list(results),
+        })
+    return transform
+
+
+def write(session: Session, updates: pd.DataFrame) -> int:
+    return bulk_update_from_frame(session, "NewsArticles", "news_article_id", updates, {"conflict_analysis_json": "json"})
+
+
+def main():
     """
     Script principal para rodar o detector de conflitos em análises existentes.
     """
     settings.logger.info("--- INICIANDO SCRIPT DE BACKFILL DO DETECTOR DE CONFLITOS ---")
-    
-    processed_count = 0
-    with get_db_session() as session:
-        articles_to_reprocess = get_articles_for_reprocessing(session)
-        
-        if not articles_to_reprocess:
-            settings.logger.info("Nenhum artigo para reprocessar. Todos já possuem análise de conflito.")
-            return
-
-        settings.logger.info(f"Encontrados {len(articles_to_reprocess)} artigos para terem seus conflitos analisados.")
-        
-        for article in articles_to_reprocess:
-            try:
-                analysis_data = article.llm_analysis_json
-                credibility = article.news_source.base_credibility_score if article.news_source else 0.5
-                
-                detector = ConflictDetector(analysis_data, credibility)
-                conflict_result = detector.run()
-                
-                # Atualiza a nova coluna no banco de dados
-                article.conflict_analysis_json = conflict_result
-                
-                processed_count += 1
-                if processed_count % 100 == 0:
-                    settings.logger.info(f"{processed_count}/{len(articles_to_reprocess)} artigos reprocessados...")
-
-            except Exception as e:
-                settings.logger.error(f"Erro ao processar o artigo {article.news_article_id}: {e}")
-                article.conflict_analysis_json = {
-                    "confidence_score": 0, "conflicts": [f"Erro no processamento: {e}"]
-                }
-
-        settings.logger.info("Salvando todas as atualizações no banco de dados...")
-        session.commit()
-        settings.logger.info("Backfill concluído com sucesso!")
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        counters = run_keyset_backfill(
+            BACKFILL_NAME, build_query(), NewsArticle.news_article_id,
+            make_transform(executor), write, chunk_size=CHUNK_SIZE, restart=RESTART
+        )
+    if not counters["lidos"]:
+        settings.logger.info("Nenhum artigo para reprocessar. Todos já possuem análise de conflito.")
+    else:
+        settings.logger.info(f"Backfill concluído com sucesso! {counters['atualizados']} artigos auditados.")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    main()
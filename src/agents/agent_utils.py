@@ -4,25 +4,106 @@ from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai.types import Content, Part
 from config import settings
+from src.utils.rate_limiter import estimate_tokens, get_rate_limiter_for_agent, is_rate_limit_error
+from collections import deque
+from typing import Callable, Optional
 import asyncio 
+import time
+import uuid
 
-async def run_agent_and_get_final_response(agent_instance, new_message: Content, session_id: str) -> str:
+# --- POOL DE RUNNERS ---
+# Um Runner (com seu InMemorySessionService) por agente, reutilizado entre chamadas.
+# Cada chamada cria sua própria sessão e a remove ao final; só as últimas
+# settings.AGENT_SESSION_RETENTION sessões de cada agente ficam retidas (para depuração).
+_runner_pool: dict[int, Runner] = {}
+_retained_sessions: dict[int, deque] = {}
+_timing_hooks: list[Callable[[str, str, float, bool], None]] = []
+USER_ID = "system_user"
+
+
+def get_pooled_runner(agent_instance) -> Runner:
+    """Retorna o Runner compartilhado do agente, criando-o na primeira chamada."""
+    runner = _runner_pool.get(id(agent_instance))
+    if runner is None:
+        runner = Runner(agent=agent_instance, app_name=agent_instance.name, session_service=InMemorySessionService())
+        _runner_pool[id(agent_instance)] = runner
+        _retained_sessions[id(agent_instance)] = deque()
+    return runner
+
+
+def register_timing_hook(hook: Callable[[str, str, float, bool], None]):
+    """Registra um callback chamado após cada execução de agente com (nome_agente, sessão, segundos, sucesso)."""
+    _timing_hooks.append(hook)
+
+
+def unregister_timing_hook(hook: Callable[[str, str, float, bool], None]):
+    if hook in _timing_hooks:
+        _timing_hooks.remove(hook)
+
+
+def _notify_timing(hooks: list, agent_name: str, session_id: str, elapsed: float, success: bool):
+    for hook in hooks:
+        try:
+            hook(agent_name, session_id, elapsed, success)
+        except Exception as e:
+            settings.logger.warning(f"Hook de tempo falhou para o agente '{agent_name}': {e}")
+
+
+async def _retire_session(agent_instance, runner: Runner, session_id: str):
+    """Mantém no máximo AGENT_SESSION_RETENTION sessões do agente; as mais antigas são apagadas."""
+    retained = _retained_sessions[id(agent_instance)]
+    retained.append(session_id)
+    while len(retained) > settings.AGENT_SESSION_RETENTION:
+        old_session_id = retained.popleft()
+        await runner.session_service.delete_session(app_name=runner.app_name, user_id=USER_ID, session_id=old_session_id)
+
+
+async def run_agent_and_get_final_response(agent_instance, new_message: Content, session_id: str,
+                                           rate_limit_key: Optional[str] = None,
+                                           timing_hook: Optional[Callable[[str, str, float, bool], None]] = None) -> str:
     """
     Executa um agente, espera por sua resposta final e retorna o texto dessa resposta.
     Consome todos os eventos intermediários.
+    A chamada passa pelo limitador de taxa do modelo do agente (ou de `rate_limit_key`);
+    respostas 429 reduzem a taxa do orçamento e a chamada é repetida até RATE_LIMIT_MAX_RETRIES vezes.
+    `timing_hook`, se informado, é chamado ao fim de cada tentativa, além dos hooks globais.
     """
-    user_id_prefix = "system_user" 
-    runner = Runner(agent=agent_instance, app_name=agent_instance.name, session_service=InMemorySessionService())
-    
-    await runner.session_service.create_session(app_name=runner.app_name, user_id=user_id_prefix, session_id=session_id)
+    limiter = get_rate_limiter_for_agent(agent_instance, rate_limit_key)
+    prompt_tokens = estimate_tokens("".join(part.text or "" for part in (new_message.parts or [])))
+    hooks = _timing_hooks + ([timing_hook] if timing_hook else [])
+
+    for attempt in range(settings.RATE_LIMIT_MAX_RETRIES + 1):
+        if limiter:
+            await limiter.acquire(prompt_tokens)
+        try:
+            response_text = await _run_agent_once(agent_instance, new_message, session_id, hooks)
+            if limiter:
+                limiter.reward()
+            return response_text
+        except Exception as e:
+            if limiter and is_rate_limit_error(e) and attempt < settings.RATE_LIMIT_MAX_RETRIES:
+                limiter.penalize()
+                settings.logger.warning(f"Agente '{agent_instance.name}' (sessão: {session_id}) recebeu 429. Nova tentativa {attempt + 1}/{settings.RATE_LIMIT_MAX_RETRIES}.")
+                continue
+            raise
+
+
+async def _run_agent_once(agent_instance, new_message: Content, session_id: str, hooks: list) -> str:
+    runner = get_pooled_runner(agent_instance)
+    # O mesmo session_id lógico (ex: "analise_resumo") é usado por vários artigos em paralelo
+    # no mesmo Runner, então cada chamada recebe uma sessão única.
+    call_session_id = f"{session_id}_{uuid.uuid4().hex[:12]}"
+    await runner.session_service.create_session(app_name=runner.app_name, user_id=USER_ID, session_id=call_session_id)
 
     settings.logger.info(f"Chamando agente '{agent_instance.name}' (sessão: {session_id})...")
     
     final_response_text = None 
     received_final_event = False # Flag para saber se recebemos o Evento final
+    started_at = time.perf_counter()
+    success = False
 
     try:
-        async for event in runner.run_async(new_message=new_message, user_id=user_id_prefix, session_id=session_id):
+        async for event in runner.run_async(new_message=new_message, user_id=USER_ID, session_id=call_session_id):
             # Log de eventos intermediários, se desejar
             # if event.content and event.content.parts and not event.is_final_response():
             #     settings.logger.info(f"  Evento Intermediário de '{event.author}': {event.content.parts[0].text[:100]}...")
@@ -39,8 +120,14 @@ async def run_agent_and_get_final_response(agent_instance, new_message: Content,
             settings.logger.error(f"Agente '{agent_instance.name}' (sessão: {session_id}) não retornou uma resposta marcada como final ou seu conteúdo estava vazio.")
             raise ValueError("Agente não retornou resposta final esperada.")
         
+        success = True
         return final_response_text
 
     except Exception as e:
         settings.logger.error(f"Erro ao executar agente '{agent_instance.name}' (sessão: {session_id}): {e}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
+
+    finally:
+        if hooks:
+            _notify_timing(hooks, agent_instance.name, session_id, time.perf_counter() - started_at, success)
+        await _retire_session(agent_instance, runner, call_session_id)
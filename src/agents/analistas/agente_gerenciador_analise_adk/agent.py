@@ -5,6 +5,8 @@ import sys
 import json
 import asyncio
 import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextvars import ContextVar
 from pathlib import Path
 from typing import Optional
 
@@ -23,11 +25,13 @@ from google.adk.events import Event
 from google.genai.types import Content, Part
 from src.agents.agent_utils import run_agent_and_get_final_response
 from src.utils.parser_utils import parse_llm_json_response
+from src.utils.analysis_cache import StageResultMemo
 from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
 
 # Importe TODOS os sub-agentes especialistas
 from src.agents.analistas.sub_agentes_analise.sub_agente_quantitativo_adk.agent import SubAgenteQuantitativo_ADK
+from src.agents.analistas.sub_agentes_analise.sub_agente_quantitativo_adk.tools.tool_calculate_text_metrics import analyze_text_metrics
 from src.agents.analistas.sub_agentes_analise.sub_agente_resumo_adk.agent import SubAgenteResumo_ADK
 from src.agents.analistas.sub_agentes_analise.sub_agente_sentimento_adk.agent import SubAgenteSentimento_ADK
 from src.agents.analistas.sub_agentes_analise.sub_agente_identificador_entidade_adk.agent import SubAgenteIdentificadorEntidades_ADK
@@ -40,6 +44,38 @@ from src.data_processing.conflict_detector import ConflictDetector
 # Importar o AgenteAuditorQualidade_ADK
 from src.agents.auditores.agente_auditor_qualidade_adk.agent import AgenteAuditorQualidade_ADK
 
+# Memoização por estágio, compartilhada entre execuções (ver StageResultMemo)
+stage_memo = StageResultMemo(
+    settings.STAGE_MEMO_DIR,
+    size_limit_bytes=settings.STAGE_MEMO_SIZE_LIMIT_BYTES,
+    ttl_seconds=settings.STAGE_MEMO_TTL_SECONDS
+)
+
+# Reanálise (ex: scripts/maintence/reanalyze_low_confidence_articles.py): todos os estágios são
+# executados de novo, sem consultar a memoização, que é regravada com os resultados novos.
+# ContextVar: vale só para a tarefa (e subtarefas) que a ativou.
+bypass_stage_memo: ContextVar[bool] = ContextVar("bypass_stage_memo", default=False)
+
+# Mesmas verificações de integridade do ConflictDetector: um resultado que as reprovaria
+# não é memoizado, para que a reanálise execute esse estágio de novo.
+STAGE_INTEGRITY_CHECKS = {
+    "Resumo": lambda result: bool(result.get("summary")),
+    "Entidades": lambda result: bool(result.get("entidades_identificadas")),
+    "Sentimento": lambda result: result.get("sentiment_score") is not None,
+    "Stakeholders": lambda result: bool(result.get("stakeholder_analysis")),
+    "Maslow": lambda result: result.get("score_maslow") is not None,
+}
+
+# Pool de processos das métricas quantitativas (QUANT_METRICS_MODE="process"), criado sob demanda
+_quant_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_quant_executor() -> ProcessPoolExecutor:
+    global _quant_executor
+    if _quant_executor is None:
+        _quant_executor = ProcessPoolExecutor(max_workers=settings.QUANT_METRICS_PROCESS_WORKERS)
+    return _quant_executor
+
 
 class AgenteGerenciadorAnalise(BaseAgent):
     """
@@ -54,6 +90,74 @@ class AgenteGerenciadorAnalise(BaseAgent):
         super().__init__(name=name, description=description)
         self.auditor_agent = AgenteAuditorQualidade_ADK 
 
+    @staticmethod
+    def process_result(result, agent_name):
+        """Converte a resposta bruta (ou exceção) de um sub-agente em dict, com {"erro": ...} em caso de falha."""
+        if isinstance(result, Exception):
+            error_msg = f"Erro no sub-agente '{agent_name}': {result.__class__.__name__} - {result}"
+            settings.logger.error(f"{error_msg}\n{traceback.format_exc()}")
+            return {"erro": error_msg}
+        
+        raw_response_text = result # 'result' aqui é o texto bruto retornado por run_agent_and_get_final_response
+
+        # <<< ADICIONAR ESTA LINHA DE LOG >>>
+        settings.logger.info(f"Sub-agente '{agent_name}' respondeu (texto bruto antes do parse): {raw_response_text[:500]}...") # Loga os primeiros 500 caracteres
+
+        parsed_json = parse_llm_json_response(raw_response_text) # Passa o texto bruto para parser
+        if not parsed_json:
+            settings.logger.warning(f"Resposta inválida ou vazia do agente '{agent_name}'.")
+            return {"erro": f"Resposta inválida ou vazia do agente '{agent_name}'"}
+        return parsed_json
+
+    async def _run_stage(self, stage_name: str, sub_agent, input_text: str, session_id: str) -> dict:
+        """
+        Executa um estágio (sub-agente) com memoização por (estágio, versão do prompt, hash da entrada).
+        Resultados válidos ficam gravados e são reaproveitados quando o artigo volta para a fila;
+        com bypass_stage_memo ativo o estágio sempre é executado e a memoização é sobrescrita.
+        """
+        if bypass_stage_memo.get():
+            # Descarta o resultado antigo: se o novo não puder ser memoizado, nada fica para ser reaproveitado
+            await stage_memo.adelete(stage_name, sub_agent, input_text)
+            memoized = None
+        else:
+            memoized = await stage_memo.aget(stage_name, sub_agent, input_text)
+        if memoized is not None:
+            settings.logger.info(f"Gerente: estágio '{stage_name}' reaproveitado da memoização (sub-agente não executado).")
+            return memoized
+
+        try:
+            message = Content(role='user', parts=[Part(text=input_text)])
+            raw_result = await run_agent_and_get_final_response(sub_agent, message, session_id)
+        except Exception as e:
+            raw_result = e
+
+        result = self.process_result(raw_result, stage_name)
+        integrity_check = STAGE_INTEGRITY_CHECKS.get(stage_name)
+        if integrity_check is None or integrity_check(result):
+            await stage_memo.aset(stage_name, sub_agent, input_text, result)
+        return result
+
+    async def _run_quantitative_stage(self, input_text: str) -> dict:
+        """
+        Calcula a analise_quantitativa. As métricas são determinísticas (analyze_text_metrics),
+        então por padrão são calculadas diretamente, sem Runner/sessão do ADK; o
+        SubAgenteQuantitativo_ADK só é usado com QUANT_METRICS_MODE="agent".
+        """
+        mode = settings.QUANT_METRICS_MODE
+        if mode == "agent":
+            return await self._run_stage("Quantitativo", SubAgenteQuantitativo_ADK, input_text, "analise_quantitativa")
+
+        try:
+            if mode == "process":
+                loop = asyncio.get_running_loop()
+                metrics = await loop.run_in_executor(_get_quant_executor(), analyze_text_metrics, input_text)
+            else:
+                metrics = await asyncio.to_thread(analyze_text_metrics, input_text)
+        except Exception as e:
+            return self.process_result(e, "Quantitativo")
+        # Mesmo formato do caminho via agente (que serializa o dict em JSON e o relê)
+        return json.loads(json.dumps(metrics, ensure_ascii=False))
+
     async def _run_async_impl(self, context):
         # A entrada para o Gerenciador é o texto puro do artigo
         text_to_analyze = context.user_content.parts[0].text
@@ -63,37 +167,12 @@ class AgenteGerenciadorAnalise(BaseAgent):
         # --- ETAPA 1: Análise Primária em Paralelo ---
         settings.logger.info("Gerente: Iniciando Etapa 1 (Quant, Entidades, Resumo).")
         
-        # <<< CORREÇÃO AQUI: Criar um Content object para CADA chamada de sub-agente da Etapa 1 >>>
-        message_for_sub_agents_etapa1 = Content(role='user', parts=[Part(text=text_to_analyze)])
-
-        tasks_etapa1 = [
-            run_agent_and_get_final_response(SubAgenteQuantitativo_ADK, message_for_sub_agents_etapa1, "analise_quantitativa"),
-            run_agent_and_get_final_response(SubAgenteIdentificadorEntidades_ADK, message_for_sub_agents_etapa1, "analise_entidades"),
-            run_agent_and_get_final_response(SubAgenteResumo_ADK, message_for_sub_agents_etapa1, "analise_resumo")
-        ]
-        results1_raw = await asyncio.gather(*tasks_etapa1, return_exceptions=True)
-        
-        # Função auxiliar para processar resultados e capturar exceções (já existente)
-        def process_result(result, agent_name):
-            if isinstance(result, Exception):
-                error_msg = f"Erro no sub-agente '{agent_name}': {result.__class__.__name__} - {result}"
-                settings.logger.error(f"{error_msg}\n{traceback.format_exc()}")
-                return {"erro": error_msg}
-            
-            raw_response_text = result # 'result' aqui é o texto bruto retornado por run_agent_and_get_final_response
-
-            # <<< ADICIONAR ESTA LINHA DE LOG >>>
-            settings.logger.info(f"Sub-agente '{agent_name}' respondeu (texto bruto antes do parse): {raw_response_text[:500]}...") # Loga os primeiros 500 caracteres
-
-            parsed_json = parse_llm_json_response(raw_response_text) # Passa o texto bruto para parser
-            if not parsed_json:
-                settings.logger.warning(f"Resposta inválida ou vazia do agente '{agent_name}'.")
-                return {"erro": f"Resposta inválida ou vazia do agente '{agent_name}'"}
-            return parsed_json
-
-        quant_res = process_result(results1_raw[0], "Quantitativo")
-        entidades_res = process_result(results1_raw[1], "Entidades")
-        resumo_res = process_result(results1_raw[2], "Resumo")
+        # Cada estágio consulta primeiro a memoização: em retentativas só roda o que falhou ou falta
+        quant_res, entidades_res, resumo_res = await asyncio.gather(
+            self._run_quantitative_stage(text_to_analyze),
+            self._run_stage("Entidades", SubAgenteIdentificadorEntidades_ADK, text_to_analyze, "analise_entidades"),
+            self._run_stage("Resumo", SubAgenteResumo_ADK, text_to_analyze, "analise_resumo")
+        )
         
         yield Event(author=self.name, content=Content(parts=[Part(text="Etapa 1 concluída. Verificando integridade para a Etapa 2.")]))
 
@@ -116,19 +195,13 @@ class AgenteGerenciadorAnalise(BaseAgent):
                 "contexto_dominante": dominant_context
             }, ensure_ascii=False)
 
-            # <<< CORREÇÃO AQUI: Criar um Content object para cada chamada de sub-agente da Etapa 2 >>>
-            message_for_sub_agents_etapa2 = Content(role='user', parts=[Part(text=texto_otimizado_para_etapa2)])
-
-            tasks_etapa2 = [
-                run_agent_and_get_final_response(SubAgenteSentimento_ADK, message_for_sub_agents_etapa2, "analise_sentimento"),
-                run_agent_and_get_final_response(SubAgenteStakeholders_ADK, message_for_sub_agents_etapa2, "analise_stakeholders"),
-                run_agent_and_get_final_response(SubAgenteImpactoMaslow_ADK, message_for_sub_agents_etapa2, "analise_impacto_maslow")
-            ]
-            results2_raw = await asyncio.gather(*tasks_etapa2, return_exceptions=True)
-
-            sentimento_res = process_result(results2_raw[0], "Sentimento")
-            stakeholders_res = process_result(results2_raw[1], "Stakeholders")
-            maslow_res = process_result(results2_raw[2], "Maslow")
+            # Como o texto da Etapa 2 é derivado do resumo/entidades, um resumo reaproveitado da
+            # memoização gera a mesma entrada e também reaproveita os resultados da Etapa 2.
+            sentimento_res, stakeholders_res, maslow_res = await asyncio.gather(
+                self._run_stage("Sentimento", SubAgenteSentimento_ADK, texto_otimizado_para_etapa2, "analise_sentimento"),
+                self._run_stage("Stakeholders", SubAgenteStakeholders_ADK, texto_otimizado_para_etapa2, "analise_stakeholders"),
+                self._run_stage("Maslow", SubAgenteImpactoMaslow_ADK, texto_otimizado_para_etapa2, "analise_impacto_maslow")
+            )
 
         yield Event(author=self.name, content=Content(parts=[Part(text="Etapa 2 concluída. Consolidando resultados iniciais.")]))
 
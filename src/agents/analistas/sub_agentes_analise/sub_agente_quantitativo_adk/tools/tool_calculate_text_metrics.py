@@ -1,70 +1,68 @@
 # -*- coding: utf-8 -*-
 
-import nltk
-from nltk.stem import RSLPStemmer
-from nltk.corpus import stopwords
 import string
 import math
-import json
-from pathlib import Path
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
 from collections import Counter
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional
 
 from config import settings
+from src.utils.nlp_resources import (
+    get_financial_keyword_stems, get_stemmer, get_stop_words, word_tokenize
+)
 
-# --- Bloco de Setup de PLN e Carregamento de Keywords (CORRIGIDO) ---
+# --- Bloco de Setup de PLN ---
+# Nada é carregado no import: tokenizador, stopwords, stemmer e keywords são resolvidos no
+# primeiro uso por src.utils.nlp_resources, a partir dos dados locais do NLTK.
 
-def setup_nltk_resources():
-    """
-    Garante que os recursos NLTK necessários, incluindo a correção para 'punkt_tab',
-    estejam presentes.
-    """
-    # Lista de pacotes que vamos garantir que existam
-    packages = ['punkt', 'stopwords', 'rslp', 'punkt_tab']
+# Radicais memoizados: o vocabulário se repete muito entre notícias, então o RSLP
+# (lento, baseado em regras) roda uma vez por palavra distinta e não por token.
+STEM_CACHE_SIZE = 200_000
 
-    for package in packages:
-        try:
-            # Tentativa de download silencioso. Se já existir, não faz nada.
-            # Se não existir, baixa.
-            nltk.download(package, quiet=True)
-            settings.logger.info(f"Recurso NLTK '{package}' verificado/baixado com sucesso.")
-        except Exception as e:
-            # Loga um erro se o download falhar por algum motivo (ex: sem internet)
-            settings.logger.error(f"Falha ao baixar o recurso NLTK '{package}': {e}")
 
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def _stem(word: str) -> str:
+    return get_stemmer().stem(word)
 
-# A chamada no final do arquivo deve permanecer ou ser adicionada:
-setup_nltk_resources()
+# --- Fim do Bloco de Setup ---
 
 
-def load_and_process_keywords() -> set:
-    """
-    Carrega as keywords do arquivo JSON, junta todas as categorias em uma
-    única lista e retorna um set com as palavras stemizadas.
-    """
-    try:
-        # O caminho para o nosso JSON de configuração
-        config_path = settings.BASE_DIR / "config" / "financial_keywords.json"
-        
-        with open(config_path, 'r', encoding='utf-8') as f:
-            keywords_by_category = json.load(f)
-        
-        all_keywords = [kw for sublist in keywords_by_category.values() for kw in sublist]
-        
-        stemmer = RSLPStemmer()
-        processed_keywords = {stemmer.stem(kw) for kw in all_keywords}
-        
-        settings.logger.info(f"Carregadas e processadas {len(processed_keywords)} keywords financeiras únicas.")
-        return processed_keywords
-    except Exception as e:
-        settings.logger.error(f"Falha ao carregar ou processar o arquivo de keywords: {e}", exc_info=True)
-        return set()
+def _compute_text_metrics(text: str) -> Dict[str, Any]:
+    text_lower = text.lower()
+    all_words = word_tokenize(text_lower)
+    token_counts = Counter(all_words)
 
-# Carrega e processa as keywords uma vez quando o módulo é importado
-PROCESSED_KEYWORDS = load_and_process_keywords()
-STEMMER = RSLPStemmer()
+    # 1. Cálculo de Entropia
+    stop_words = get_stop_words()
+    meaningful_words = [word for word in all_words if word.isalpha() and word not in stop_words]
 
-# --- Fim do Bloco de Setup ---
+    absolute_entropy, relative_entropy, meaningful_word_count, unique_word_count = 0.0, 0.0, 0, 0
+    if meaningful_words:
+        # Mesma ordem de soma do FreqDist (ordem de primeira ocorrência), para resultados idênticos
+        freq = Counter(meaningful_words)
+        meaningful_word_count = len(meaningful_words)
+        unique_word_count = len(freq)
+
+        entropy_val = -sum((p/meaningful_word_count) * math.log2(p/meaningful_word_count) for p in freq.values())
+        absolute_entropy = entropy_val
+
+        max_entropy = math.log2(unique_word_count) if unique_word_count > 1 else 0
+        relative_entropy = entropy_val / max_entropy if max_entropy > 0 else 0
+
+    # 2. Contagem de Palavras-Chave (usando a lista carregada do JSON), um radical por token distinto
+    keyword_stems = get_financial_keyword_stems()
+    keyword_count = sum(count for word, count in token_counts.items() if _stem(word) in keyword_stems)
+
+    return {
+        "status": "success",
+        "shannon_absolute_entropy": round(absolute_entropy, 4),
+        "shannon_relative_entropy": round(relative_entropy, 4),
+        "meaningful_word_count": meaningful_word_count,
+        "unique_word_count": unique_word_count,
+        "financial_keyword_count": float(keyword_count),
+        "total_word_count": len(all_words)
+    }
 
 
 def analyze_text_metrics(text: str) -> Dict[str, Any]:
@@ -75,38 +73,32 @@ def analyze_text_metrics(text: str) -> Dict[str, Any]:
         return {"status": "error", "message": "Texto de entrada inválido ou vazio."}
 
     try:
-        text_lower = text.lower()
-        all_words = nltk.word_tokenize(text_lower, language='portuguese')
-        
-        # 1. Cálculo de Entropia
-        stop_words = set(stopwords.words('portuguese'))
-        meaningful_words = [word for word in all_words if word.isalpha() and word not in stop_words]
-
-        absolute_entropy, relative_entropy, meaningful_word_count, unique_word_count = 0.0, 0.0, 0, 0
-        if meaningful_words:
-            freq = nltk.FreqDist(meaningful_words)
-            meaningful_word_count = len(meaningful_words)
-            unique_word_count = len(freq)
-            
-            entropy_val = -sum((p/meaningful_word_count) * math.log2(p/meaningful_word_count) for p in freq.values())
-            absolute_entropy = entropy_val
-
-            max_entropy = math.log2(unique_word_count) if unique_word_count > 1 else 0
-            relative_entropy = entropy_val / max_entropy if max_entropy > 0 else 0
-
-        # 2. Contagem de Palavras-Chave (usando a lista carregada do JSON)
-        keyword_count = sum(1 for word in all_words if STEMMER.stem(word) in PROCESSED_KEYWORDS)
-
-        return {
-            "status": "success",
-            "shannon_absolute_entropy": round(absolute_entropy, 4),
-            "shannon_relative_entropy": round(relative_entropy, 4),
-            "meaningful_word_count": meaningful_word_count,
-            "unique_word_count": unique_word_count,
-            "financial_keyword_count": float(keyword_count),
-            "total_word_count": len(all_words)
-        }
-        
+        return _compute_text_metrics(text)
     except Exception as e:
         settings.logger.error(f"Erro ao calcular métricas do texto: {e}", exc_info=True)
-        return {"status": "error", "message": str(e)}
\ No newline at end of file
+        return {"status": "error", "message": str(e)}
+
+
+def _analyze_chunk(texts: List[str]) -> List[Dict[str, Any]]:
+    return [analyze_text_metrics(text) for text in texts]
+
+
+def analyze_text_metrics_batch(texts: Iterable[str], processes: Optional[int] = None,
+                               chunksize: int = 64, executor: Optional[Executor] = None) -> List[Dict[str, Any]]:
+    """
+    Calcula as métricas de muitos textos, na mesma ordem, com resultados idênticos a
+    analyze_text_metrics. No próprio processo os textos compartilham o cache de radicais e as
+    stopwords; com `executor` (ou `processes` > 1) os textos são distribuídos em pedaços de
+    `chunksize` entre processos, cada um com seu próprio cache. Quem chama várias vezes deve
+    passar um `executor` criado uma vez para a execução inteira: assim os processos (e os
+    caches de radicais e recursos do NLTK já carregados) são reaproveitados entre as chamadas.
+    """
+    texts = list(texts)
+    if (executor is None and (not processes or processes <= 1)) or len(texts) <= chunksize:
+        return _analyze_chunk(texts)
+
+    chunks = [texts[i:i + chunksize] for i in range(0, len(texts), chunksize)]
+    if executor is not None:
+        return [metrics for chunk_metrics in executor.map(_analyze_chunk, chunks) for metrics in chunk_metrics]
+    with ProcessPoolExecutor(max_workers=processes) as own_executor:
+        return [metrics for chunk_metrics in own_executor.map(_analyze_chunk, chunks) for metrics in chunk_metrics]
@@ -3,10 +3,9 @@ from pathlib import Path
 from datetime import datetime, date, timedelta
 from config import settings
 from src.data_collection.macro_data.eia_collector import EIACollector
-from src.database.db_utils import (
-    get_db_session, get_or_create_indicator_id, get_or_create_data_source, 
-    batch_upsert_indicator_values, get_latest_effective_date
-)
+from src.database.db_utils import get_db_session, get_dimension_registry
+from src.database.indicator_ingest import concat_indicator_frames, series_to_frame, upsert_indicator_frame
+from src.database.watermarks import IndicatorWatermarks
 
 logger = settings.logger
 
@@ -34,11 +33,24 @@ def collect_and_store_eia_indicators() -> str:
     session = get_db_session()
     try:
         collector = EIACollector(api_key=settings.EIA_API_KEY)
-        eia_source_id = get_or_create_data_source(session, "EIA")
+        registry = get_dimension_registry()
+        eia_source_id = registry.data_source_id(session, "EIA")
+        watermarks = IndicatorWatermarks.load(session, eia_source_id) # Uma consulta para todas as séries da fonte
         all_data_to_upsert = []
         
-        for task in manifest:
-            if not task.get("enabled", False): continue
+        # Indicadores do manifesto resolvidos de uma vez (um único INSERT ... ON CONFLICT para os ausentes)
+        enabled_tasks = [task for task in manifest if task.get("enabled", False) and task.get("db_indicator_name")]
+        indicator_ids = registry.ensure_indicators(session, [
+            {
+                "indicator_name": task['db_indicator_name'],
+                "indicator_type": task.get('db_indicator_type', 'Macroeconomia'),
+                "unit": task.get('db_indicator_unit', 'N/A'),
+                "frequency": task.get('db_indicator_frequency', 'N/A'),
+                "econ_data_source_id": eia_source_id
+            } for task in enabled_tasks
+        ])
+        for task, indicator_id in zip(enabled_tasks, indicator_ids):
+            if not indicator_id: continue
 
             params = task.get("params", {})
             series_id = params.get("facet_series_id")
@@ -46,16 +58,7 @@ def collect_and_store_eia_indicators() -> str:
             
             if not all([series_id, db_indicator_name]): continue
 
-            indicator_id = get_or_create_indicator_id(
-                session=session, indicator_name=db_indicator_name,
-                indicator_type=task.get('db_indicator_type', 'Macroeconomia'),
-                unit=task.get('db_indicator_unit', 'N/A'),
-                frequency=task.get('db_indicator_frequency', 'N/A'),
-                econ_data_source_id=eia_source_id
-            )
-            if not indicator_id: continue
-
-            last_date = get_latest_effective_date(session, indicator_id)
+            last_date = watermarks.get(indicator_id)
             start_date_obj = (last_date + timedelta(days=1)) if last_date else datetime.strptime(params.get("initial_history_start_date", "1980-01-01"), '%Y-%m-%d').date()
             
             if start_date_obj > date.today():
@@ -71,18 +74,12 @@ def collect_and_store_eia_indicators() -> str:
             )
             if df.empty: continue
 
-            for _, row in df.iterrows():
-                all_data_to_upsert.append({
-                    "indicator_id": indicator_id, "company_id": None,
-                    "effective_date": row['date'].date(),
-                    "value_numeric": float(row['value']),
-                    "value_text": None, "segment_id": None
-                })
+            all_data_to_upsert.append(series_to_frame(df, indicator_id)) # Série inteira, sem iterrows
 
         if not all_data_to_upsert:
             return "Coleta concluída, nenhum dado novo para ser inserido."
         
-        rows_affected = batch_upsert_indicator_values(session, all_data_to_upsert)
+        rows_affected = upsert_indicator_frame(session, concat_indicator_frames(all_data_to_upsert), watermarks=watermarks)
         session.commit()
         
         return f"Sucesso! {rows_affected} novos registros de indicadores da EIA inseridos/atualizados."
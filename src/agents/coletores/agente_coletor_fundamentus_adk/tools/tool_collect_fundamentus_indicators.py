@@ -3,10 +3,8 @@ from decimal import Decimal
 from dateutil.parser import parse as parse_date
 from config import settings
 from src.data_collection.market_data.fundamentus_collector import FundamentusCollector
-from src.database.db_utils import (
-    get_db_session, get_all_tickers, get_or_create_indicator_id,
-    get_or_create_data_source, get_company_id_for_ticker, batch_upsert_indicator_values
-)
+from src.database.db_utils import get_db_session, get_all_tickers, get_dimension_registry
+from src.database.indicator_ingest import records_to_frame, upsert_indicator_frame
 
 logger = settings.logger
 
@@ -25,10 +23,18 @@ def collect_and_store_fundamentus_indicators() -> str:
         if not collected_data_by_ticker: return "Coleta concluída, mas nenhum dado novo foi retornado."
 
         data_to_upsert = []
-        fundamentus_source_id = get_or_create_data_source(session, "Fundamentus")
+        registry = get_dimension_registry()
+        fundamentus_source_id = registry.data_source_id(session, "Fundamentus")
         
-        # Mapeia tickers para company_id uma vez para otimização
-        ticker_to_company_id = {ticker: get_company_id_for_ticker(session, ticker) for ticker in tickers}
+        # Mapeia tickers para company_id e nomes de indicadores para indicator_id uma vez, em lote
+        ticker_to_company_id = registry.company_ids(session, tickers)
+        indicator_names = list(dict.fromkeys(item['indicator'] for ticker_data in collected_data_by_ticker for item in ticker_data['indicators']))
+        indicator_name_to_id = dict(zip(indicator_names, registry.ensure_indicators(session, [
+            {
+                "indicator_name": indicator_name, "indicator_type": 'Fundamentalista', "frequency": 'Trimestral',
+                "unit": 'Varia', "econ_data_source_id": fundamentus_source_id
+            } for indicator_name in indicator_names
+        ])))
 
         # Loop externo: um item para cada ticker coletado
         for ticker_data in collected_data_by_ticker:
@@ -49,10 +55,7 @@ def collect_and_store_fundamentus_indicators() -> str:
             for item in ticker_data['indicators']:
                 indicator_name = item['indicator']
                 
-                indicator_id = get_or_create_indicator_id(
-                    session=session, indicator_name=indicator_name, indicator_type='Fundamentalista',
-                    frequency='Trimestral', unit='Varia', econ_data_source_id=fundamentus_source_id
-                )
+                indicator_id = indicator_name_to_id.get(indicator_name)
                 if not indicator_id:
                     logger.error(f"Não foi possível obter ID para o indicador '{indicator_name}' do ticker '{ticker}'.")
                     continue
@@ -73,7 +76,7 @@ def collect_and_store_fundamentus_indicators() -> str:
         
         if not data_to_upsert: return "Dados coletados, mas nenhum registro válido foi preparado para inserção."
 
-        rows_affected = batch_upsert_indicator_values(session, data_to_upsert)
+        rows_affected = upsert_indicator_frame(session, records_to_frame(data_to_upsert))
         session.commit()
         
         return f"Sucesso! Transação concluída. {rows_affected} indicadores do PyFundamentus inseridos/atualizados."
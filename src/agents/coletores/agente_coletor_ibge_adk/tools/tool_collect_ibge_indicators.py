@@ -3,10 +3,8 @@ import os
 from config import settings
 from pathlib import Path
 from src.data_collection.macro_data.ibge_collector import IBGECollector
-from src.database.db_utils import (
-    get_db_session, get_or_create_indicator_id,
-    get_or_create_data_source, batch_upsert_indicator_values
-)
+from src.database.db_utils import get_db_session, get_dimension_registry
+from src.database.indicator_ingest import concat_indicator_frames, series_to_frame, upsert_indicator_frame
 
 logger = settings.logger
 
@@ -33,37 +31,34 @@ def collect_and_store_ibge_indicators() -> str:
     session = get_db_session()
     try:
         collector = IBGECollector()
-        ibge_source_id = get_or_create_data_source(session, "IBGE-SIDRA")
+        registry = get_dimension_registry()
+        ibge_source_id = registry.data_source_id(session, "IBGE-SIDRA")
         all_data_to_upsert = []
         
-        for task in manifest:
-            if not task.get("enabled", False): continue
-            
+        # Indicadores do manifesto resolvidos de uma vez (um único INSERT ... ON CONFLICT para os ausentes)
+        enabled_tasks = [task for task in manifest if task.get("enabled", False)]
+        indicator_ids = registry.ensure_indicators(session, [
+            {
+                "indicator_name": task['db_indicator_name'],
+                "indicator_type": task.get('db_indicator_type', 'Macroeconomia'),
+                "unit": task.get('db_indicator_unit', 'N/A'),
+                "frequency": task.get('db_indicator_frequency', 'Mensal'),
+                "econ_data_source_id": ibge_source_id
+            } for task in enabled_tasks
+        ])
+        for task, indicator_id in zip(enabled_tasks, indicator_ids):
+            if not indicator_id: continue
+
             # O coletor agora recebe a tarefa inteira
             df = collector.get_series(task)
             if df.empty: continue
 
-            indicator_id = get_or_create_indicator_id(
-                session=session, indicator_name=task['db_indicator_name'],
-                indicator_type=task.get('db_indicator_type', 'Macroeconomia'),
-                unit=task.get('db_indicator_unit', 'N/A'),
-                frequency=task.get('db_indicator_frequency', 'Mensal'),
-                econ_data_source_id=ibge_source_id
-            )
-            if not indicator_id: continue
-
-            for _, row in df.iterrows():
-                all_data_to_upsert.append({
-                    "indicator_id": indicator_id, "company_id": None,
-                    "effective_date": row['date'].date(),
-                    "value_numeric": float(row['value']),
-                    "value_text": None, "segment_id": None
-                })
+            all_data_to_upsert.append(series_to_frame(df, indicator_id)) # Série inteira, sem iterrows
 
         if not all_data_to_upsert:
             return "Coleta concluída, mas nenhum registro válido foi preparado para inserção."
         
-        rows_affected = batch_upsert_indicator_values(session, all_data_to_upsert)
+        rows_affected = upsert_indicator_frame(session, concat_indicator_frames(all_data_to_upsert))
         session.commit()
         
         return f"Sucesso! Transação concluída. {rows_affected} registros de indicadores do IBGE inseridos/atualizados."
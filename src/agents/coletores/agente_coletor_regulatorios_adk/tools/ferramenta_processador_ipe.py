@@ -7,14 +7,24 @@ from sqlalchemy.orm import Session
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from config import settings
-from src.database.db_utils import get_db_session, get_or_create_news_source
+from src.database.db_utils import get_db_session, get_dimension_registry
 from src.database.create_db_tables import NewsArticle
 
+IPE_INSERT_CHUNK_SIZE = 1000 # Linhas por INSERT (o Postgres limita os parâmetros por comando)
+
 def tool_process_cvm_ipe_local(caminho_zip_local: str, Codigo_CVM_empresa: str) -> dict:
     """
     Processa um arquivo IPE ZIP local, filtra por uma empresa e salva novos documentos no banco.
     """
-    settings.logger.info(f"Processando arquivo IPE '{caminho_zip_local}' para a empresa CVM: {Codigo_CVM_empresa}")
+    return tool_process_cvm_ipe_local_multi(caminho_zip_local, [Codigo_CVM_empresa])
+
+def tool_process_cvm_ipe_local_multi(caminho_zip_local: str, codigos_cvm: list[str]) -> dict:
+    """
+    Processa um arquivo IPE ZIP local para várias empresas de uma vez: o CSV é lido uma única
+    vez e filtrado pelo conjunto de códigos CVM, e os novos documentos são salvos no banco.
+    """
+    codigos_cvm = {str(codigo) for codigo in codigos_cvm}
+    settings.logger.info(f"Processando arquivo IPE '{caminho_zip_local}' para {len(codigos_cvm)} empresa(s) CVM.")
     
     db_session: Session | None = None
     try:
@@ -26,8 +36,8 @@ def tool_process_cvm_ipe_local(caminho_zip_local: str, Codigo_CVM_empresa: str)
         source_domain_cvm = "cvm.gov.br"
         source_name_cvm = "Comissão de Valores Mobiliários (CVM)"
         credibility_data_mock = {source_domain_cvm: {"source_name": source_name_cvm, "overall_credibility_score": 1}}
-        cvm_source_obj = get_or_create_news_source(db_session, source_domain_cvm, source_name_cvm, credibility_data_mock)
-        if not cvm_source_obj:
+        cvm_source_id = get_dimension_registry().news_source_id(db_session, source_domain_cvm, source_name_cvm, credibility_data_mock)
+        if not cvm_source_id:
             raise Exception("Não foi possível criar a fonte padrão 'CVM' no banco de dados.")
 
         with zipfile.ZipFile(caminho_zip_local, 'r') as z:
@@ -40,7 +50,7 @@ def tool_process_cvm_ipe_local(caminho_zip_local: str, Codigo_CVM_empresa: str)
                 for chunk in chunk_iterator:
                     
                     chunk.columns = [str(col).strip() for col in chunk.columns]
-                    df_empresa = chunk[chunk['Codigo_CVM'] == Codigo_CVM_empresa]
+                    df_empresa = chunk[chunk['Codigo_CVM'].isin(codigos_cvm)]
 
                     for row in df_empresa.itertuples():
                         link_documento = getattr(row, 'Link_Download', None)
@@ -62,7 +72,7 @@ def tool_process_cvm_ipe_local(caminho_zip_local: str, Codigo_CVM_empresa: str)
                             "headline": headline_text,
                             "article_link": link_documento,
                             "publication_date": datetime.strptime(str(row.Data_Entrega), '%Y-%m-%d'),
-                            "news_source_id": cvm_source_obj.news_source_id,
+                            "news_source_id": cvm_source_id,
                             "summary": f"Documento Regulatório: {getattr(row, 'Categoria', '')}",
                             "article_type": "Regulatório CVM",
                             "processing_status": 'processed', 
@@ -72,14 +82,16 @@ def tool_process_cvm_ipe_local(caminho_zip_local: str, Codigo_CVM_empresa: str)
                         all_docs_to_insert.append(doc_dict)
         
         if not all_docs_to_insert:
-            return {"status": "success", "message": "Nenhum documento novo para a empresa encontrada."}
+            return {"status": "success", "message": "Nenhum documento novo para as empresas encontrado."}
 
-        stmt = pg_insert(NewsArticle).values(all_docs_to_insert)
-        stmt = stmt.on_conflict_do_nothing(index_elements=['article_link'])
-        result = db_session.execute(stmt)
+        inserted = 0
+        for start in range(0, len(all_docs_to_insert), IPE_INSERT_CHUNK_SIZE):
+            stmt = pg_insert(NewsArticle).values(all_docs_to_insert[start:start + IPE_INSERT_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_nothing(index_elements=['article_link'])
+            inserted += db_session.execute(stmt).rowcount
         db_session.commit()
         
-        return {"status": "success", "message": f"{result.rowcount} novos documentos regulatórios inseridos."}
+        return {"status": "success", "message": f"{inserted} novos documentos regulatórios inseridos."}
 
     except Exception as e:
         if db_session: db_session.rollback()
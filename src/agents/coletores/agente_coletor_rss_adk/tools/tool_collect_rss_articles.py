@@ -6,7 +6,7 @@ import time
 from sqlalchemy.orm import Session
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from config import settings
-from src.database.db_utils import get_db_session, get_company_id_for_ticker, get_segment_id_by_name
+from src.database.db_utils import get_db_session, get_dimension_registry
 from src.database.create_db_tables import NewsArticle, NewsArticleCompanyLink, NewsArticleSegmentLink
 from src.data_collection.news_data.news_rss_collector import RSSCollector
 
@@ -56,19 +56,23 @@ def tool_collect_rss_articles() -> dict:
         
         # Etapa B: Criar os Vínculos
         links_created = 0
+        registry = get_dimension_registry()
+        # IDs dos artigos inseridos (ou já existentes), numa única consulta
+        article_links = [article_dict['article_link'] for article_dict in all_article_dicts]
+        link_to_article_id = dict(db_session.query(NewsArticle.article_link, NewsArticle.news_article_id).filter(NewsArticle.article_link.in_(article_links)).all())
         for article_dict, target_ticker, target_segment in all_prepared_data:
-            article_id = db_session.query(NewsArticle.news_article_id).filter(NewsArticle.article_link == article_dict['article_link']).scalar()
+            article_id = link_to_article_id.get(article_dict['article_link'])
             if not article_id: continue
 
             if target_ticker:
-                company_id = get_company_id_for_ticker(db_session, target_ticker)
+                company_id = registry.company_id(db_session, target_ticker)
                 if company_id:
                     link_stmt = pg_insert(NewsArticleCompanyLink).values(news_article_id=article_id, company_id=company_id).on_conflict_do_nothing()
                     db_session.execute(link_stmt)
                     links_created +=1
             
             if target_segment:
-                segment_id = get_segment_id_by_name(db_session, target_segment)
+                segment_id = registry.segment_id(db_session, target_segment)
                 if segment_id:
                     link_stmt = pg_insert(NewsArticleSegmentLink).values(news_article_id=article_id, segment_id=segment_id).on_conflict_do_nothing()
                     db_session.execute(link_stmt)
@@ -5,11 +5,11 @@ from datetime import datetime, date, timedelta # Adicionado timedelta
 import pandas as pd
 from config import settings
 from src.data_collection.market_data.yfinance_collector import YFinanceCollector
-from src.database.db_utils import (
-    get_db_session, get_all_tickers, get_or_create_indicator_id,
-    get_or_create_data_source, get_company_id_for_ticker, 
-    batch_upsert_indicator_values, get_latest_effective_date # Adicionado get_latest_effective_date
+from src.database.db_utils import get_db_session, get_all_tickers, get_dimension_registry
+from src.database.indicator_ingest import (
+    concat_indicator_frames, indexed_series_to_frame, records_to_frame, upsert_indicator_frame
 )
+from src.database.watermarks import IndicatorWatermarks
 
 logger = settings.logger
 
@@ -23,6 +23,43 @@ except NameError:
 # --- FIM DO BLOCO ---
 
 
+def _incremental_start(last_date: date | None, params: dict) -> date | None:
+    """
+    Data inicial da coleta: o dia seguinte ao último dado gravado. Sem histórico no banco,
+    usa params["initial_history_start_date"] se configurado, senão None (coleta pelo `period`).
+    """
+    if last_date:
+        return last_date + timedelta(days=1)
+    initial_start = params.get("initial_history_start_date")
+    return datetime.strptime(initial_start, '%Y-%m-%d').date() if initial_start else None
+
+
+def _download_window(start_dates: list, params: dict) -> tuple:
+    """Janela (start, period) do download de um ticker: cobre a coluna mais atrasada."""
+    if any(start is None for start in start_dates):
+        return None, params.get("period", "1y")
+    return min(start_dates).strftime('%Y-%m-%d'), None
+
+
+def _download_end() -> str:
+    """Fim da janela de download (exclusivo no yfinance): amanhã, para incluir o pregão de hoje."""
+    return (date.today() + timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def _history_frame(series: pd.Series, indicator_id: int, company_id: int | None, start_date: date | None) -> pd.DataFrame:
+    """Valores de EconomicIndicatorValues de uma coluna do histórico, a partir de `start_date`."""
+    series = series.dropna()
+    if start_date is not None:
+        series = series[series.index >= pd.Timestamp(start_date, tz=series.index.tz)]
+    return indexed_series_to_frame(series, indicator_id, company_id)
+
+
+def _daily_indicator_spec(indicator_name: str, indicator_type: str, unit: str, source_id: int) -> dict:
+    """Parâmetros de DimensionRegistry.ensure_indicators para um indicador diário do YFinance."""
+    return {"indicator_name": indicator_name, "indicator_type": indicator_type, "frequency": 'Diário',
+            "unit": unit, "econ_data_source_id": source_id}
+
+
 def collect_and_store_yfinance_indicators() -> str:
     """
     Ferramenta inteligente que lê um manifesto, busca tickers do banco
@@ -41,10 +78,12 @@ def collect_and_store_yfinance_indicators() -> str:
     session = get_db_session()
     try:
         company_tickers = get_all_tickers(session)
-        yfinance_source_id = get_or_create_data_source(session, "YFinance")
-        ticker_to_company_id = {ticker: get_company_id_for_ticker(session, ticker) for ticker in company_tickers}
+        registry = get_dimension_registry()
+        yfinance_source_id = registry.data_source_id(session, "YFinance")
+        watermarks = IndicatorWatermarks.load(session, yfinance_source_id) # Uma consulta para todas as séries da fonte
+        ticker_to_company_id = registry.company_ids(session, company_tickers)
         
-        all_data_to_upsert = []
+        all_data_to_upsert = [] # DataFrames de INDICATOR_VALUE_COLUMNS, gravados juntos no final
         collector = YFinanceCollector()
 
         # --- Processar Templates para Empresas ---
@@ -54,48 +93,40 @@ def collect_and_store_yfinance_indicators() -> str:
                 data_type = template["yfinance_data_type"]
                 params = template.get("params", {})
                 
-                # Modificação para 'HISTORY' - Aplica a lógica incremental
+                # Modificação para 'HISTORY' - Aplica a lógica incremental, com um download em lote por janela
                 if data_type == "HISTORY":
+                    # 1. Indicador (todos resolvidos de uma vez) e data inicial de cada (ticker, coluna)
+                    series_keys, specs = [], []
                     for ticker in company_tickers:
                         company_id = ticker_to_company_id.get(ticker)
                         if not company_id: continue
-
                         for col_name, col_config in template["value_columns"].items():
                             indicator_name = f"{ticker} {col_config['db_indicator_name_suffix']}"
-                            indicator_id = get_or_create_indicator_id(session, indicator_name, col_config['db_indicator_type'], 'Diário', col_config.get('db_indicator_unit', 'N/A'), yfinance_source_id)
-                            if not indicator_id: continue
-
-                            # Lógica incremental para 'HISTORY'
-                            last_date = get_latest_effective_date(session, indicator_id)
-                            # A data inicial para a API será o dia seguinte à última data, ou 1980-01-01 se não houver dados
-                            start_date_obj = (last_date + timedelta(days=1)) if last_date else datetime.strptime(params.get("initial_history_start_date", "1980-01-01"), '%Y-%m-%d').date()
-
-                            if start_date_obj > date.today():
-                                logger.info(f"Dados para '{indicator_name}' já estão atualizados. Pulando coleta histórica.")
-                                continue # Pula a coleta para este indicador/ticker se já estiver atualizado
-                            
-                            # Fetch data for a single ticker and period
-                            df = collector.fetch_data([ticker], data_type, {
-                                "start": start_date_obj.strftime('%Y-%m-%d'),
-                                "end": date.today().strftime('%Y-%m-%d'),
-                                **params # Mantém outros parâmetros do template
-                            })
-                            if not df or ticker not in df: continue
-                            
-                            df_ticker = df[ticker] # Pega o DataFrame específico do ticker
-                            if df_ticker.empty or col_name not in df_ticker.columns: continue
-
-                            for date_idx, row in df_ticker.iterrows():
-                                value = row[col_name]
-                                if pd.isna(value): continue
-                                all_data_to_upsert.append({
-                                    "indicator_id": indicator_id, 
-                                    "company_id": company_id, 
-                                    "effective_date": date_idx.date(), # Usar date_idx.date() para garantir tipo date
-                                    "value_numeric": float(value), 
-                                    "value_text": None, 
-                                    "segment_id": None
-                                })
+                            series_keys.append((ticker, company_id, col_name, indicator_name))
+                            specs.append(_daily_indicator_spec(indicator_name, col_config['db_indicator_type'], col_config.get('db_indicator_unit', 'N/A'), yfinance_source_id))
+
+                    columns_by_ticker = {}
+                    for (ticker, company_id, col_name, indicator_name), indicator_id in zip(series_keys, registry.ensure_indicators(session, specs)):
+                        if not indicator_id: continue
+
+                        start_date_obj = _incremental_start(watermarks.get(indicator_id, company_id), params) # Valores gravados com o company_id
+                        if start_date_obj and start_date_obj > date.today():
+                            logger.info(f"Dados para '{indicator_name}' já estão atualizados. Pulando coleta histórica.")
+                            continue # Pula a coleta para este indicador/ticker se já estiver atualizado
+                        columns_by_ticker.setdefault(ticker, {})[col_name] = (indicator_id, start_date_obj)
+
+                    # 2. Um yf.download por janela (tickers agrupados pela data inicial), colunas separadas localmente
+                    windows = {
+                        ticker: _download_window([start for _, start in columns.values()], params)
+                        for ticker, columns in columns_by_ticker.items()
+                    }
+                    history = collector.fetch_history_grouped(windows, end=_download_end())
+                    for ticker, columns in columns_by_ticker.items():
+                        df_ticker = history.get(ticker)
+                        if df_ticker is None or df_ticker.empty: continue
+                        for col_name, (indicator_id, start_date_obj) in columns.items():
+                            if col_name not in df_ticker.columns: continue
+                            all_data_to_upsert.append(_history_frame(df_ticker[col_name], indicator_id, ticker_to_company_id[ticker], start_date_obj))
                 
                 elif data_type == "INFO":
                     # Coleta INFO: não há necessidade de lógica incremental por data,
@@ -103,6 +134,7 @@ def collect_and_store_yfinance_indicators() -> str:
                     today_date = datetime.now().date()
                     raw_data_company = collector.fetch_data(company_tickers, data_type, params)
                     if not raw_data_company: continue
+                    info_values, specs = [], []
 
                     for ticker, info_dict in raw_data_company.items():
                         company_id = ticker_to_company_id.get(ticker)
@@ -111,56 +143,56 @@ def collect_and_store_yfinance_indicators() -> str:
                             raw_value = info_dict.get(field_name)
                             if raw_value is None: continue
                             indicator_name = f"{ticker} {field_config['db_indicator_name_suffix']}"
-                            indicator_id = get_or_create_indicator_id(session, indicator_name, field_config['db_indicator_type'], 'Diário', field_config.get('db_indicator_unit', 'N/A'), yfinance_source_id)
-                            if not indicator_id: continue
-                            numeric_value, text_value = None, str(raw_value)
-                            try:
-                                numeric_value = float(raw_value)
-                                text_value = None
-                            except (ValueError, TypeError): pass
-                            all_data_to_upsert.append({"indicator_id": indicator_id, "company_id": company_id, "effective_date": today_date, "value_numeric": numeric_value, "value_text": text_value, "segment_id": None})
+                            info_values.append((company_id, raw_value))
+                            specs.append(_daily_indicator_spec(indicator_name, field_config['db_indicator_type'], field_config.get('db_indicator_unit', 'N/A'), yfinance_source_id))
+
+                    info_records = []
+                    for (company_id, raw_value), indicator_id in zip(info_values, registry.ensure_indicators(session, specs)):
+                        if not indicator_id: continue
+                        numeric_value, text_value = None, str(raw_value)
+                        try:
+                            numeric_value = float(raw_value)
+                            text_value = None
+                        except (ValueError, TypeError): pass
+                        info_records.append({"indicator_id": indicator_id, "company_id": company_id, "effective_date": today_date, "value_numeric": numeric_value, "value_text": text_value, "segment_id": None})
+                    all_data_to_upsert.append(records_to_frame(info_records))
 
         
         # --- Processar Tarefas Macro ---
         logger.info("Iniciando coleta de dados para indicadores macro...")
-        for task in manifest.get("macro_indicator_tasks", []):
-            task_params = task.get("params", {})
-            macro_ticker = task_params.get("ticker_symbol")
-            if not macro_ticker: continue
-
-            value_col = task_params.get("value_column_yfinance", "Close")
-            indicator_id = get_or_create_indicator_id(session, task['db_indicator_name'], 'Índice de Mercado', 'Diário', 'Pontos', yfinance_source_id)
+        macro_columns = {} # ticker -> (indicator_id, coluna, data inicial)
+        macro_windows = {}
+        macro_tasks = [task for task in manifest.get("macro_indicator_tasks", []) if task.get("params", {}).get("ticker_symbol")]
+        macro_indicator_ids = registry.ensure_indicators(session, [
+            _daily_indicator_spec(task['db_indicator_name'], 'Índice de Mercado', 'Pontos', yfinance_source_id) for task in macro_tasks
+        ])
+        for task, indicator_id in zip(macro_tasks, macro_indicator_ids):
             if not indicator_id: continue
+            task_params = task["params"]
+            macro_ticker = task_params["ticker_symbol"]
+            value_col = task_params.get("value_column_yfinance", "Close")
 
             # Lógica incremental para indicadores macro
-            last_date = get_latest_effective_date(session, indicator_id)
-            # A data inicial para a API será o dia seguinte à última data, ou a data de início do histórico inicial
-            start_date_obj = (last_date + timedelta(days=1)) if last_date else datetime.strptime(task_params.get("initial_history_start_date", "1980-01-01"), '%Y-%m-%d').date()
-
-            if start_date_obj > date.today():
+            start_date_obj = _incremental_start(watermarks.get(indicator_id), task_params)
+            if start_date_obj and start_date_obj > date.today():
                 logger.info(f"Dados para '{task['db_indicator_name']}' já estão atualizados. Pulando coleta histórica.")
                 continue # Pula a coleta para este indicador macro se já estiver atualizado
 
-            raw_data_macro = collector.fetch_data([macro_ticker], "HISTORY", {
-                "start": start_date_obj.strftime('%Y-%m-%d'),
-                "end": date.today().strftime('%Y-%m-%d'),
-                **task_params # Mantém outros parâmetros da tarefa
-            })
-            if not raw_data_macro or macro_ticker not in raw_data_macro: continue
-            
-            df_macro = raw_data_macro[macro_ticker]
-            if df_macro.empty or value_col not in df_macro.columns: continue
-
-            for date_idx, row in df_macro.iterrows():
-                value = row[value_col]
-                if pd.isna(value): continue
-                all_data_to_upsert.append({"indicator_id": indicator_id, "company_id": None, "effective_date": date_idx.date(), "value_numeric": float(value), "value_text": None, "segment_id": None})
+            macro_columns[macro_ticker] = (indicator_id, value_col, start_date_obj)
+            macro_windows[macro_ticker] = _download_window([start_date_obj], task_params)
+
+        raw_data_macro = collector.fetch_history_grouped(macro_windows, end=_download_end()) if macro_windows else {}
+        for macro_ticker, (indicator_id, value_col, start_date_obj) in macro_columns.items():
+            df_macro = raw_data_macro.get(macro_ticker)
+            if df_macro is None or df_macro.empty or value_col not in df_macro.columns: continue
+            all_data_to_upsert.append(_history_frame(df_macro[value_col], indicator_id, None, start_date_obj))
 
         
         # --- Persistir Dados ---
-        if not all_data_to_upsert:
+        values_frame = concat_indicator_frames(all_data_to_upsert)
+        if values_frame.empty:
             return "Coleta concluída, mas nenhum registro válido foi preparado para inserção."
-        rows_affected = batch_upsert_indicator_values(session, all_data_to_upsert)
+        rows_affected = upsert_indicator_frame(session, values_frame, watermarks=watermarks)
         session.commit()
         return f"Sucesso! Transação concluída. {rows_affected} registros do YFinance inseridos/atualizados."
 
@@ -64,6 +64,8 @@ lista_de_ferramentas = [
 
 # --- PASSO 2: Definir o Agente Orquestrador Inteligente ---
 # Agora, usamos um LlmAgent, que tem um "cérebro" (o modelo do Vertex AI).
+# Para pedidos ad-hoc em linguagem natural. A coleta de rotina (todas as fontes, em paralelo e
+# sem custo de LLM) é feita por src/pipelines/run_collection_pipeline.py.
 
 
 
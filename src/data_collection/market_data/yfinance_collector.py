@@ -1,3 +1,7 @@
+from collections import defaultdict
+from typing import Optional
+
+import pandas as pd
 import yfinance as yf
 from config import settings
 
@@ -17,14 +21,16 @@ class YFinanceCollector:
             logger.warning("YFinanceCollector: Nenhuma lista de tickers fornecida.")
             return None
 
+        if data_type == "HISTORY":
+            # Histórico em lote: um único yf.download para todos os tickers, respeitando start/end
+            return self.fetch_history(tickers, start=params.get("start"), end=params.get("end"), period=params.get("period", "1y"))
+
         data_by_ticker = {}
         for ticker_symbol in tickers:
             try:
                 ticker_obj = yf.Ticker(ticker_symbol)
                 
-                if data_type == "HISTORY":
-                    data = ticker_obj.history(period=params.get("period", "1y"))
-                elif data_type == "INFO":
+                if data_type == "INFO":
                     data = ticker_obj.info
                 elif data_type == "ACTIONS":
                     data = ticker_obj.actions
@@ -41,4 +47,56 @@ class YFinanceCollector:
                 logger.error(f"Erro ao buscar dados do yfinance para {ticker_symbol}: {e}")
                 continue
                 
-        return data_by_ticker
\ No newline at end of file
+        return data_by_ticker
+
+    def fetch_history(self, tickers: list, start: Optional[str] = None, end: Optional[str] = None,
+                      period: str = "1y") -> dict:
+        """
+        Histórico OHLCV diário de vários tickers com yf.download (multi-ticker, em threads),
+        em lotes de settings.YFINANCE_DOWNLOAD_BATCH_SIZE. Usa start/end quando `start` é dado
+        (o `end` do yfinance é exclusivo), senão `period`. Retorna {ticker: DataFrame} com as
+        mesmas colunas ajustadas de Ticker.history(); tickers sem dados ficam de fora.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        window = {"start": start, "end": end} if start else {"period": period}
+        data_by_ticker = {}
+        batch_size = max(1, settings.YFINANCE_DOWNLOAD_BATCH_SIZE)
+        for i in range(0, len(tickers), batch_size):
+            batch = tickers[i:i + batch_size]
+            try:
+                frame = yf.download(
+                    batch, group_by="ticker", auto_adjust=True, actions=True, threads=True,
+                    progress=False, multi_level_index=True, **window
+                )
+            except Exception as e:
+                logger.error(f"Erro ao baixar o histórico do yfinance para {len(batch)} tickers: {e}")
+                continue
+            if frame is None or frame.empty:
+                logger.debug(f"Nenhum histórico retornado para o lote {batch}.")
+                continue
+
+            available = set(frame.columns.get_level_values(0)) if isinstance(frame.columns, pd.MultiIndex) else set()
+            for ticker_symbol in batch:
+                if ticker_symbol not in available:
+                    logger.debug(f"Nenhum dado do tipo 'HISTORY' retornado para o ticker {ticker_symbol}.")
+                    continue
+                # O download alinha as datas de todos os tickers: descarta as linhas que não são deste ticker
+                data = frame[ticker_symbol].dropna(how="all")
+                if not data.empty:
+                    data_by_ticker[ticker_symbol] = data
+        return data_by_ticker
+
+    def fetch_history_grouped(self, windows: dict, end: Optional[str] = None) -> dict:
+        """
+        Histórico de tickers com janelas diferentes: `windows` mapeia ticker -> (start, period).
+        Tickers com a mesma janela (ex: mesma data incremental) vão no mesmo download.
+        """
+        groups = defaultdict(list)
+        for ticker_symbol, (start, period) in windows.items():
+            groups[(start, period)].append(ticker_symbol)
+
+        data_by_ticker = {}
+        for (start, period), tickers in groups.items():
+            logger.info(f"YFinanceCollector: Baixando histórico de {len(tickers)} tickers ({f'desde {start}' if start else f'período {period}'}).")
+            data_by_ticker.update(self.fetch_history(tickers, start=start, end=end, period=period or "1y"))
+        return data_by_ticker
@@ -13,14 +13,7 @@ import requests
 from bs4 import BeautifulSoup
 from sqlalchemy.orm import Session
 from pathlib import Path
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
+# O Selenium só é importado (e o navegador só é iniciado) quando um link precisa dele
 
 
 # --- Bloco Padrão de Configuração e Imports ---
@@ -36,7 +29,7 @@ except NameError:
 
 from config import settings
 try:
-    from src.database.db_utils import get_or_create_news_source
+    from src.database.db_utils import get_dimension_registry
     from src.database.create_db_tables import NewsArticle
 except ImportError as e:
     import logging
@@ -52,11 +45,16 @@ class RSSCollector:
         self.db_session = db_session
         self.credibility_data = credibility_data
         self.request_headers = {'User-Agent': random.choice(settings.USER_AGENTS)}
-        self.driver = self._start_driver()
+        self.driver = None # Iniciado sob demanda, no primeiro redirect que exigir o navegador
 
     def _start_driver(self):
         """ Configura e inicia a instância do navegador Selenium. """
         try:
+            from selenium import webdriver
+            from selenium.webdriver.chrome.options import Options
+            from selenium.webdriver.chrome.service import Service
+            from webdriver_manager.chrome import ChromeDriverManager
+
             options = Options()
             options.add_argument("--headless=new")
             options.add_argument(f"user-agent={self.request_headers['User-Agent']}")
@@ -94,12 +92,15 @@ class RSSCollector:
         """ Usa o navegador para resolver redirects complexos com espera explícita e autocura. """
         # Garante que temos um driver funcionando antes de começar.
         if not self.driver:
-            settings.logger.warning("Driver do Selenium não estava ativo. Tentando reiniciar...")
+            settings.logger.info("Driver do Selenium não está ativo. Iniciando...")
             self.driver = self._start_driver()
             if not self.driver: # Se ainda assim falhar, não podemos continuar.
-                settings.logger.error("Falha catastrófica ao reiniciar o driver do Selenium.")
+                settings.logger.error("Falha catastrófica ao iniciar o driver do Selenium.")
                 return url
 
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.support.ui import WebDriverWait
+
         try:
             self.driver.get(url)
             
@@ -196,8 +197,8 @@ class RSSCollector:
             if not source_domain: continue
             
             source_name_hint = entry.source.get("title") if hasattr(entry, "source") else feed_name
-            news_source_obj = get_or_create_news_source(self.db_session, source_domain, source_name_hint, self.credibility_data)
-            if not news_source_obj: continue
+            news_source_id = get_dimension_registry().news_source_id(self.db_session, source_domain, source_name_hint, self.credibility_data)
+            if not news_source_id: continue
 
             publication_date_dt = None
             if time_struct := entry.get("published_parsed"):
@@ -211,7 +212,7 @@ class RSSCollector:
                 "original_url": original_link if was_redirected else None, # A URL do Google, se aplicável
                 "is_redirected": was_redirected, # Flag para sabermos que foi um redirect
                 "publication_date": publication_date_dt,
-                "news_source_id": news_source_obj.news_source_id,
+                "news_source_id": news_source_id,
                 "summary": entry.get("summary"),
                 "article_type": "RSS",
                 "processing_status": 'pending_full_text_fetch',
@@ -25,7 +25,7 @@ except NameError:
 
 from config import settings
 try:
-    from src.database.db_utils import get_or_create_news_source, get_company_id_for_ticker, get_segment_id_by_name
+    from src.database.db_utils import get_dimension_registry
     from src.database.create_db_tables import NewsArticle, NewsArticleCompanyLink, NewsArticleSegmentLink
 except ImportError as e:
     import logging
@@ -89,8 +89,8 @@ class NewsAPICollector:
                 headline_text = "Sem Título"
                 settings.logger.warning(f"Artigo recebido sem título! Link: {article_link}")
 
-            news_source_obj = get_or_create_news_source(self.db_session, self._get_domain_from_url(article_link), api_article.get("source", {}).get("name"), self.credibility_data)
-            if not news_source_obj: continue
+            news_source_id = get_dimension_registry().news_source_id(self.db_session, self._get_domain_from_url(article_link), api_article.get("source", {}).get("name"), self.credibility_data)
+            if not news_source_id: continue
             
             publication_date_dt = None
             if published_at_str := api_article.get("publishedAt"):
@@ -101,7 +101,7 @@ class NewsAPICollector:
                 "headline": headline_text,
                 "article_link": article_link,
                 "publication_date": publication_date_dt,
-                "news_source_id": news_source_obj.news_source_id,
+                "news_source_id": news_source_id,
                 "summary": api_article.get("description"),
                 "article_type": self._assign_initial_article_type(headline_text, api_article.get("description")),
                 "processing_status": 'pending_full_text_fetch',
@@ -1,6 +1,11 @@
 # src/data_processing/conflict_detector.py (Versão Corrigida)
 
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, Optional
 # from config import settings # Provavelmente não precisa mais de settings aqui se não tiver log ou params específicos
 
 class ConflictDetector:
@@ -93,4 +98,55 @@ class ConflictDetector:
             "conflicts": self.conflicts,
             "audited_by": "ConflictDetector",
             "audit_timestamp": datetime.now().isoformat()
-        }
\ No newline at end of file
+        }
+
+    @classmethod
+    def run_many(cls, analyses: Iterable[dict], executor: Optional[Executor] = None,
+                 max_workers: Optional[int] = None, chunksize: int = 200) -> Iterator[dict]:
+        """
+        Audita muitas análises em paralelo, em um ProcessPoolExecutor.
+
+        As análises são enviadas em pedaços de `chunksize` (uma tarefa por pedaço), com no
+        máximo 2 * max_workers pedaços em voo, e os resultados são devolvidos à medida que
+        ficam prontos, na mesma ordem da entrada, para que quem consome possa gravá-los sem
+        esperar o fim. Um `executor` já existente pode ser reaproveitado entre chamadas.
+        """
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=max_workers)
+        max_in_flight = 2 * (max_workers or getattr(executor, "_max_workers", None) or os.cpu_count() or 1)
+
+        iterator = iter(analyses)
+        pending = deque()
+        try:
+            while True:
+                while len(pending) < max_in_flight:
+                    chunk = list(islice(iterator, chunksize))
+                    if not chunk:
+                        break
+                    pending.append(executor.submit(_audit_chunk, chunk))
+                if not pending:
+                    return
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            if own_executor:
+                executor.shutdown(wait=True)
+
+
+def _audit_one(analysis_data: dict) -> dict:
+    try:
+        return ConflictDetector(analysis_data).run()
+    except Exception as e:
+        return {
+            "confidence_score": 0,
+            "conflicts": [f"Erro no processamento: {e}"],
+            "audited_by": "ConflictDetector",
+            "audit_timestamp": datetime.now().isoformat()
+        }
+
+
+def _audit_chunk(analyses: list[dict]) -> list[dict]:
+    """Tarefa executada em cada processo do pool (precisa ser uma função de módulo)."""
+    return [_audit_one(analysis_data) for analysis_data in analyses]
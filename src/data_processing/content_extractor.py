@@ -3,22 +3,14 @@ import io
 import time
 import random
 import zipfile
-from PyPDF2 import PdfReader 
-import pdfplumber
 import requests
 import urllib.robotparser
 from urllib.parse import urlparse
 from bs4 import BeautifulSoup
 from config import settings # Assumindo que 'settings' existe e contém logger e USER_AGENTS
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
 from newspaper import Article, Config as NewspaperConfig
+# Selenium/webdriver_manager e as bibliotecas de PDF são importados só nos caminhos que os usam
+# (fallback com navegador e documentos PDF), para não pesar na inicialização de quem só usa o Newspaper3k.
 
 
 
@@ -32,15 +24,24 @@ class ArgusContentExtractor:
         self.newspaper_config = NewspaperConfig()
         self.newspaper_config.request_timeout = 20
         self.newspaper_config.keep_article_html = True
-        try:
-            self.driver_path = ChromeDriverManager().install()
-        except Exception as e:
-            self.logger.error(f"Não foi possível baixar/encontrar o chromedriver: {e}", exc_info=True)
-            self.driver_path = None
+        self._driver_path = None
+        self._driver_path_resolved = False
 
+    @property
+    def driver_path(self) -> str | None:
+        """Caminho do chromedriver, baixado/encontrado só no primeiro fallback para o Selenium."""
+        if not self._driver_path_resolved:
+            self._driver_path_resolved = True
+            try:
+                from webdriver_manager.chrome import ChromeDriverManager
+                self._driver_path = ChromeDriverManager().install()
+            except Exception as e:
+                self.logger.error(f"Não foi possível baixar/encontrar o chromedriver: {e}", exc_info=True)
+        return self._driver_path
 
-    def _setup_chrome_options(self) -> Options:
+    def _setup_chrome_options(self):
         """Configura e retorna um objeto Options do Chrome com um User-Agent aleatório."""
+        from selenium.webdriver.chrome.options import Options
         user_agent = random.choice(settings.USER_AGENTS)
         options = Options()
         options.add_argument("--headless=new")
@@ -66,6 +67,9 @@ class ArgusContentExtractor:
         Extrai texto de um conteúdo PDF usando PyPDF2 e pdfplumber, priorizando PyPDF2
         pela velocidade e usando pdfplumber como fallback para melhor formatação.
         """
+        from PyPDF2 import PdfReader
+        import pdfplumber
+
         text_pypdf = ""
         text_pdfplumber = ""
 
@@ -210,6 +214,10 @@ class ArgusContentExtractor:
             self.logger.error("ChromeDriver não está disponível. Pulando extração com Selenium.")
             return None
             
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+
         self.logger.info(f"Fallback para Selenium para a URL: {url}")
         driver = None
         try:
@@ -0,0 +1,138 @@
+# src/data_processing/vectorized_conflict_detector.py
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+# Bits da máscara de conflitos: um por regra de ConflictDetector, na mesma ordem em que
+# as regras são avaliadas em ConflictDetector.run(). Penalidade de cada regra ao lado.
+CONFLICT_MISSING_SUMMARY = 1 << 0       # -30
+CONFLICT_MISSING_SENTIMENT = 1 << 1     # -30
+CONFLICT_MISSING_ENTITIES = 1 << 2      # -20
+CONFLICT_MISSING_STAKEHOLDERS = 1 << 3  # -15
+CONFLICT_MISSING_MASLOW = 1 << 4        # -10
+CONFLICT_SENTIMENT_INTENSITY = 1 << 5   # -15
+CONFLICT_STAKEHOLDER = 1 << 6           # -20
+CONFLICT_SENTIMENT_MASLOW = 1 << 7      # -15
+CONFLICT_AGENT_ALERTS = 1 << 8          # -25 por alerta
+CONFLICT_RELEVANCE = 1 << 9             # -10
+
+# Texto da mensagem de cada bit (o alerta do agente também lista os alertas encontrados)
+CONFLICT_MESSAGES = {
+    CONFLICT_MISSING_SUMMARY: "Falha de Integridade: O resumo da análise está ausente.",
+    CONFLICT_MISSING_SENTIMENT: "Falha de Integridade: O score de sentimento está ausente.",
+    CONFLICT_MISSING_ENTITIES: "Falha de Integridade: Nenhuma entidade foi identificada.",
+    CONFLICT_MISSING_STAKEHOLDERS: "Falha de Integridade: A análise de stakeholders está ausente ou vazia.",
+    CONFLICT_MISSING_MASLOW: "Falha de Integridade: A análise de impacto Maslow está ausente ou incompleta.",
+    CONFLICT_SENTIMENT_INTENSITY: "Conflito Lógico: Sentimento forte com intensidade fraca.",
+    CONFLICT_STAKEHOLDER: "Conflito Lógico: Sentimento geral contradiz o impacto para investidores.",
+    CONFLICT_SENTIMENT_MASLOW: "Conflito Lógico: Sentimento altamente positivo com foco em 'Segurança'.",
+    CONFLICT_AGENT_ALERTS: "Alerta do Agente: Foram encontrados os seguintes alertas",
+    CONFLICT_RELEVANCE: "Conflito Lógico: Sentimento forte em notícia de baixa relevância financeira.",
+}
+
+FLAT_COLUMNS = [
+    "has_summary", "sentiment_score", "intensity", "sentiment_label", "has_entities",
+    "has_stakeholders", "investor_impact", "has_maslow_score", "maslow_primary_category",
+    "alerts_count", "relevance",
+]
+
+
+def _section(analysis: dict, key: str) -> dict:
+    return analysis.get(key, {})
+
+
+def flatten_analysis(analysis: dict) -> tuple:
+    """
+    Extrai de um llm_analysis_json os campos usados pelas regras do ConflictDetector,
+    com os mesmos valores padrão que as regras usam quando uma chave falta.
+    """
+    analysis = analysis if isinstance(analysis, dict) else {}
+    resumo = _section(analysis, 'analise_resumo')
+    sentimento = _section(analysis, 'analise_sentimento')
+    entidades = _section(analysis, 'analise_entidades')
+    stakeholders = _section(analysis, 'analise_stakeholders')
+    maslow = _section(analysis, 'analise_impacto_maslow')
+
+    investor_impact = None
+    for stakeholder in stakeholders.get('stakeholder_analysis', []) or []:
+        if stakeholder.get('stakeholder_group') == 'Acionistas/Investidores':
+            investor_impact = stakeholder.get('impact_direction')
+            break
+
+    sentiment_score = sentimento.get('sentiment_score')
+    alerts = entidades.get('alertas', [])
+    return (
+        bool(resumo.get('summary')),
+        np.nan if sentiment_score is None else float(sentiment_score),
+        sentimento.get('intensity', 'Nula'),
+        sentimento.get('sentiment_label'),
+        bool(entidades.get('entidades_identificadas')),
+        bool(stakeholders) and bool(stakeholders.get('stakeholder_analysis')),
+        investor_impact,
+        bool(maslow) and maslow.get('score_maslow') is not None,
+        maslow.get('maslow_impact_primary_category'),
+        len(alerts) if alerts else 0,
+        float(entidades.get('relevancia_mercado_financeiro', 0.0)),
+    )
+
+
+def flatten_analyses(analyses: Iterable[dict]) -> pd.DataFrame:
+    """DataFrame com uma linha de campos achatados (FLAT_COLUMNS) por análise."""
+    return pd.DataFrame.from_records([flatten_analysis(analysis) for analysis in analyses], columns=FLAT_COLUMNS)
+
+
+def detect_conflicts_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Versão colunar de ConflictDetector.run(): avalia as seis regras sobre colunas inteiras
+    (operações booleanas do NumPy) e retorna, por linha, o confidence_score e a máscara de
+    bits dos conflitos encontrados (constantes CONFLICT_*). `frame` segue FLAT_COLUMNS
+    (ver flatten_analyses). Para análises bem formadas o resultado é idêntico ao do
+    ConflictDetector (ver scripts/maintence/check_conflict_detector_parity.py).
+    """
+    raw_sentiment = frame["sentiment_score"].to_numpy(dtype=np.float64)
+    sentiment = np.where(np.isnan(raw_sentiment), 0.0, raw_sentiment) # Regras lógicas usam 0.0 quando falta
+    label = frame["sentiment_label"].to_numpy(dtype=object)
+    impact = frame["investor_impact"].to_numpy(dtype=object)
+    alerts_count = frame["alerts_count"].to_numpy(dtype=np.int64)
+    relevance = frame["relevance"].to_numpy(dtype=np.float64)
+
+    rules = [
+        (CONFLICT_MISSING_SUMMARY, 30, ~frame["has_summary"].to_numpy(dtype=bool)),
+        (CONFLICT_MISSING_SENTIMENT, 30, np.isnan(raw_sentiment)),
+        (CONFLICT_MISSING_ENTITIES, 20, ~frame["has_entities"].to_numpy(dtype=bool)),
+        (CONFLICT_MISSING_STAKEHOLDERS, 15, ~frame["has_stakeholders"].to_numpy(dtype=bool)),
+        (CONFLICT_MISSING_MASLOW, 10, ~frame["has_maslow_score"].to_numpy(dtype=bool)),
+        (CONFLICT_SENTIMENT_INTENSITY, 15,
+         (np.abs(sentiment) > 0.6) & frame["intensity"].isin(['Leve', 'Nula']).to_numpy()),
+        (CONFLICT_STAKEHOLDER, 20,
+         ((label == 'Positivo') & (impact == 'Negativo')) | ((label == 'Negativo') & (impact == 'Positivo'))),
+        (CONFLICT_SENTIMENT_MASLOW, 15,
+         (frame["maslow_primary_category"].to_numpy(dtype=object) == 'Segurança') & (sentiment > 0.5)),
+        (CONFLICT_RELEVANCE, 10, (relevance < 0.4) & (np.abs(sentiment) > 0.7)),
+    ]
+
+    score = np.full(len(frame), 100, dtype=np.int64)
+    mask = np.zeros(len(frame), dtype=np.int32)
+    for bit, penalty, hit in rules:
+        score -= penalty * hit
+        mask |= np.where(hit, bit, 0).astype(np.int32)
+
+    has_alerts = alerts_count > 0
+    score -= 25 * alerts_count
+    mask |= np.where(has_alerts, CONFLICT_AGENT_ALERTS, 0).astype(np.int32)
+
+    return pd.DataFrame(
+        {"confidence_score": np.maximum(score, 0), "conflict_mask": mask},
+        index=frame.index
+    )
+
+
+def conflict_mask_from_messages(conflicts: list[str]) -> int:
+    """Máscara equivalente à lista de mensagens de conflito de ConflictDetector.run()."""
+    mask = 0
+    for bit, message in CONFLICT_MESSAGES.items():
+        if any(conflict.startswith(message) for conflict in conflicts):
+            mask |= bit
+    return mask
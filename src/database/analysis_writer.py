@@ -0,0 +1,257 @@
+# src/database/analysis_writer.py
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+import os
+import re
+import socket
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from config import settings
+from src.database.async_db import run_db
+from src.database.db_utils import batch_update_articles_with_analysis
+
+
+def _entry_to_line(entry: tuple[int, dict, datetime], worker_id: Optional[str] = None) -> str:
+    article_id, analysis_results, processed_at = entry
+    return json.dumps(
+        {"id": article_id, "processed_at": processed_at.isoformat(), "worker": worker_id, "analysis": analysis_results},
+        ensure_ascii=False
+    ) + "\n"
+
+
+def _line_to_entry(line: str) -> tuple[tuple[int, dict, datetime], Optional[str]]:
+    """Retorna a entrada e o worker que detinha a reserva (None em journals antigos: gravação sem verificação)."""
+    data = json.loads(line)
+    return (data["id"], data["analysis"], datetime.fromisoformat(data["processed_at"])), data.get("worker")
+
+
+def journal_path_for_worker(directory: Path, worker_id: str) -> Path:
+    """Journal próprio de um worker de análise (o ID vira parte do nome do arquivo)."""
+    return Path(directory) / f"write_journal_{re.sub(r'[^A-Za-z0-9_.-]', '_', worker_id)}.jsonl"
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if os.name == "nt": # os.kill(pid, 0) no Windows envia CTRL_C_EVENT; consulta o processo pela API
+        import ctypes
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid) # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_journal(path: Path) -> list[tuple[tuple[int, dict, datetime], Optional[str]]]:
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entries.append(_line_to_entry(line))
+            except (ValueError, KeyError) as e:
+                # Última linha incompleta (queda no meio do append)
+                settings.logger.warning(f"Entrada inválida ignorada no journal de análises {path.name}: {e}")
+    return entries
+
+
+class AnalysisWriteBuffer:
+    """
+    Persistência write-behind das análises do pipeline.
+
+    `submit` guarda a análise em memória e em um journal JSONL (append + flush) e retorna;
+    a escrita do journal (e a reescrita com fsync depois de cada lote) roda fora do event loop;
+    o buffer é gravado com batch_update_articles_with_analysis (um único UPDATE ... FROM
+    (VALUES ...)) a cada `max_items` análises ou `max_wait_ms` milissegundos, o que vier primeiro.
+    Depois de cada gravação o journal é reescrito só com o que ainda não foi gravado.
+
+    Se o processo cair, `replay_journal` (chamado na partida) grava o que ficou no journal.
+    A gravação é idempotente (ver processed_at em batch_update_articles_with_analysis), então
+    reaplicar entradas já gravadas não tem efeito. Lotes que falham ficam no journal para o
+    próximo replay; até lá os artigos continuam reservados e o reaper os devolve à fila.
+
+    Cada processo usa um journal próprio (journal_path_for_worker), com um arquivo .owner
+    ao lado indicando host e PID do dono. Na partida, o replay também assume os journals
+    deixados no mesmo diretório por workers deste host que já não estão rodando (inclusive o
+    antigo write_journal.jsonl compartilhado); journals de outros hosts ficam para o próprio dono.
+    """
+
+    def __init__(self, journal_path: Path, worker_id: Optional[str] = None,
+                 max_items: int = 50, max_wait_ms: float = 500, legacy_journal_dirs: tuple = ()):
+        self.journal_path = Path(journal_path)
+        # Diretórios antigos de journals, varridos só no replay (journals órfãos de versões anteriores)
+        self.legacy_journal_dirs = tuple(Path(directory) for directory in legacy_journal_dirs)
+        self.worker_id = worker_id # Só grava artigos ainda reservados por este worker (ver batch_update_articles_with_analysis)
+        self.max_items = max_items
+        self.max_wait_seconds = max_wait_ms / 1000.0
+
+        self._pending: list[tuple[int, dict, datetime]] = []
+        self._failed: list[tuple[int, dict, datetime]] = [] # Mantidos no journal até o próximo replay
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_lock = asyncio.Lock()
+        self._journal_lock = asyncio.Lock() # Serializa append e reescrita, que rodam em threads
+        self._flush_tasks: set[asyncio.Task] = set()
+        self._owner_written = False
+        self.flushes = 0
+        self.written = 0
+
+    # --- Journal ---
+
+    @staticmethod
+    def _owner_path(journal_path: Path) -> Path:
+        return journal_path.with_suffix(".owner")
+
+    def _write_owner(self):
+        if self._owner_written:
+            return
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._owner_path(self.journal_path), "w", encoding="utf-8") as f:
+            json.dump({"host": socket.gethostname(), "pid": os.getpid()}, f)
+        self._owner_written = True
+
+    def _is_orphan(self, journal_path: Path) -> bool:
+        """Journal de outro worker deste host que não está mais rodando (ou sem dono registrado)."""
+        try:
+            with open(self._owner_path(journal_path), "r", encoding="utf-8") as f:
+                owner = json.load(f)
+        except FileNotFoundError:
+            return True
+        except (OSError, ValueError):
+            return False
+        return owner.get("host") == socket.gethostname() and not _pid_alive(int(owner.get("pid", 0)))
+
+    def _claim_orphan_journals(self) -> list[Path]:
+        """Renomeia (atomicamente) os journals órfãos para este worker; outro worker que tente o mesmo falha no rename."""
+        claimed = []
+        directories = list(dict.fromkeys([self.journal_path.parent, *self.legacy_journal_dirs]))
+        candidates = sorted(path for directory in directories for path in directory.glob("write_journal*.jsonl"))
+        for path in candidates:
+            if path == self.journal_path or ".replaying-" in path.name or not self._is_orphan(path):
+                continue
+            target = path.with_name(f"{path.stem}.replaying-{os.getpid()}.jsonl")
+            try:
+                os.rename(path, target)
+            except OSError:
+                continue
+            self._owner_path(path).unlink(missing_ok=True)
+            claimed.append(target)
+        # Assumidos por um worker que caiu durante o replay
+        claimed += [path for directory in directories for path in directory.glob("write_journal*.replaying-*.jsonl")
+                    if path not in claimed and not _pid_alive(int(path.stem.rsplit("-", 1)[-1] or 0))]
+        return claimed
+
+    def _append_to_journal(self, entry: tuple[int, dict, datetime]):
+        self._write_owner()
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(_entry_to_line(entry, self.worker_id))
+            f.flush()
+
+    def _rewrite_journal(self, remaining: Optional[list] = None):
+        """Reescreve o journal (de forma atômica) com as entradas ainda não gravadas no banco."""
+        if remaining is None:
+            remaining = self._failed + self._pending
+        if not remaining:
+            self.journal_path.unlink(missing_ok=True)
+            return
+        tmp_path = self.journal_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(_entry_to_line(entry, self.worker_id) for entry in remaining)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def replay_journal(self) -> int:
+        """
+        Grava no banco (síncrono) as análises que ficaram no journal deste worker e nos journals
+        órfãos de workers mortos. Deve ser chamado antes de o pipeline começar a aceitar novas análises.
+        """
+        self._write_owner()
+        paths = ([self.journal_path] if self.journal_path.exists() else []) + self._claim_orphan_journals()
+        replayed = 0
+        for path in paths:
+            journal_entries = _read_journal(path)
+            entries = [entry for entry, _ in journal_entries]
+            if entries:
+                by_worker = {}
+                for entry, worker_id in journal_entries:
+                    by_worker.setdefault(worker_id, []).append(entry)
+                try:
+                    for worker_id, worker_entries in by_worker.items():
+                        batch_update_articles_with_analysis(worker_entries, worker_id)
+                except Exception:
+                    if path == self.journal_path:
+                        # Continuam no journal deste worker: a próxima reescrita preserva estas entradas
+                        self._failed.extend(entries)
+                    # Um journal assumido fica como está (.replaying-<pid>), com o worker de cada entrada,
+                    # e é assumido de novo na próxima partida
+                    raise
+                settings.logger.warning(f"Journal de análises {path.name}: {len(entries)} análises pendentes de uma execução anterior foram regravadas.")
+            path.unlink(missing_ok=True)
+            replayed += len(entries)
+        return replayed
+
+    # --- Buffer ---
+
+    async def submit(self, article_id: int, analysis_results: dict):
+        """Enfileira a análise para gravação. Com o buffer cheio, aguarda a gravação (contrapressão)."""
+        entry = (article_id, analysis_results, datetime.now(settings.TIMEZONE))
+        async with self._journal_lock:
+            await asyncio.to_thread(self._append_to_journal, entry)
+            self._pending.append(entry)
+
+        if len(self._pending) >= self.max_items:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait_seconds, self._flush_in_background)
+
+    def _flush_in_background(self):
+        self._timer = None
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def flush(self):
+        async with self._flush_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            batch, self._pending = self._pending, []
+            if not batch:
+                return
+
+            try:
+                await run_db(batch_update_articles_with_analysis, batch, self.worker_id)
+                self.flushes += 1
+                self.written += len(batch)
+            except Exception as e:
+                settings.logger.error(f"Falha ao gravar lote de {len(batch)} análises; mantidas no journal para o próximo replay: {e}")
+                self._failed.extend(batch)
+            async with self._journal_lock:
+                # Retrato tirado com o lock: nenhum append fica entre o retrato e a troca do arquivo
+                await asyncio.to_thread(self._rewrite_journal, self._failed + self._pending)
+
+    async def close(self):
+        """Grava o que restou no buffer. Chamado no encerramento do pipeline."""
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        await self.flush()
+        if self._failed:
+            settings.logger.error(f"{len(self._failed)} análises não puderam ser gravadas e continuam em {self.journal_path}.")
+        elif self._owner_written:
+            self._owner_path(self.journal_path).unlink(missing_ok=True)
+            self._owner_written = False
+
+    def stats(self) -> dict:
+        return {"lotes": self.flushes, "analises_gravadas": self.written, "no_journal": len(self._failed) + len(self._pending)}
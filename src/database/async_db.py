@@ -0,0 +1,65 @@
+# src/database/async_db.py
+# -*- coding: utf-8 -*-
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config import settings
+from src.database.db_utils import renew_article_leases, session_scope
+
+# Executor dedicado ao banco: o event loop nunca executa uma consulta, apenas aguarda o resultado.
+# O número de threads acompanha o pool de conexões do SQLAlchemy, de modo que cada thread
+# tenha uma conexão disponível e as consultas excedentes esperem na fila do executor
+# (sem ocupar as threads do executor padrão do asyncio, usadas por embeddings e caches).
+_db_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    global _db_executor
+    if _db_executor is None:
+        _db_executor = ThreadPoolExecutor(
+            max_workers=settings.DB_EXECUTOR_MAX_WORKERS,
+            thread_name_prefix="db"
+        )
+    return _db_executor
+
+
+async def run_db(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Executa `fn(*args, **kwargs)` (função síncrona de acesso ao banco) no executor do banco."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_db_executor():
+    """Aguarda as consultas em andamento e encerra o executor (chamado no fim do pipeline)."""
+    global _db_executor
+    if _db_executor is not None:
+        _db_executor.shutdown(wait=True)
+        _db_executor = None
+
+
+def _renew_claims(article_ids: list[int], worker_id: str) -> int:
+    with session_scope() as session:
+        return renew_article_leases(session, article_ids, worker_id)
+
+
+async def lease_renewer(in_flight: set[int], worker_id: str):
+    """
+    Renova periodicamente (a cada um terço da duração da reserva) as reservas de `worker_id`
+    para os artigos em `in_flight`, para que o reaper de outro worker não os devolva à fila
+    no meio de uma análise longa. Reservas perdidas mesmo assim são barradas na gravação.
+    """
+    interval = settings.ANALYSIS_LEASE_SECONDS / 3
+    while True:
+        await asyncio.sleep(interval)
+        article_ids = list(in_flight)
+        if not article_ids:
+            continue
+        try:
+            renewed = await run_db(_renew_claims, article_ids, worker_id)
+            if renewed < len(article_ids):
+                settings.logger.warning(f"Reservas: {len(article_ids) - renewed} de {len(article_ids)} artigos em processamento já não pertencem ao worker {worker_id}.")
+        except Exception as e:
+            settings.logger.error(f"Falha ao renovar reservas: {e}")
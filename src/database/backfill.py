@@ -0,0 +1,135 @@
+# src/database/backfill.py
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import pandas as pd
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+from config import settings
+from src.database.db_utils import get_db_engine, session_scope
+
+
+class BackfillCheckpoint:
+    """Progresso de um backfill (último ID gravado e contadores), salvo em JSON de forma atômica."""
+
+    def __init__(self, name: str, directory: Optional[Path] = None):
+        directory = Path(directory or settings.BACKFILL_CHECKPOINT_DIR)
+        self.path = directory / f"{name}.json"
+        self.last_id: Optional[int] = None
+        self.counters = {"lidos": 0, "atualizados": 0}
+
+    def load(self) -> bool:
+        if not self.path.exists():
+            return False
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        self.last_id = data.get("last_id")
+        self.counters.update(data.get("counters", {}))
+        return True
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"last_id": self.last_id, "counters": self.counters}), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
+
+
+def bulk_update_from_frame(session: Session, table_name: str, key_column: str, frame: pd.DataFrame,
+                           casts: dict[str, str], page_size: int = 1000) -> int:
+    """
+    Grava as colunas de `frame` em `table_name` com um único UPDATE ... FROM (VALUES ...) por
+    página, casando pela coluna `key_column`. `casts` mapeia cada coluna ao tipo SQL do valor
+    (ex: {"overall_confidence_score": "double precision", "conflict_analysis_json": "json"}).
+    """
+    from psycopg2.extras import execute_values
+
+    if frame.empty:
+        return 0
+
+    columns = list(casts)
+    set_clause = ", ".join(f"{column} = v.{column}" for column in columns)
+    template = "(%s, " + ", ".join(f"%s::{casts[column]}" for column in columns) + ")"
+    sql = (
+        f'UPDATE "{table_name}" AS t SET {set_clause} '
+        f'FROM (VALUES %s) AS v({key_column}, {", ".join(columns)}) '
+        f'WHERE t.{key_column} = v.{key_column}'
+    )
+
+    def to_db(value, cast):
+        if value is None or (not isinstance(value, (dict, list)) and pd.isna(value)):
+            return None
+        if cast in ("json", "jsonb"):
+            return json.dumps(value, ensure_ascii=False)
+        return value.item() if hasattr(value, "item") else value
+
+    rows = [
+        (int(key), *(to_db(value, casts[column]) for column, value in zip(columns, values)))
+        for key, *values in frame[[key_column, *columns]].itertuples(index=False, name=None)
+    ]
+    dbapi_connection = session.connection().connection
+    with dbapi_connection.cursor() as cursor:
+        execute_values(cursor, sql, rows, template=template, page_size=page_size)
+    return len(rows)
+
+
+def run_keyset_backfill(name: str, query: Select, key_column, transform: Callable[[pd.DataFrame], pd.DataFrame],
+                        write: Callable[[Session, pd.DataFrame], int], chunk_size: int = 5000,
+                        restart: bool = False) -> dict:
+    """
+    Executa um backfill em pedaços, do menor para o maior `key_column`:
+
+    - a leitura é uma única consulta ordenada pela chave e lida por cursor do servidor
+      (stream_results), em pedaços de `chunk_size` linhas convertidos em DataFrame;
+    - `transform(df)` calcula, de forma vetorizada, o DataFrame de linhas a gravar;
+    - `write(session, updates)` grava o pedaço (ex: bulk_update_from_frame) e o commit
+      acontece uma vez por pedaço;
+    - depois de cada commit o último ID é salvo no checkpoint. Uma execução interrompida
+      retoma de onde parou (key_column > last_id); `restart=True` ignora o checkpoint.
+      Ao terminar, o checkpoint é apagado.
+    """
+    checkpoint = BackfillCheckpoint(name)
+    if restart:
+        checkpoint.clear()
+    elif checkpoint.load():
+        settings.logger.info(f"Backfill '{name}': retomando após o ID {checkpoint.last_id} ({checkpoint.counters}).")
+
+    if checkpoint.last_id is not None:
+        query = query.where(key_column > checkpoint.last_id)
+    query = query.order_by(key_column)
+
+    started_at = time.time()
+    rows_this_run = 0
+    key_name = key_column.key
+    with get_db_engine().connect() as read_connection:
+        result = read_connection.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+        columns = list(result.keys())
+        for rows in result.partitions(chunk_size):
+            chunk = pd.DataFrame(rows, columns=columns)
+            updates = transform(chunk)
+            with session_scope() as session:
+                updated = write(session, updates) if updates is not None and not updates.empty else 0
+
+            checkpoint.last_id = int(chunk[key_name].iloc[-1])
+            checkpoint.counters["lidos"] += len(chunk)
+            rows_this_run += len(chunk)
+            checkpoint.counters["atualizados"] += updated
+            checkpoint.save()
+
+            elapsed = time.time() - started_at
+            settings.logger.info(
+                f"Backfill '{name}': {checkpoint.counters['lidos']} lidos, {checkpoint.counters['atualizados']} atualizados "
+                f"(último ID {checkpoint.last_id}, {rows_this_run / elapsed if elapsed > 0 else 0:.0f} linhas/s)."
+            )
+
+    counters = dict(checkpoint.counters)
+    checkpoint.clear()
+    settings.logger.info(f"Backfill '{name}' concluído: {counters}.")
+    return counters
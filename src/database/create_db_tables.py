@@ -109,6 +109,10 @@ class NewsArticle(Base):
     next_retry_at = Column(DateTime(timezone=True), nullable=True) # Próxima data de retentativa
     overall_confidence_score = Column(Float, nullable=True) # Score combinado de 0 a 100
     source_credibility = Column(Float, nullable=True) # Credibilidade da fonte (0 a 1), redundante com NewsSource.base_credibility_score, mas útil para o cache e snapshot
+    # CAMPOS DE CONCESSÃO (LEASE) PARA VÁRIOS WORKERS DE ANÁLISE EM PARALELO:
+    claimed_by = Column(String(255), nullable=True) # Identificador do worker que reservou o artigo
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True) # Após esta data a reserva pode ser recolhida pelo reaper
+    claim_source_status = Column(String(50), nullable=True) # Status de origem da reserva, restaurado pelo reaper quando a concessão expira
     news_source = relationship("NewsSource", back_populates="articles")
     company_links = relationship("NewsArticleCompanyLink", back_populates="news_article")
     segment_links = relationship("NewsArticleSegmentLink", back_populates="news_article")
@@ -285,8 +289,51 @@ class NetworkAnalysisComputation(Base):
 def create_tables(engine_to_use):
     """Cria todas as tabelas definidas no metadado do Base."""
     Base.metadata.create_all(engine_to_use)
+    add_missing_article_columns(engine_to_use)
+    create_embedding_index(engine_to_use)
     print("Tabelas criadas (ou já existentes e verificadas) com sucesso!")
 
+EMBEDDING_INDEX_NAMES = {
+    "hnsw": "ix_newsarticles_embedding_hnsw",
+    "ivfflat": "ix_newsarticles_embedding_ivfflat",
+}
+
+def create_embedding_index(engine_to_use, rebuild: bool = False):
+    """
+    Cria o índice de similaridade de cosseno em NewsArticles.embedding, do tipo definido em
+    settings.PGVECTOR_INDEX_TYPE (HNSW ou IVFFlat), com os parâmetros de settings.
+    Com `rebuild=True` o índice é recriado (útil no IVFFlat após o volume crescer,
+    pois as listas são calculadas a partir dos dados existentes na criação).
+    """
+    index_type = settings.PGVECTOR_INDEX_TYPE
+    if index_type not in EMBEDDING_INDEX_NAMES:
+        raise ValueError(f"PGVECTOR_INDEX_TYPE inválido: '{index_type}'. Use 'hnsw' ou 'ivfflat'.")
+    index_name = EMBEDDING_INDEX_NAMES[index_type]
+
+    if index_type == "hnsw":
+        with_clause = f"m = {settings.PGVECTOR_HNSW_M}, ef_construction = {settings.PGVECTOR_HNSW_EF_CONSTRUCTION}"
+    else:
+        with_clause = f"lists = {settings.PGVECTOR_IVFFLAT_LISTS}"
+
+    with engine_to_use.begin() as connection:
+        if rebuild:
+            connection.execute(text(f'DROP INDEX IF EXISTS "{index_name}"'))
+        connection.execute(text(
+            f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "NewsArticles" '
+            f'USING {index_type} (embedding vector_cosine_ops) WITH ({with_clause})'
+        ))
+    settings.logger.info(f"Índice vetorial '{index_name}' ({index_type}) verificado em NewsArticles.embedding.")
+
+def add_missing_article_columns(engine_to_use):
+    """
+    create_all não altera tabelas existentes; adiciona as colunas de concessão (lease)
+    em bancos criados antes delas.
+    """
+    with engine_to_use.begin() as connection:
+        connection.execute(text('ALTER TABLE "NewsArticles" ADD COLUMN IF NOT EXISTS claimed_by VARCHAR(255)'))
+        connection.execute(text('ALTER TABLE "NewsArticles" ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE'))
+        connection.execute(text('ALTER TABLE "NewsArticles" ADD COLUMN IF NOT EXISTS claim_source_status VARCHAR(50)'))
+
 def main():
     """Função principal para configurar o motor e criar as tabelas."""
     if not settings.ACTIVE_DATABASE_URL:
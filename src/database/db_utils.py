@@ -5,25 +5,28 @@ import json
 import re
 import sys
 import os
+import threading
+import time
 import traceback
+from contextlib import contextmanager
 from venv import logger
 import numpy as np
-from sqlalchemy import and_, bindparam, create_engine, or_, select, func, text, update
+from sqlalchemy import and_, bindparam, case, create_engine, event, or_, select, func, text, update
 from sqlalchemy.orm import sessionmaker, Session, joinedload
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.dialects import postgresql
 from datetime import date, datetime, timedelta, timezone
 import pandas as pd # Adicionado para o caso de uso de get_latest_effective_date
 
-from typing import Any, List, Dict, Optional
-
-import vertexai
-from vertexai.language_models import TextEmbeddingModel
+from typing import Any, Iterator, List, Dict, Optional
 
 
 # Importe seu logger de settings e o modelo EconomicIndicatorValue
 from config import settings
 from .create_db_tables import EconomicDataSource, EconomicIndicatorValue
+from .vector_index import get_local_vector_index
+from src.utils.model_registry import get_embedding_model
+from pgvector.sqlalchemy import Vector
 from sqlalchemy.exc import IntegrityError
 
 # Adiciona o diretório raiz do projeto ao sys.path
@@ -47,40 +50,123 @@ except ImportError as e:
     # e se todos os modelos acima estão definidos nele.
     sys.exit(1)
 
-# Inicializa o modelo aqui ou de forma global para reutilização
-try:
-    vertexai.init(project=settings.PROJECT_ID, location=settings.LOCATION)
-    embedding_model_for_db = TextEmbeddingModel.from_pretrained(settings.TEXT_EMBBEDING)
-
-except Exception as e:
-    settings.logger.warning(f"Não foi possível inicializar o modelo de embedding no db_utils: {e}")
-    embedding_model_for_db = None
-
 _engine = None
+_session_factory = None
+
+# Espera para obter uma conexão do pool, medida em session_scope (ver get_pool_metrics)
+_pool_wait_lock = threading.Lock()
+_pool_wait_stats = {"checkouts": 0, "wait_total_s": 0.0, "wait_max_s": 0.0}
 
 def get_db_engine():
     """
-    Retorna a engine SQLAlchemy singleton para o banco ativo.
+    Retorna a engine SQLAlchemy singleton para o banco ativo, com o pool configurado em
+    settings.SQLALCHEMY_ENGINE_OPTIONS e o statement_timeout de settings.DB_STATEMENT_TIMEOUT_MS.
     """
     global _engine
     if _engine is None:
         if not settings.ACTIVE_DATABASE_URL:
             settings.logger.critical("db_utils: ACTIVE_DATABASE_URL não configurada.")
             raise ValueError("ACTIVE_DATABASE_URL não configurada.")
-        _engine = create_engine(settings.ACTIVE_DATABASE_URL, **settings.SQLALCHEMY_ENGINE_OPTIONS)
-        settings.logger.info("db_utils: Engine do banco de dados criada.")
+        engine_options = dict(settings.SQLALCHEMY_ENGINE_OPTIONS)
+        if settings.DB_STATEMENT_TIMEOUT_MS:
+            connect_args = dict(engine_options.get("connect_args", {}))
+            connect_args["options"] = f"{connect_args.get('options', '')} -c statement_timeout={int(settings.DB_STATEMENT_TIMEOUT_MS)}".strip()
+            engine_options["connect_args"] = connect_args
+        _engine = create_engine(settings.ACTIVE_DATABASE_URL, **engine_options)
+        event.listen(_engine, "connect", _register_vector_adapter)
+        settings.logger.info(
+            f"db_utils: Engine do banco de dados criada (pool_size={engine_options.get('pool_size')}, "
+            f"max_overflow={engine_options.get('max_overflow')}, statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}ms)."
+        )
     return _engine
 
+def _register_vector_adapter(dbapi_connection, connection_record):
+    """
+    Registra o adaptador nativo do pgvector em cada nova conexão psycopg2, para que
+    arrays numpy sejam enviados/recebidos como `vector` sem montar strings em Python.
+    """
+    try:
+        from pgvector.psycopg2 import register_vector
+        register_vector(dbapi_connection)
+    except Exception as e:
+        settings.logger.warning(f"db_utils: Não foi possível registrar o adaptador pgvector na conexão: {e}")
+
+# statement_timeout por transação (SET LOCAL), ativado só pelos processos que o pedem (ver set_session_statement_timeout)
+_session_statement_timeout_ms = 0
+
+def set_session_statement_timeout(timeout_ms: int):
+    """
+    Aplica `SET LOCAL statement_timeout` no início de cada transação das sessões deste processo
+    (get_db_session e session_scope). Usado pelo pipeline de análise, cujas consultas são curtas;
+    coletores, backfills e o dashboard não chamam e seguem sem limite (ou com DB_STATEMENT_TIMEOUT_MS).
+    """
+    global _session_statement_timeout_ms
+    _session_statement_timeout_ms = int(timeout_ms or 0)
+
+def _apply_session_statement_timeout(session, transaction, connection):
+    if _session_statement_timeout_ms:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {_session_statement_timeout_ms}")
+
+def get_session_factory() -> sessionmaker:
+    """Retorna o sessionmaker do módulo, criado uma única vez sobre a engine singleton."""
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=get_db_engine())
+        event.listen(_session_factory, "after_begin", _apply_session_statement_timeout)
+    return _session_factory
+
 def get_db_session() -> Session:
     """
     Cria e retorna uma nova sessão SQLAlchemy para o banco ativo.
+    Use com `with get_db_session() as session:` (ou session_scope) para devolver a conexão ao pool.
     """
-    engine = get_db_engine()
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    session = SessionLocal()
+    session = get_session_factory()()
     settings.logger.debug("db_utils: Nova sessão do banco criada.")
     return session
 
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """
+    Sessão transacional: commit ao final, rollback em caso de erro e fechamento sempre,
+    garantindo a devolução da conexão ao pool. Mede o tempo de espera pela conexão.
+    """
+    session = get_session_factory()()
+    started_at = time.perf_counter()
+    try:
+        session.connection() # Obtém a conexão do pool agora, para medir a espera
+        waited = time.perf_counter() - started_at
+        with _pool_wait_lock:
+            _pool_wait_stats["checkouts"] += 1
+            _pool_wait_stats["wait_total_s"] += waited
+            _pool_wait_stats["wait_max_s"] = max(_pool_wait_stats["wait_max_s"], waited)
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+def get_pool_metrics() -> dict:
+    """
+    Uso do pool de conexões: conexões em uso (checked out), ociosas e de overflow, mais o
+    tempo de espera por conexão medido em session_scope. Serve para dimensionar pool_size/
+    max_overflow contra o número de workers (ex: DB_EXECUTOR_MAX_WORKERS).
+    """
+    pool = get_db_engine().pool
+    with _pool_wait_lock:
+        checkouts = _pool_wait_stats["checkouts"]
+        wait_total, wait_max = _pool_wait_stats["wait_total_s"], _pool_wait_stats["wait_max_s"]
+    return {
+        "pool_size": pool.size() if hasattr(pool, "size") else None,
+        "em_uso": pool.checkedout() if hasattr(pool, "checkedout") else None,
+        "ociosas": pool.checkedin() if hasattr(pool, "checkedin") else None,
+        "overflow": max(0, pool.overflow()) if hasattr(pool, "overflow") else None, # QueuePool reporta negativo abaixo de pool_size
+        "checkouts_medidos": checkouts,
+        "espera_media_ms": round(wait_total / checkouts * 1000, 2) if checkouts else 0.0,
+        "espera_max_ms": round(wait_max * 1000, 2),
+    }
+
         
 def get_segment_id_by_name(session: Session, segment_name: str) -> int | None:
     """
@@ -164,9 +250,7 @@ def get_or_create_news_source(session: Session,
         settings.logger.warning("get_or_create_news_source: source_domain não fornecido.")
         return None
 
-    normalized_domain = source_domain.lower()
-    if normalized_domain.startswith("www."):
-        normalized_domain = normalized_domain[4:]
+    normalized_domain = _normalize_source_domain(source_domain)
 
     # 1. Tenta buscar a fonte existente
     news_source = session.query(NewsSource).filter(NewsSource.url_base == normalized_domain).first()
@@ -554,6 +638,272 @@ def get_or_create_data_source(session: Session, source_name: str) -> int:
         session.flush()  # Usa flush para obter o ID do novo objeto sem commitar a transação inteira
         logger.info(f"Nova fonte de dados preparada para inserção: '{source_name}' (ID: {new_source.econ_data_source_id})")
         return new_source.econ_data_source_id
+
+def _normalize_source_domain(source_domain: str) -> str:
+    """Domínio no formato de NewsSources.url_base: minúsculo e sem 'www.'."""
+    normalized_domain = source_domain.strip().lower()
+    return normalized_domain[4:] if normalized_domain.startswith("www.") else normalized_domain
+
+
+class DimensionRegistry:
+    """
+    Cache em memória dos IDs das tabelas de dimensão usadas pelos coletores: fontes de dados,
+    indicadores, empresas, segmentos e fontes de notícias. Tudo é carregado com uma consulta
+    por tabela no primeiro uso; chaves ausentes são resolvidas em lote (um INSERT ... ON
+    CONFLICT ... RETURNING por lote, seguro entre processos concorrentes).
+
+    IDs obtidos dentro de uma transação ficam pendentes na sessão e só entram no cache
+    compartilhado após o commit; um rollback os descarta, para que o cache nunca aponte para
+    linhas que não existem. O acesso ao cache compartilhado é protegido por lock (coletores
+    em threads diferentes).
+    """
+
+    _PENDING_KEY = "dimension_registry_pending"
+    _MISSES_KEY = "dimension_registry_misses" # Chaves inexistentes no banco, não consultadas de novo até o fim da transação
+    _TABLES = ("data_sources", "indicators", "companies", "segments", "news_sources")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._data_sources: dict[str, int] = {} # nome -> econ_data_source_id
+        self._indicators: dict[tuple[str, str], tuple] = {} # (nome, tipo) -> (indicator_id, frequency, unit, econ_data_source_id)
+        self._companies: dict[str, int] = {} # ticker -> company_id
+        self._segments: dict[str, int] = {} # nome em minúsculas -> segment_id
+        self._news_sources: dict[str, int] = {} # url_base -> news_source_id
+        self._credibility_synced: set[str] = set() # Domínios cujo nome/score já foram conferidos com o JSON de credibilidade
+
+    # --- Carga e consistência com as transações ---
+
+    def _ensure_loaded(self, session: Session):
+        if self._loaded:
+            return
+        data_sources = session.execute(select(EconomicDataSource.name, EconomicDataSource.econ_data_source_id)).all()
+        indicators = session.execute(select(
+            EconomicIndicator.name, EconomicIndicator.indicator_type, EconomicIndicator.indicator_id,
+            EconomicIndicator.frequency, EconomicIndicator.unit, EconomicIndicator.econ_data_source_id
+        )).all()
+        companies = session.execute(select(Company.ticker, Company.company_id)).all()
+        segments = session.execute(select(Segment.name, Segment.segment_id).order_by(Segment.segment_id)).all()
+        news_sources = session.execute(
+            select(NewsSource.url_base, NewsSource.news_source_id)
+            .where(NewsSource.url_base.is_not(None)).order_by(NewsSource.news_source_id)
+        ).all()
+        with self._lock:
+            if self._loaded:
+                return
+            self._data_sources = {name: source_id for name, source_id in data_sources}
+            self._indicators = {(name, indicator_type): (indicator_id, frequency, unit, source_id)
+                                for name, indicator_type, indicator_id, frequency, unit, source_id in indicators}
+            self._companies = {ticker: company_id for ticker, company_id in companies}
+            for name, segment_id in segments:
+                self._segments.setdefault(name.strip().lower(), segment_id)
+            for url_base, news_source_id in news_sources:
+                self._news_sources.setdefault(url_base, news_source_id)
+            self._loaded = True
+        settings.logger.info(
+            f"Registro de dimensões carregado: {len(self._data_sources)} fontes de dados, {len(self._indicators)} indicadores, "
+            f"{len(self._companies)} empresas, {len(self._segments)} segmentos, {len(self._news_sources)} fontes de notícias."
+        )
+
+    def _pending(self, session: Session) -> dict:
+        """IDs resolvidos na transação corrente da sessão, publicados no commit e descartados no rollback."""
+        pending = session.info.get(self._PENDING_KEY)
+        if pending is None:
+            pending = session.info[self._PENDING_KEY] = {table: {} for table in self._TABLES}
+            event.listen(session, "after_commit", self._publish)
+            event.listen(session, "after_rollback", self._discard)
+        return pending
+
+    def _publish(self, session: Session):
+        pending = session.info.get(self._PENDING_KEY)
+        if not pending:
+            return
+        with self._lock:
+            for table, entries in pending.items():
+                getattr(self, f"_{table}").update(entries)
+                entries.clear()
+        session.info.pop(self._MISSES_KEY, None)
+
+    def _discard(self, session: Session):
+        for entries in session.info.get(self._PENDING_KEY, {}).values():
+            entries.clear()
+        session.info.pop(self._MISSES_KEY, None)
+
+    def _misses(self, session: Session) -> set:
+        self._pending(session) # Garante os listeners que limpam as chaves inexistentes no commit/rollback
+        return session.info.setdefault(self._MISSES_KEY, set())
+
+    def _get(self, session: Session, table: str, key):
+        pending = session.info.get(self._PENDING_KEY)
+        if pending and key in pending[table]:
+            return pending[table][key]
+        with self._lock:
+            return getattr(self, f"_{table}").get(key)
+
+    def invalidate(self):
+        """Esquece o cache (ex: após cargas externas nas tabelas de dimensão); recarrega no próximo uso."""
+        with self._lock:
+            self._loaded = False
+            self._data_sources, self._indicators, self._companies, self._segments, self._news_sources = {}, {}, {}, {}, {}
+            self._credibility_synced = set()
+
+    # --- Fontes de dados ---
+
+    def data_source_ids(self, session: Session, source_names: list[str]) -> dict[str, int]:
+        """IDs das fontes de dados pelo nome, criando as ausentes num único INSERT (sem commit)."""
+        self._ensure_loaded(session)
+        result = {name: self._get(session, "data_sources", name) for name in dict.fromkeys(source_names) if name}
+        missing = [name for name, source_id in result.items() if source_id is None]
+        if missing:
+            stmt = pg_insert(EconomicDataSource).values([{"name": name} for name in missing])
+            stmt = stmt.on_conflict_do_update(index_elements=["name"], set_={"name": stmt.excluded.name}) # Update inócuo: RETURNING traz também as linhas já existentes
+            rows = session.execute(stmt.returning(EconomicDataSource.name, EconomicDataSource.econ_data_source_id)).all()
+            self._pending(session)["data_sources"].update(rows)
+            result.update(rows)
+            settings.logger.info(f"Fontes de dados resolvidas em lote: {missing}")
+        return result
+
+    def data_source_id(self, session: Session, source_name: str) -> int | None:
+        if not source_name:
+            settings.logger.error("DimensionRegistry.data_source_id chamado com nome de fonte vazio.")
+            return None
+        return self.data_source_ids(session, [source_name]).get(source_name)
+
+    # --- Indicadores ---
+
+    def ensure_indicators(self, session: Session, specs: list[dict]) -> list[int | None]:
+        """
+        IDs dos indicadores descritos em `specs` (dicts com os parâmetros de get_or_create_indicator_id:
+        indicator_name, indicator_type, frequency, unit e, opcionalmente, econ_data_source_id), na
+        mesma ordem. Indicadores ausentes, ou com frequência/unidade/fonte diferentes, vão num único
+        INSERT ... ON CONFLICT (name, indicator_type) DO UPDATE ... RETURNING. Não faz commit.
+        """
+        self._ensure_loaded(session)
+        keys, to_upsert = [], {}
+        for spec in specs:
+            key = (spec["indicator_name"].strip(), spec["indicator_type"].strip())
+            keys.append(key)
+            source_id = spec.get("econ_data_source_id")
+            cached = self._get(session, "indicators", key)
+            if cached:
+                _indicator_id, frequency, unit, cached_source_id = cached
+                if frequency == spec["frequency"] and unit == spec["unit"] and source_id in (None, cached_source_id):
+                    continue
+            to_upsert[key] = { # Chaves repetidas no mesmo INSERT não são aceitas pelo ON CONFLICT: vale a última
+                "name": key[0], "indicator_type": key[1], "frequency": spec["frequency"],
+                "unit": spec["unit"], "econ_data_source_id": source_id
+            }
+
+        if to_upsert:
+            stmt = pg_insert(EconomicIndicator).values(list(to_upsert.values()))
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_economicindicator_name_type",
+                set_={
+                    "frequency": stmt.excluded.frequency,
+                    "unit": stmt.excluded.unit,
+                    "econ_data_source_id": func.coalesce(stmt.excluded.econ_data_source_id, EconomicIndicator.econ_data_source_id),
+                }
+            ).returning(
+                EconomicIndicator.name, EconomicIndicator.indicator_type, EconomicIndicator.indicator_id,
+                EconomicIndicator.frequency, EconomicIndicator.unit, EconomicIndicator.econ_data_source_id
+            )
+            pending = self._pending(session)["indicators"]
+            for name, indicator_type, indicator_id, frequency, unit, source_id in session.execute(stmt):
+                pending[(name, indicator_type)] = (indicator_id, frequency, unit, source_id)
+            settings.logger.info(f"{len(to_upsert)} indicadores criados/atualizados em lote.")
+
+        ids = []
+        for key in keys:
+            cached = self._get(session, "indicators", key)
+            ids.append(cached[0] if cached else None)
+        return ids
+
+    def indicator_id(self, session: Session, indicator_name: str, indicator_type: str, frequency: str,
+                     unit: str, econ_data_source_id: int = None) -> int | None:
+        """Versão unitária de ensure_indicators; em laços, prefira resolver todos os indicadores de uma vez."""
+        return self.ensure_indicators(session, [{
+            "indicator_name": indicator_name, "indicator_type": indicator_type, "frequency": frequency,
+            "unit": unit, "econ_data_source_id": econ_data_source_id
+        }])[0]
+
+    # --- Empresas e segmentos (somente leitura: são cadastrados pela carga de empresas) ---
+
+    def company_ids(self, session: Session, tickers: list[str]) -> dict[str, int | None]:
+        """company_id de cada ticker; os ausentes do cache são buscados numa única consulta."""
+        self._ensure_loaded(session)
+        result = {ticker: self._get(session, "companies", ticker) for ticker in dict.fromkeys(tickers) if ticker}
+        misses = self._misses(session)
+        missing = [ticker for ticker, company_id in result.items() if company_id is None and ("companies", ticker) not in misses]
+        if missing:
+            found = dict(session.execute(select(Company.ticker, Company.company_id).where(Company.ticker.in_(missing))).all())
+            with self._lock:
+                self._companies.update(found)
+            result.update(found)
+            for ticker in missing:
+                if ticker not in found:
+                    misses.add(("companies", ticker))
+                    settings.logger.info(f"Nenhuma empresa encontrada para o ticker: '{ticker}'.")
+        return result
+
+    def company_id(self, session: Session, ticker_symbol: str) -> int | None:
+        return self.company_ids(session, [ticker_symbol]).get(ticker_symbol)
+
+    def segment_id(self, session: Session, segment_name: str) -> int | None:
+        """segment_id pelo nome (sem diferenciar maiúsculas), como get_segment_id_by_name."""
+        if not segment_name or not segment_name.strip():
+            return None
+        self._ensure_loaded(session)
+        key = segment_name.strip().lower()
+        segment_id = self._get(session, "segments", key)
+        misses = self._misses(session)
+        if segment_id is None and ("segments", key) not in misses:
+            segment_id = get_segment_id_by_name(session, segment_name)
+            if segment_id is None:
+                misses.add(("segments", key))
+            else:
+                with self._lock:
+                    self._segments[key] = segment_id
+        return segment_id
+
+    # --- Fontes de notícias ---
+
+    def news_source_id(self, session: Session, source_domain: str, source_api_name: str | None,
+                       loaded_credibility_data: dict) -> int | None:
+        """
+        news_source_id pelo domínio (url_base). Fontes novas são criadas por get_or_create_news_source,
+        que aplica o nome e o score do JSON de credibilidade e faz o commit da criação. Para fontes
+        já em cache, o nome e o score do JSON são conferidos (e atualizados, com commit) uma vez
+        por domínio por processo, como get_or_create_news_source fazia a cada artigo.
+        """
+        if not source_domain:
+            return None
+        self._ensure_loaded(session)
+        normalized_domain = _normalize_source_domain(source_domain)
+        news_source_id = self._get(session, "news_sources", normalized_domain)
+        with self._lock:
+            needs_sync = normalized_domain not in self._credibility_synced and normalized_domain in (loaded_credibility_data or {})
+        if news_source_id is None or needs_sync:
+            news_source = get_or_create_news_source(session, normalized_domain, source_api_name, loaded_credibility_data)
+            if news_source is None:
+                return None
+            news_source_id = news_source.news_source_id
+            with self._lock: # Já persistida (commit feito por get_or_create_news_source)
+                self._news_sources[normalized_domain] = news_source_id
+                self._credibility_synced.add(normalized_domain)
+        return news_source_id
+
+
+_dimension_registry: DimensionRegistry | None = None
+_dimension_registry_lock = threading.Lock()
+
+def get_dimension_registry() -> DimensionRegistry:
+    """Retorna o registro de dimensões do processo (singleton, compartilhado entre os coletores)."""
+    global _dimension_registry
+    if _dimension_registry is None:
+        with _dimension_registry_lock:
+            if _dimension_registry is None:
+                _dimension_registry = DimensionRegistry()
+    return _dimension_registry
     
 def get_articles_pending_extraction(session: Session, limit: int = 20) -> list[NewsArticle]:
     """
@@ -631,12 +981,14 @@ def get_or_create_segment(session: Session, segment_name: str, subsector_id: int
         settings.logger.info(f"    Criado novo Segmento: '{segment_name}'")
     return segment
 
-def get_articles_pending_analysis(session: Session, limit: int = 100):
+def get_articles_pending_analysis(session: Session, limit: int = 100, after_id: int | None = None):
     """
     Busca artigos que precisam de análise LLM completa, incluindo dados da fonte.
+    Com `after_id`, pagina por chave (news_article_id > after_id), em ordem crescente de ID,
+    permitindo que o pipeline percorra o backlog em pedaços pequenos.
     """
     now = datetime.now(settings.TIMEZONE)
-    articles_data = (
+    query = (
         session.query(NewsArticle)
         .options(joinedload(NewsArticle.news_source)) 
         .filter(
@@ -644,27 +996,205 @@ def get_articles_pending_analysis(session: Session, limit: int = 100):
             NewsArticle.processing_status == 'pending_llm_analysis', 
             (NewsArticle.next_retry_at.is_(None)) | (NewsArticle.next_retry_at <= now)
         )
+    )
+    if after_id is not None:
+        query = query.filter(NewsArticle.news_article_id > after_id)
+    articles_data = (
+        query
+        .order_by(NewsArticle.news_article_id)
         .limit(limit)
         .all()
     )
 
-    result_list = []
-    for article in articles_data:
-        source_credibility = article.news_source.base_credibility_score if article.news_source else 0.5
-        news_source_url = article.news_source.url_base if article.news_source and article.news_source.url_base else article.article_link 
-        news_source_name = article.news_source.name if article.news_source else "Desconhecida"
+    return [_article_to_analysis_dict(article) for article in articles_data]
+
+def _article_to_analysis_dict(article: NewsArticle) -> dict:
+    """Monta o dicionário de entrada da análise LLM a partir de um NewsArticle (com news_source carregado)."""
+    source_credibility = article.news_source.base_credibility_score if article.news_source else 0.5
+    news_source_url = article.news_source.url_base if article.news_source and article.news_source.url_base else article.article_link 
+    news_source_name = article.news_source.name if article.news_source else "Desconhecida"
+
+    return {
+        "news_article_id": article.news_article_id,
+        "headline": article.headline,
+        "article_link": article.article_link,
+        "publication_date": article.publication_date.isoformat() if article.publication_date else None,
+        "article_text_content": article.article_text_content,
+        "news_source_url": news_source_url,      
+        "source_credibility": source_credibility, 
+        "news_source_name": news_source_name      
+    }
 
-        result_list.append({
-            "news_article_id": article.news_article_id,
-            "headline": article.headline,
-            "article_link": article.article_link,
-            "publication_date": article.publication_date.isoformat() if article.publication_date else None,
-            "article_text_content": article.article_text_content,
-            "news_source_url": news_source_url,      
-            "source_credibility": source_credibility, 
-            "news_source_name": news_source_name      
-        })
-    return result_list
+def claim_articles_for_analysis(session: Session, worker_id: str, limit: int = 10,
+                                lease_seconds: int | None = None,
+                                source_status: str = 'pending_llm_analysis',
+                                extra_filters: list | None = None) -> list[dict]:
+    """
+    Reserva atomicamente até `limit` artigos para o worker `worker_id`.
+    As linhas elegíveis são travadas com SELECT ... FOR UPDATE SKIP LOCKED e movidas para
+    'analysis_in_progress' com uma concessão (lease) que expira em `lease_seconds`.
+    Linhas já travadas por outro worker são puladas, então vários processos/hosts podem
+    consumir o mesmo backlog sem analisar o mesmo artigo duas vezes.
+    Retorna os artigos no mesmo formato de get_articles_pending_analysis.
+    """
+    now = datetime.now(timezone.utc)
+    lease_seconds = lease_seconds or settings.ANALYSIS_LEASE_SECONDS
+
+    candidates = (
+        select(NewsArticle.news_article_id)
+        .where(
+            NewsArticle.processing_status == source_status,
+            (NewsArticle.next_retry_at.is_(None)) | (NewsArticle.next_retry_at <= now),
+            *(extra_filters or [])
+        )
+        .order_by(NewsArticle.news_article_id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    try:
+        claimed_ids = session.execute(
+            update(NewsArticle)
+            .where(NewsArticle.news_article_id.in_(candidates))
+            .values(
+                processing_status='analysis_in_progress',
+                claimed_by=worker_id,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                claim_source_status=source_status
+            )
+            .returning(NewsArticle.news_article_id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        settings.logger.error(f"Erro ao reservar artigos para o worker {worker_id}: {e}", exc_info=True)
+        raise
+
+    if not claimed_ids:
+        return []
+
+    settings.logger.info(f"Worker {worker_id} reservou {len(claimed_ids)} artigos (status de origem: '{source_status}').")
+    articles_data = (
+        session.query(NewsArticle)
+        .options(joinedload(NewsArticle.news_source))
+        .filter(NewsArticle.news_article_id.in_(claimed_ids))
+        .order_by(NewsArticle.news_article_id)
+        .all()
+    )
+    return [_article_to_analysis_dict(article) for article in articles_data]
+
+def _requeue_values(count_as_retry: bool, release_status: str) -> dict:
+    """Valores do UPDATE que devolve artigos reservados à fila."""
+    values = {"claimed_by": None, "lease_expires_at": None, "claim_source_status": None}
+    if not count_as_retry:
+        values["processing_status"] = release_status
+        return values
+    # Mesma regra de update_article_with_analysis: atraso exponencial e falha final após o máximo de tentativas
+    values["retries_count"] = NewsArticle.retries_count + 1
+    values["next_retry_at"] = func.now() + func.make_interval(
+        0, 0, 0, 0, 0, 0, settings.BASE_RETRY_DELAY_SECONDS * func.power(2, NewsArticle.retries_count)
+    )
+    values["processing_status"] = case(
+        (NewsArticle.retries_count + 1 >= settings.MAX_LLM_ANALYSIS_RETRIES, 'analysis_failed_max_retries'),
+        else_=release_status
+    )
+    return values
+
+def release_article_claims(session: Session, article_ids: list[int], worker_id: str,
+                           count_as_retry: bool = False,
+                           release_status: str = 'pending_llm_analysis') -> int:
+    """
+    Devolve artigos reservados por `worker_id` para `release_status`.
+    Com `count_as_retry=True` a devolução conta como uma tentativa (falha de processamento).
+    """
+    if not article_ids:
+        return 0
+    try:
+        result = session.execute(
+            update(NewsArticle)
+            .where(
+                NewsArticle.news_article_id.in_(article_ids),
+                NewsArticle.claimed_by == worker_id,
+                NewsArticle.processing_status == 'analysis_in_progress'
+            )
+            .values(**_requeue_values(count_as_retry, release_status))
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        return result.rowcount
+    except Exception as e:
+        session.rollback()
+        settings.logger.error(f"Erro ao liberar reservas do worker {worker_id}: {e}", exc_info=True)
+        return 0
+
+def renew_article_leases(session: Session, article_ids: list[int], worker_id: str,
+                         lease_seconds: int | None = None) -> int:
+    """
+    Renova a reserva dos artigos ainda em processamento por `worker_id`, para que análises
+    longas (ou artigos parados na fila local) não sejam recolhidos pelo reaper. Retorna
+    quantas reservas foram renovadas; as que faltam já foram perdidas.
+    """
+    if not article_ids:
+        return 0
+    lease_seconds = lease_seconds or settings.ANALYSIS_LEASE_SECONDS
+    try:
+        result = session.execute(
+            update(NewsArticle)
+            .where(
+                NewsArticle.news_article_id.in_(article_ids),
+                NewsArticle.claimed_by == worker_id,
+                NewsArticle.processing_status == 'analysis_in_progress'
+            )
+            .values(lease_expires_at=func.now() + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        return result.rowcount
+    except Exception as e:
+        session.rollback()
+        settings.logger.error(f"Erro ao renovar reservas do worker {worker_id}: {e}", exc_info=True)
+        return 0
+
+def reap_expired_article_leases(session: Session) -> int:
+    """
+    Recolhe reservas expiradas (worker morto ou travado). Reservas feitas a partir de
+    'pending_llm_analysis' voltam para a fila e a expiração conta como uma tentativa;
+    as de outra origem (ex.: reanálise de 'analysis_complete') voltam ao status de origem,
+    sem contar tentativa, para que um artigo já analisado não seja rebaixado.
+    """
+    expired = (
+        NewsArticle.processing_status == 'analysis_in_progress',
+        NewsArticle.lease_expires_at < func.now()
+    )
+    from_pending = (NewsArticle.claim_source_status.is_(None)) | (NewsArticle.claim_source_status == 'pending_llm_analysis')
+    try:
+        requeued = session.execute(
+            update(NewsArticle)
+            .where(*expired, from_pending)
+            .values(**_requeue_values(True, 'pending_llm_analysis'))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        restored = session.execute(
+            update(NewsArticle)
+            .where(*expired, ~from_pending)
+            .values(
+                processing_status=NewsArticle.claim_source_status,
+                claimed_by=None,
+                lease_expires_at=None,
+                claim_source_status=None
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        session.commit()
+        if requeued:
+            settings.logger.warning(f"Reaper: {requeued} reservas expiradas devolvidas para a fila.")
+        if restored:
+            settings.logger.warning(f"Reaper: {restored} reservas expiradas devolvidas ao status de origem.")
+        return requeued + restored
+    except Exception as e:
+        session.rollback()
+        settings.logger.error(f"Erro ao recolher reservas expiradas: {e}", exc_info=True)
+        return 0
 
 def update_article_with_analysis(article_id: int, analysis_results: dict):
     """
@@ -712,6 +1242,10 @@ def update_article_with_analysis(article_id: int, analysis_results: dict):
 
             article.processing_status = new_processing_status
             article.last_processed_at = datetime.now(settings.TIMEZONE)
+            # Libera a reserva (lease) do worker, se houver
+            article.claimed_by = None
+            article.lease_expires_at = None
+            article.claim_source_status = None
 
             session.commit()
             settings.logger.info(f"Análise do artigo {article_id} salva com sucesso no banco de dados com status: {article.processing_status}.")
@@ -719,6 +1253,100 @@ def update_article_with_analysis(article_id: int, analysis_results: dict):
             session.rollback()
             settings.logger.error(f"Erro ao salvar análise do artigo {article_id} no banco de dados: {e}", exc_info=True)
 
+def batch_update_articles_with_analysis(analyses: list[tuple[int, dict, datetime]],
+                                        worker_id: str | None = None) -> list[tuple[int, str]]:
+    """
+    Versão em lote de update_article_with_analysis: grava várias análises com um único
+    UPDATE ... FROM (VALUES ...) por página, com a mesma lógica de status/retentativas
+    feita em SQL. Recebe (article_id, analysis_results, processed_at) e retorna
+    (article_id, status gravado) das linhas atualizadas.
+
+    `processed_at` torna a gravação idempotente: uma análise só é aplicada se for mais
+    recente que o last_processed_at do artigo, então reaplicar o mesmo lote (ex: replay do
+    journal após uma queda) não conta a retentativa duas vezes nem sobrescreve uma análise nova.
+
+    Com `worker_id`, a gravação só vale para artigos ainda reservados por esse worker
+    (claimed_by): se a reserva expirou e o artigo foi reservado de novo por outro worker,
+    a análise é descartada em vez de competir com a dele.
+    """
+    from psycopg2.extras import execute_values
+
+    if not analyses:
+        return []
+
+    def to_json(value):
+        return json.dumps(value, ensure_ascii=False) if value is not None else None
+
+    rows = [
+        (
+            article_id,
+            to_json(results.get("llm_analysis_output")),
+            to_json(results.get("conflict_analysis_output")),
+            results.get("source_credibility"),
+            results.get("overall_confidence_score"),
+            results.get("processing_status", 'analysis_failed'), # Default para falha
+            processed_at,
+            worker_id,
+        )
+        for article_id, results, processed_at in analyses
+    ]
+
+    max_retries = int(settings.MAX_LLM_ANALYSIS_RETRIES)
+    base_delay = int(settings.BASE_RETRY_DELAY_SECONDS)
+
+    with get_db_session() as session:
+        try:
+            dbapi_connection = session.connection().connection
+            with dbapi_connection.cursor() as cursor:
+                updated = execute_values(
+                    cursor,
+                    f"""
+                    UPDATE "NewsArticles" AS n
+                    SET llm_analysis_json = v.llm_analysis_json,
+                        conflict_analysis_json = v.conflict_analysis_json,
+                        source_credibility = v.source_credibility,
+                        overall_confidence_score = v.overall_confidence_score,
+                        retries_count = CASE WHEN v.processing_status = 'pending_llm_analysis'
+                                             THEN COALESCE(n.retries_count, 0) + 1 ELSE 0 END,
+                        next_retry_at = CASE WHEN v.processing_status = 'pending_llm_analysis'
+                                              AND COALESCE(n.retries_count, 0) + 1 < {max_retries}
+                                             THEN v.processed_at + make_interval(secs => {base_delay} * power(2, COALESCE(n.retries_count, 0)))
+                                             ELSE NULL END,
+                        processing_status = CASE WHEN v.processing_status = 'pending_llm_analysis'
+                                                  AND COALESCE(n.retries_count, 0) + 1 >= {max_retries}
+                                                 THEN 'analysis_failed_max_retries' ELSE v.processing_status END,
+                        last_processed_at = v.processed_at,
+                        claimed_by = NULL,
+                        lease_expires_at = NULL,
+                        claim_source_status = NULL
+                    FROM (VALUES %s) AS v(news_article_id, llm_analysis_json, conflict_analysis_json,
+                                                  source_credibility, overall_confidence_score, processing_status, processed_at, claimed_by)
+                    WHERE n.news_article_id = v.news_article_id
+                      AND (n.last_processed_at IS NULL OR n.last_processed_at < v.processed_at)
+                      AND (v.claimed_by IS NULL OR (n.claimed_by = v.claimed_by AND n.processing_status = 'analysis_in_progress'))
+                    RETURNING n.news_article_id, n.processing_status
+                    """,
+                    rows,
+                    template="(%s, %s::json, %s::json, %s::double precision, %s::double precision, %s, %s::timestamptz, %s::text)",
+                    page_size=500,
+                    fetch=True
+                )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            settings.logger.error(f"Erro ao salvar lote de {len(rows)} análises no banco de dados: {e}", exc_info=True)
+            raise
+
+    if worker_id is not None and len(updated) < len(rows):
+        updated_ids = {article_id for article_id, _ in updated}
+        dropped = [article_id for article_id, _, _ in analyses if article_id not in updated_ids]
+        settings.logger.warning(f"Worker {worker_id}: análises de {dropped} descartadas (reserva perdida ou análise mais recente já gravada).")
+    max_retries_ids = [article_id for article_id, status in updated if status == 'analysis_failed_max_retries']
+    if max_retries_ids:
+        settings.logger.error(f"Artigos {max_retries_ids} atingiram o máximo de retentativas de reanálise LLM ({settings.MAX_LLM_ANALYSIS_RETRIES}).")
+    settings.logger.info(f"Lote de análises salvo: {len(updated)} de {len(rows)} artigos atualizados.")
+    return [(article_id, status) for article_id, status in updated]
+
 def get_analyses_for_topic(session: Session, topic: str, days_back: int = 7) -> list[dict]:
     """
     Busca análises completas (llm_analysis_json e conflict_analysis_json)
@@ -998,7 +1626,8 @@ def update_article_embedding(article_id: int, text: str):
     """
     Gera e salva o embedding de um texto de artigo na linha correspondente do banco de dados.
     """
-    if not embedding_model_for_db:
+    embedding_model = get_embedding_model()
+    if not embedding_model:
         settings.logger.error("Modelo de embedding não inicializado. Pulando salvamento de embedding.")
         return
 
@@ -1007,7 +1636,7 @@ def update_article_embedding(article_id: int, text: str):
             article = session.query(NewsArticle).filter(NewsArticle.news_article_id == article_id).first()
             if article:
                 # Gera o embedding a partir do texto original
-                embedding = embedding_model_for_db.get_embeddings([text])[0].values
+                embedding = embedding_model.get_embeddings([text])[0].values
                 article.embedding = embedding # Salva na coluna 'embedding'
                 session.commit()
                 settings.logger.info(f"Embedding salvo com sucesso para o artigo {article_id}.")
@@ -1018,29 +1647,33 @@ def update_article_embedding(article_id: int, text: str):
             settings.logger.error(f"Erro ao salvar embedding para o artigo {article_id}: {e}", exc_info=True)
 
 
+def _set_vector_search_params(session: Session):
+    """Ajusta, só para a transação corrente, a precisão da busca no índice vetorial."""
+    if settings.PGVECTOR_INDEX_TYPE == "ivfflat":
+        session.execute(text(f"SET LOCAL ivfflat.probes = {int(settings.PGVECTOR_IVFFLAT_PROBES)}"))
+    else:
+        session.execute(text(f"SET LOCAL hnsw.ef_search = {int(settings.PGVECTOR_HNSW_EF_SEARCH)}"))
+
+
 def find_similar_article(embedding: list[float], threshold: float) -> dict:
     """Busca artigos similares usando pgvector e cosine similarity"""
-    from sqlalchemy import text
-    import numpy as np
-    
-    # Converter para array numpy e depois para string formatada
-    embedding_array = np.array(embedding, dtype=np.float32)
-    embedding_str = "[" + ",".join(str(x) for x in embedding_array) + "]"
-    
+    # O vetor vai como array numpy no parâmetro tipado `Vector`, serializado pelo próprio pgvector
+    embedding_array = np.asarray(embedding, dtype=np.float32)
     max_distance = 1 - threshold
     
-    with get_db_session() as session:
+    with session_scope() as session:
+        _set_vector_search_params(session)
         query = text("""
             SELECT news_article_id, llm_analysis_json 
             FROM "NewsArticles"
-            WHERE (embedding <=> CAST(:embedding AS vector)) < :max_distance
-            ORDER BY embedding <=> CAST(:embedding AS vector)
+            WHERE (embedding <=> :embedding) < :max_distance
+            ORDER BY embedding <=> :embedding
             LIMIT 1
-        """)
+        """).bindparams(bindparam("embedding", type_=Vector(768)))
         
         result = session.execute(
             query,
-            {"embedding": embedding_str, "max_distance": max_distance}
+            {"embedding": embedding_array, "max_distance": max_distance}
         ).fetchone()
         
         if result:
@@ -1051,9 +1684,38 @@ def find_similar_article(embedding: list[float], threshold: float) -> dict:
         return None
 
 
+def find_similar_article_local(embedding: list[float], threshold: float, exclude_id: int | None = None) -> dict:
+    """
+    Mesma busca de find_similar_article, mas respondida pelo índice vetorial local
+    (src/database/vector_index.py). O banco só é consultado quando há um similar, para
+    buscar a análise dele. Sem índice carregado no processo, cai na busca via pgvector.
+    """
+    index = get_local_vector_index()
+    if index is None:
+        return find_similar_article(embedding, threshold)
+
+    match = index.query(embedding, threshold, exclude_id=exclude_id)
+    if not match:
+        return None
+
+    similar_id, _ = match
+    with session_scope() as session:
+        analysis = session.query(NewsArticle.llm_analysis_json).filter(NewsArticle.news_article_id == similar_id).scalar()
+    if analysis is None:
+        return None
+    return {
+        "id": similar_id,
+        "analysis": analysis
+    }
+
+
 def batch_update_precomputed_embeddings(embeddings_batch: list[tuple[int, list[float]]]):
-    """Atualiza embeddings em lote quando já calculados"""
-    from sqlalchemy import text, bindparam
+    """
+    Atualiza embeddings em lote quando já calculados, com um único
+    UPDATE ... FROM (VALUES ...) por página (em vez de um UPDATE por linha).
+    Os vetores vão como arrays numpy pelo adaptador do pgvector registrado na conexão.
+    """
+    from psycopg2.extras import execute_values
     
     if not embeddings_batch:
         return
@@ -1062,28 +1724,28 @@ def batch_update_precomputed_embeddings(embeddings_batch: list[tuple[int, list[f
     
     with get_db_session() as session:
         try:
-            # Usar bindparam para tratamento seguro de tipos
-            update_query = text("""
-                UPDATE "NewsArticles"
-                SET embedding = CAST(:embedding AS vector)
-                WHERE news_article_id = :article_id
-            """)
-            
-            params = []
-            for article_id, embedding in embeddings_batch:
-                # Converter embedding para string formatada 
-                embedding_str = "[" + ",".join(str(x) for x in embedding) + "]"
-                params.append({
-                    "article_id": article_id,
-                    "embedding": embedding_str
-                })
-            
-            session.execute(
-                update_query,
-                params
-            )
+            rows = [(article_id, np.asarray(embedding, dtype=np.float32)) for article_id, embedding in embeddings_batch]
+            dbapi_connection = session.connection().connection
+            with dbapi_connection.cursor() as cursor:
+                execute_values(
+                    cursor,
+                    """
+                    UPDATE "NewsArticles" AS n
+                    SET embedding = v.embedding
+                    FROM (VALUES %s) AS v(news_article_id, embedding)
+                    WHERE n.news_article_id = v.news_article_id
+                    """,
+                    rows,
+                    template="(%s, %s::vector)",
+                    page_size=500
+                )
             session.commit()
             settings.logger.info("Embeddings pré-calculados salvos com sucesso!")
+
+            # Mantém o índice vetorial local (se carregado neste processo) em sincronia com o banco
+            index = get_local_vector_index()
+            if index is not None:
+                index.add(embeddings_batch)
             
         except Exception as e:
             session.rollback()
@@ -0,0 +1,132 @@
+# src/database/indicator_ingest.py
+# -*- coding: utf-8 -*-
+
+import io
+from typing import Iterable, Optional
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from config import settings
+
+# Colunas (e ordem) dos DataFrames de valores de indicadores aceitos por upsert_indicator_frame
+INDICATOR_VALUE_COLUMNS = ["indicator_id", "company_id", "segment_id", "effective_date", "value_numeric", "value_text"]
+CONFLICT_COLUMNS = "indicator_id, effective_date, company_id, segment_id" # uq_economicindicatorvalue_indicator_date_company_segment
+
+STAGING_TABLE = "_indicator_values_staging"
+_CREATE_STAGING_SQL = f"""
+    CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+        seq bigserial,
+        indicator_id integer,
+        company_id integer,
+        segment_id integer,
+        effective_date date,
+        value_numeric double precision,
+        value_text text
+    ) ON COMMIT DELETE ROWS
+"""
+_COPY_SQL = f"COPY {STAGING_TABLE} ({', '.join(INDICATOR_VALUE_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+# Última ocorrência de cada chave vence (seq DESC), como aconteceria com upserts sucessivos
+_UPSERT_SQL = f"""
+    INSERT INTO "EconomicIndicatorValues" ({', '.join(INDICATOR_VALUE_COLUMNS)}, collection_timestamp)
+    SELECT DISTINCT ON ({CONFLICT_COLUMNS}) {', '.join(INDICATOR_VALUE_COLUMNS)}, now()
+    FROM {STAGING_TABLE}
+    ORDER BY {CONFLICT_COLUMNS}, seq DESC
+    ON CONFLICT ({CONFLICT_COLUMNS}) DO UPDATE SET
+        value_numeric = EXCLUDED.value_numeric,
+        value_text = EXCLUDED.value_text,
+        collection_timestamp = EXCLUDED.collection_timestamp
+"""
+
+
+def _effective_dates(values) -> pd.DatetimeIndex:
+    """Datas (meia-noite, sem fuso) de uma coluna/índice de datas; datas com fuso mantêm o dia local."""
+    dates = pd.DatetimeIndex(pd.to_datetime(values))
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    return dates.normalize()
+
+
+def series_to_frame(df: pd.DataFrame, indicator_id: int, company_id: Optional[int] = None,
+                    segment_id: Optional[int] = None, date_column: str = "date",
+                    value_column: str = "value") -> pd.DataFrame:
+    """
+    Converte uma série (colunas `date_column`/`value_column`, como as dos coletores macro) no
+    DataFrame de INDICATOR_VALUE_COLUMNS, sem iterar linha a linha.
+    """
+    return pd.DataFrame({
+        "indicator_id": indicator_id,
+        "company_id": company_id,
+        "segment_id": segment_id,
+        "effective_date": _effective_dates(df[date_column]),
+        "value_numeric": df[value_column].astype(float).to_numpy(),
+        "value_text": None,
+    }, columns=INDICATOR_VALUE_COLUMNS)
+
+
+def indexed_series_to_frame(series: pd.Series, indicator_id: int, company_id: Optional[int] = None,
+                            segment_id: Optional[int] = None) -> pd.DataFrame:
+    """Como series_to_frame, para uma série indexada por data (ex: uma coluna do histórico do yfinance)."""
+    return pd.DataFrame({
+        "indicator_id": indicator_id,
+        "company_id": company_id,
+        "segment_id": segment_id,
+        "effective_date": _effective_dates(series.index),
+        "value_numeric": series.astype(float).to_numpy(),
+        "value_text": None,
+    }, columns=INDICATOR_VALUE_COLUMNS)
+
+
+def records_to_frame(records: list[dict]) -> pd.DataFrame:
+    """DataFrame de INDICATOR_VALUE_COLUMNS a partir de registros no formato de batch_upsert_indicator_values."""
+    return pd.DataFrame.from_records(records, columns=INDICATOR_VALUE_COLUMNS)
+
+
+def concat_indicator_frames(frames: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    frames = [frame for frame in frames if frame is not None and not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=INDICATOR_VALUE_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _prepare_for_copy(frame: pd.DataFrame) -> pd.DataFrame:
+    frame = frame[INDICATOR_VALUE_COLUMNS].copy()
+    for column in ("indicator_id", "company_id", "segment_id"):
+        frame[column] = frame[column].astype("Int64") # Sem o ".0" que o CSV teria com NaN em colunas float
+    frame["effective_date"] = _effective_dates(frame["effective_date"])
+    frame["value_numeric"] = pd.to_numeric(frame["value_numeric"]).astype(float)
+    return frame
+
+
+def upsert_indicator_frame(session: Session, frame: pd.DataFrame, chunk_size: Optional[int] = None,
+                           watermarks=None) -> int:
+    """
+    UPSERT em lote de valores de indicadores em EconomicIndicatorValues: cada pedaço de
+    `chunk_size` linhas vai por COPY para uma tabela temporária e entra com um único
+    INSERT ... ON CONFLICT DO UPDATE (mesma semântica de batch_upsert_indicator_values).
+    Não faz commit: roda na transação da sessão, como o restante das ferramentas de coleta.
+    Se `watermarks` (IndicatorWatermarks) for dado, as marcas avançam a cada pedaço gravado.
+    """
+    if frame is None or frame.empty:
+        settings.logger.info("upsert_indicator_frame: Nenhum registro para inserir.")
+        return 0
+
+    chunk_size = chunk_size or settings.INDICATOR_UPSERT_CHUNK_SIZE
+    frame = _prepare_for_copy(frame)
+    rows_affected = 0
+    dbapi_connection = session.connection().connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.execute(_CREATE_STAGING_SQL)
+        for start in range(0, len(frame), chunk_size):
+            buffer = io.StringIO()
+            frame.iloc[start:start + chunk_size].to_csv(buffer, header=False, index=False, na_rep="\\N", date_format="%Y-%m-%d")
+            buffer.seek(0)
+            cursor.copy_expert(_COPY_SQL, buffer)
+            cursor.execute(_UPSERT_SQL)
+            rows_affected += cursor.rowcount
+            cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+            if watermarks is not None:
+                watermarks.advance_from_frame(frame.iloc[start:start + chunk_size])
+
+    settings.logger.info(f"{rows_affected} registros de valores de indicadores foram inseridos/atualizados na sessão ({len(frame)} enviados via COPY).")
+    return rows_affected
@@ -0,0 +1,271 @@
+# src/database/vector_index.py
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import settings
+from src.database.create_db_tables import NewsArticle
+
+# hnswlib é opcional: sem ele o índice usa busca exata com numpy (produto interno de vetores normalizados)
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+
+class LocalVectorIndex:
+    """
+    Índice em memória dos embeddings de NewsArticle para a deduplicação RAG do pipeline.
+
+    O Postgres continua sendo a fonte da verdade: o índice é carregado do disco na partida,
+    completado com os embeddings que faltam no banco (`sync_from_db`) e recebe inserções
+    incrementais à medida que `batch_update_precomputed_embeddings` grava novos vetores.
+    Os embeddings gravados por outros workers entram com `sync_from_db(incremental=True)`,
+    chamado periodicamente pelo pipeline, que só olha os artigos acima do piso de sincronização.
+    Artigos com embedding dummy (zeros) não entram no índice; seus IDs são guardados à parte
+    para não serem buscados de novo no banco a cada partida.
+    Usa HNSW (hnswlib) quando disponível e, caso contrário, busca exata com numpy.
+    Os rótulos do índice são os próprios news_article_id.
+    """
+
+    def __init__(self, index_dir: Path, dim: int = 768):
+        self.index_dir = Path(index_dir)
+        self.dim = dim
+        self.backend = "hnsw" if hnswlib is not None else "numpy"
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock() # Uma sincronização com o banco por vez
+        self._placeholder_ids: set[int] = set() # Artigos com embedding dummy (zeros) no banco
+        self._sync_floor = 0 # Abaixo deste ID não há embedding novo esperado (ver sync_from_db)
+
+        # Backend HNSW
+        self._hnsw = None
+        # Backend numpy: matriz de vetores normalizados + posição de cada ID
+        self._matrix = np.empty((0, dim), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._positions: dict[int, int] = {}
+        self._size = 0
+
+        if self.backend == "hnsw":
+            self._hnsw = self._new_hnsw(settings.VECTOR_INDEX_INITIAL_CAPACITY)
+
+    # --- Construção e persistência ---
+
+    def _new_hnsw(self, max_elements: int):
+        index = hnswlib.Index(space="cosine", dim=self.dim)
+        index.init_index(max_elements=max_elements, ef_construction=settings.VECTOR_INDEX_EF_CONSTRUCTION, M=settings.VECTOR_INDEX_M)
+        index.set_ef(settings.VECTOR_INDEX_EF_SEARCH)
+        return index
+
+    def __len__(self) -> int:
+        if self._hnsw is not None:
+            return self._hnsw.get_current_count()
+        return self._size
+
+    def ids(self) -> set[int]:
+        with self._lock:
+            if self._hnsw is not None:
+                return set(int(i) for i in self._hnsw.get_ids_list())
+            return set(self._ids[:self._size].tolist())
+
+    def save(self):
+        """Grava o índice em disco de forma atômica (arquivo temporário + os.replace)."""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if self._hnsw is not None:
+                tmp_path = self.index_dir / "hnsw.bin.tmp"
+                self._hnsw.save_index(str(tmp_path))
+                os.replace(tmp_path, self.index_dir / "hnsw.bin")
+            else:
+                tmp_path = self.index_dir / "vectors.npz.tmp"
+                with open(tmp_path, "wb") as f:
+                    np.savez(f, ids=self._ids[:self._size], vectors=self._matrix[:self._size])
+                os.replace(tmp_path, self.index_dir / "vectors.npz")
+            tmp_path = self.index_dir / "placeholders.npy.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.array(sorted(self._placeholder_ids), dtype=np.int64))
+            os.replace(tmp_path, self.index_dir / "placeholders.npy")
+        settings.logger.info(f"Índice vetorial local ({self.backend}) salvo com {len(self)} vetores em {self.index_dir}.")
+
+    def load(self) -> bool:
+        """Carrega o índice salvo, se existir. Retorna True se carregou."""
+        try:
+            if self.backend == "hnsw":
+                path = self.index_dir / "hnsw.bin"
+                if not path.exists():
+                    return False
+                index = hnswlib.Index(space="cosine", dim=self.dim)
+                index.load_index(str(path), max_elements=0)
+                index.set_ef(settings.VECTOR_INDEX_EF_SEARCH)
+                with self._lock:
+                    self._hnsw = index
+            else:
+                path = self.index_dir / "vectors.npz"
+                if not path.exists():
+                    return False
+                with np.load(path) as data:
+                    ids, vectors = data["ids"].astype(np.int64), data["vectors"].astype(np.float32)
+                with self._lock:
+                    self._ids, self._matrix, self._size = ids, vectors, len(ids)
+                    self._positions = {int(article_id): pos for pos, article_id in enumerate(ids)}
+            placeholders_path = self.index_dir / "placeholders.npy"
+            if placeholders_path.exists():
+                with self._lock:
+                    self._placeholder_ids = set(np.load(placeholders_path).tolist())
+            settings.logger.info(f"Índice vetorial local ({self.backend}) carregado do disco com {len(self)} vetores.")
+            return True
+        except Exception as e:
+            settings.logger.warning(f"Não foi possível carregar o índice vetorial local de {self.index_dir}: {e}. Será reconstruído a partir do banco.")
+            return False
+
+    def sync_from_db(self, session: Session, page_size: int = 1000, incremental: bool = False) -> int:
+        """
+        Adiciona ao índice os embeddings do banco que ainda não estão nele (nem entre os dummies
+        conhecidos). Busca primeiro só os IDs (barato) e depois os vetores que faltam, em páginas.
+
+        Com `incremental=True` só considera IDs acima do piso de sincronização: o menor artigo
+        ainda pendente/em análise sem embedding na sincronização anterior (workers processam em
+        paralelo, então um ID menor pode ganhar embedding depois de um maior), ou o maior ID já
+        visto quando não há nenhum. Se outra sincronização estiver em andamento, não faz nada.
+        """
+        if not self._sync_lock.acquire(blocking=False):
+            return 0
+        try:
+            # Piso calculado antes da lista de IDs: um artigo que ganhe embedding entre as duas consultas continua acima dele
+            first_pending = (
+                session.query(func.min(NewsArticle.news_article_id))
+                .filter(
+                    NewsArticle.embedding.is_(None),
+                    NewsArticle.processing_status.in_(("pending_llm_analysis", "analysis_in_progress"))
+                )
+                .scalar()
+            )
+            query = session.query(NewsArticle.news_article_id).filter(NewsArticle.embedding.isnot(None))
+            if incremental:
+                query = query.filter(NewsArticle.news_article_id > self._sync_floor)
+            db_ids = {row[0] for row in query.all()}
+            with self._lock:
+                known_placeholders = set(self._placeholder_ids)
+            missing_ids = sorted(db_ids - known_placeholders - self.ids())
+            for start in range(0, len(missing_ids), page_size):
+                page_ids = missing_ids[start:start + page_size]
+                rows = (
+                    session.query(NewsArticle.news_article_id, NewsArticle.embedding)
+                    .filter(NewsArticle.news_article_id.in_(page_ids))
+                    .all()
+                )
+                self.add([(article_id, embedding) for article_id, embedding in rows])
+
+            if first_pending is not None:
+                self._sync_floor = first_pending - 1
+            elif db_ids:
+                self._sync_floor = max(self._sync_floor, max(db_ids))
+            if missing_ids:
+                settings.logger.info(f"Índice vetorial local sincronizado: {len(missing_ids)} embeddings adicionados a partir do banco.")
+            return len(missing_ids)
+        finally:
+            self._sync_lock.release()
+
+    # --- Inserção e consulta ---
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        norms = np.linalg.norm(vectors, axis=1)
+        valid = norms > 0 # Embeddings dummy (zeros) não têm direção e ficam fora do índice
+        return vectors[valid] / norms[valid, None], valid
+
+    def add(self, items: list[tuple[int, list[float]]]):
+        """Insere (ou substitui) os vetores dos artigos informados."""
+        if not items:
+            return
+        ids = np.array([article_id for article_id, _ in items], dtype=np.int64)
+        vectors = np.asarray([np.asarray(embedding, dtype=np.float32) for _, embedding in items], dtype=np.float32)
+        vectors, valid = self._normalize(vectors)
+        with self._lock:
+            self._placeholder_ids.update(ids[~valid].tolist())
+            self._placeholder_ids.difference_update(ids[valid].tolist())
+        ids = ids[valid]
+        if not len(ids):
+            return
+
+        with self._lock:
+            if self._hnsw is not None:
+                needed = self._hnsw.get_current_count() + len(ids)
+                if needed > self._hnsw.get_max_elements():
+                    self._hnsw.resize_index(max(needed, self._hnsw.get_max_elements() * 2))
+                self._hnsw.add_items(vectors, ids)
+                return
+
+            for article_id, vector in zip(ids.tolist(), vectors):
+                pos = self._positions.get(article_id)
+                if pos is None:
+                    if self._size == len(self._ids):
+                        capacity = max(1024, self._size * 2)
+                        self._matrix = np.resize(self._matrix, (capacity, self.dim))
+                        self._ids = np.resize(self._ids, capacity)
+                    pos = self._size
+                    self._size += 1
+                    self._ids[pos] = article_id
+                    self._positions[article_id] = pos
+                self._matrix[pos] = vector
+
+    def query(self, embedding: list[float], threshold: float, exclude_id: int | None = None) -> tuple[int, float] | None:
+        """
+        Retorna (news_article_id, similaridade) do vizinho mais próximo com similaridade de
+        cosseno >= threshold, ignorando `exclude_id` (o próprio artigo). None se não houver.
+        """
+        vector, valid = self._normalize(np.asarray([embedding], dtype=np.float32))
+        if not valid[0] or len(self) == 0:
+            return None
+
+        with self._lock:
+            if self._hnsw is not None:
+                k = min(2, self._hnsw.get_current_count())
+                labels, distances = self._hnsw.knn_query(vector, k=k)
+                candidates = zip(labels[0].tolist(), (1.0 - distances[0]).tolist())
+            else:
+                similarities = self._matrix[:self._size] @ vector[0]
+                top = np.argpartition(similarities, -2)[-2:] if self._size > 2 else np.arange(self._size)
+                top = top[np.argsort(similarities[top])[::-1]]
+                candidates = [(int(self._ids[i]), float(similarities[i])) for i in top]
+
+            for article_id, similarity in candidates:
+                if article_id != exclude_id:
+                    return (int(article_id), similarity) if similarity >= threshold else None
+        return None
+
+
+_local_index: LocalVectorIndex | None = None
+
+
+def get_local_vector_index() -> LocalVectorIndex | None:
+    """Retorna o índice local se ele já foi carregado neste processo (ver load_local_vector_index)."""
+    return _local_index
+
+
+def load_local_vector_index(session: Session) -> LocalVectorIndex:
+    """
+    Carrega (warm-load) o índice do disco, completa com o que falta no Postgres, salva e o
+    registra como índice do processo. A partir daí as gravações de embeddings o mantêm atualizado.
+    """
+    global _local_index
+    index = LocalVectorIndex(settings.VECTOR_INDEX_DIR)
+    index.load()
+    known_placeholders = len(index._placeholder_ids)
+    added = index.sync_from_db(session)
+    if added or len(index._placeholder_ids) != known_placeholders:
+        index.save()
+    _local_index = index
+    return index
+
+
+def sync_local_vector_index(session: Session) -> int:
+    """Traz para o índice do processo os embeddings gravados por outros workers desde a última sincronização."""
+    if _local_index is None:
+        return 0
+    return _local_index.sync_from_db(session, incremental=True)
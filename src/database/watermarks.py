@@ -0,0 +1,91 @@
+# src/database/watermarks.py
+# -*- coding: utf-8 -*-
+
+import threading
+from datetime import date
+from typing import Optional
+
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from config import settings
+from src.database.create_db_tables import EconomicIndicator, EconomicIndicatorValue
+from src.database.db_utils import get_latest_effective_date
+
+WatermarkKey = tuple[int, Optional[int], Optional[int]] # (indicator_id, company_id, segment_id)
+
+
+class IndicatorWatermarks:
+    """
+    Última effective_date gravada (MAX) por (indicator_id, company_id, segment_id), para a
+    coleta incremental. load() traz as marcas de todos os indicadores de uma fonte com uma
+    única consulta agrupada; depois disso get() é uma consulta em memória e as marcas
+    avançam à medida que os lotes são gravados (advance_from_frame).
+    """
+
+    def __init__(self, session: Session):
+        self._session = session # Usada só para indicadores fora do que foi carregado
+        self._latest: dict[WatermarkKey, date] = {}
+        self._covered: set[int] = set() # Indicadores cujas marcas foram carregadas (mesmo sem valores)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, session: Session, econ_data_source_id: Optional[int] = None) -> "IndicatorWatermarks":
+        """Carrega as marcas dos indicadores da fonte `econ_data_source_id` (todos, se None)."""
+        watermarks = cls(session)
+        value = EconomicIndicatorValue
+        stmt = (
+            select(EconomicIndicator.indicator_id, value.company_id, value.segment_id, func.max(value.effective_date))
+            .select_from(EconomicIndicator)
+            .outerjoin(value, value.indicator_id == EconomicIndicator.indicator_id)
+            .group_by(EconomicIndicator.indicator_id, value.company_id, value.segment_id)
+        )
+        if econ_data_source_id is not None:
+            stmt = stmt.where(EconomicIndicator.econ_data_source_id == econ_data_source_id)
+
+        for indicator_id, company_id, segment_id, latest in session.execute(stmt):
+            watermarks._covered.add(indicator_id)
+            if latest is not None:
+                watermarks._latest[(indicator_id, company_id, segment_id)] = latest
+        settings.logger.info(
+            f"Marcas de coleta incremental carregadas: {len(watermarks._latest)} séries de "
+            f"{len(watermarks._covered)} indicadores (fonte {econ_data_source_id})."
+        )
+        return watermarks
+
+    def get(self, indicator_id: int, company_id: Optional[int] = None,
+            segment_id: Optional[int] = None) -> date | None:
+        """
+        Última effective_date da série, ou None se ela ainda não tem valores. Indicadores fora
+        do que foi carregado (ex: criados nesta execução) são consultados uma vez e memorizados.
+        """
+        key = (indicator_id, company_id, segment_id)
+        with self._lock:
+            if indicator_id in self._covered or key in self._latest:
+                return self._latest.get(key)
+        latest = get_latest_effective_date(self._session, indicator_id, company_id, segment_id)
+        with self._lock:
+            if latest is not None:
+                self._latest[key] = max(latest, self._latest.get(key, latest))
+            return self._latest.get(key)
+
+    def advance(self, indicator_id: int, company_id: Optional[int], segment_id: Optional[int], effective_date: date):
+        key = (indicator_id, company_id, segment_id)
+        with self._lock:
+            current = self._latest.get(key)
+            if current is None or effective_date > current:
+                self._latest[key] = effective_date
+
+    def advance_from_frame(self, frame: pd.DataFrame):
+        """Avança as marcas com um DataFrame de INDICATOR_VALUE_COLUMNS recém-gravado."""
+        if frame.empty:
+            return
+        latest = frame.groupby(["indicator_id", "company_id", "segment_id"], dropna=False)["effective_date"].max()
+        for (indicator_id, company_id, segment_id), effective_date in latest.items():
+            self.advance(
+                int(indicator_id),
+                None if pd.isna(company_id) else int(company_id),
+                None if pd.isna(segment_id) else int(segment_id),
+                pd.Timestamp(effective_date).date()
+            )
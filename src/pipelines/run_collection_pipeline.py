@@ -0,0 +1,236 @@
+# src/pipelines/run_collection_pipeline.py
+#
+# Coleta agendada determinística: executa as ferramentas dos coletores diretamente (sem o
+# AgenteOrquestradorColeta decidindo a ordem via LLM), como um DAG de tarefas. Fontes
+# independentes rodam em paralelo em threads, limitadas por grupo de concorrência, com
+# timeout e retentativas por tarefa; uma tarefa só começa quando suas dependências terminam
+# com sucesso. Um ciclo completo passa a durar o tempo da fonte mais lenta, não a soma de
+# todas. O orquestrador LLM continua disponível para pedidos ad-hoc.
+#
+# Uso: python -m src.pipelines.run_collection_pipeline [--only nome] [--skip nome] [--list]
+
+import argparse
+import asyncio
+import importlib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from config import settings
+
+# Tarefa -> ferramenta ("módulo:função", importada só na execução, para que a falta de
+# dependência de uma fonte não impeça as demais), grupo de concorrência e dependências.
+# "inputs": dependências cujo retorno é passado à ferramenta como argumento de mesmo nome.
+COLLECTION_TASKS = {
+    "bcb": {"target": "src.agents.coletores.agente_coletor_bcb_adk.tools.tool_collect_bcb_indicators:collect_and_store_bcb_indicators", "group": "macro_br"},
+    "ibge": {"target": "src.agents.coletores.agente_coletor_ibge_adk.tools.tool_collect_ibge_indicators:collect_and_store_ibge_indicators", "group": "macro_br"},
+    "fgv": {"target": "src.agents.coletores.agente_coletor_fgv_adk.tools.tool_collect_fgv_indicators:collect_and_store_fgv_indicators", "group": "macro_br"},
+    "fred": {"target": "src.agents.coletores.agente_coletor_fred_adk.tools.tool_collect_fred_indicators:collect_and_store_fred_indicators", "group": "macro_us"},
+    "eia": {"target": "src.agents.coletores.agente_coletor_eia_adk.tools.tool_collect_eia_indicators:collect_and_store_eia_indicators", "group": "macro_us"},
+    "yfinance": {"target": "src.agents.coletores.agente_coletor_yfinance_adk.tools.tool_collect_yfinance:collect_and_store_yfinance_indicators", "group": "mercado", "timeout_s": 3600},
+    "fundamentus": {"target": "src.agents.coletores.agente_coletor_fundamentus_adk.tools.tool_collect_fundamentus_indicators:collect_and_store_fundamentus_indicators", "group": "mercado"},
+    "rss": {"target": "src.agents.coletores.agente_coletor_rss_adk.tools.tool_collect_rss_articles:tool_collect_rss_articles", "group": "noticias"},
+    "newsapi": {"target": "src.agents.coletores.agente_coletor_newsapi_adk.tools.tool_collect_newsapi_articles:tool_collect_newsapi_articles", "group": "noticias"},
+    "cvm_download": {"target": "src.agents.coletores.agente_coletor_regulatorios_adk.tools.ferramenta_downloader_cvm:tool_download_cvm_data", "group": "regulatorios"},
+    "cvm_ipe": {"target": "src.pipelines.run_collection_pipeline:process_cvm_ipe_files", "group": "regulatorios", "depends_on": ["cvm_download"], "inputs": ["cvm_download"], "timeout_s": 3600},
+}
+
+
+def process_cvm_ipe_files(cvm_download: dict | None = None) -> dict:
+    """
+    Processa os arquivos IPE da CVM informados por cvm_download (resultado de tool_download_cvm_data)
+    para todas as empresas com código CVM cadastrado, lendo cada arquivo uma única vez.
+    """
+    from src.agents.coletores.agente_coletor_regulatorios_adk.tools.ferramenta_downloader_cvm import tool_download_cvm_data
+    from src.agents.coletores.agente_coletor_regulatorios_adk.tools.ferramenta_processador_ipe import tool_process_cvm_ipe_local_multi
+    from src.database.create_db_tables import Company
+    from src.database.db_utils import session_scope
+
+    with session_scope() as session:
+        cvm_codes = [code for (code,) in session.query(Company.cvm_code).filter(Company.cvm_code.isnot(None)).all()]
+    if not cvm_codes:
+        return {"status": "success", "message": "Nenhuma empresa com código CVM cadastrado."}
+
+    if cvm_download is None: # Execução avulsa, fora do agendador
+        cvm_download = tool_download_cvm_data()
+    zip_files = [path for path in cvm_download.get("downloaded_files_map", {}).values() if Path(path).exists()]
+    if not zip_files:
+        return {"status": "error", "message": "Nenhum arquivo IPE informado pelo download da CVM."}
+
+    messages, errors = [], 0
+    for zip_file in zip_files:
+        result = tool_process_cvm_ipe_local_multi(caminho_zip_local=str(zip_file), codigos_cvm=cvm_codes)
+        errors += result.get("status") == "error"
+        messages.append(f"{Path(zip_file).name}: {result.get('message')}")
+    return {
+        "status": "error" if errors == len(zip_files) else "success",
+        "message": f"{len(zip_files)} arquivos IPE x {len(cvm_codes)} empresas, {errors} com erro. " + " | ".join(messages)
+    }
+
+
+def _call_target(target: str, kwargs: dict):
+    """Importa e executa a ferramenta na thread do executor (o import também pode ser lento)."""
+    module_name, function_name = target.split(":")
+    return getattr(importlib.import_module(module_name), function_name)(**kwargs)
+
+
+def _is_failure(result) -> bool:
+    """As ferramentas sinalizam erro com {"status": "error"} ou com uma mensagem começando por "Erro"."""
+    if isinstance(result, dict):
+        return result.get("status") == "error"
+    return isinstance(result, str) and result.strip().lower().startswith("erro")
+
+
+def _summarize(result) -> str:
+    message = result.get("message", result) if isinstance(result, dict) else result
+    return str(message)[:300]
+
+
+def _validate_dag(task_names: list[str]):
+    """Garante que as dependências existem na seleção e que não há ciclos."""
+    visiting, done = set(), set()
+
+    def visit(name, path):
+        if name in done: return
+        if name in visiting:
+            raise ValueError(f"Ciclo nas dependências da coleta: {' -> '.join(path + [name])}")
+        visiting.add(name)
+        if not set(COLLECTION_TASKS[name].get("inputs", [])) <= set(COLLECTION_TASKS[name].get("depends_on", [])):
+            raise ValueError(f"Os inputs da tarefa '{name}' precisam estar em depends_on.")
+        for dependency in COLLECTION_TASKS[name].get("depends_on", []):
+            if dependency not in task_names:
+                raise ValueError(f"A tarefa '{name}' depende de '{dependency}', que não foi selecionada.")
+            visit(dependency, path + [name])
+        visiting.discard(name)
+        done.add(name)
+
+    for name in task_names:
+        visit(name, [])
+
+
+class CollectionScheduler:
+    """Executa as tarefas selecionadas de COLLECTION_TASKS respeitando dependências, grupos, timeouts e retentativas."""
+
+    def __init__(self, task_names: list[str], max_workers: int | None = None):
+        _validate_dag(task_names)
+        self.task_names = task_names
+        self.max_workers = max_workers or settings.COLLECTION_MAX_WORKERS
+        self.results: dict[str, dict] = {}
+        self._returns: dict[str, object] = {} # Retorno bruto das tarefas com sucesso, para os "inputs" das dependentes
+        self._worker_slots: asyncio.Semaphore | None = None
+
+    async def _call_in_executor(self, target: str, kwargs: dict, executor: ThreadPoolExecutor, timeout_s: float):
+        """
+        Executa a ferramenta quando há uma thread livre; só então começa a contar o timeout, para
+        que o tempo na fila do executor não conte como timeout. A vaga só é devolvida quando a
+        thread termina de fato, inclusive depois de um timeout.
+        """
+        await self._worker_slots.acquire()
+        future = asyncio.get_running_loop().run_in_executor(executor, _call_target, target, kwargs)
+        future.add_done_callback(lambda _: self._worker_slots.release())
+        # shield: o timeout não cancela o future, então a vaga continua ocupada enquanto a thread roda
+        return await asyncio.wait_for(asyncio.shield(future), timeout=timeout_s)
+
+    async def _run_attempts(self, name: str, executor: ThreadPoolExecutor) -> dict:
+        task = COLLECTION_TASKS[name]
+        timeout_s = task.get("timeout_s", settings.COLLECTION_TASK_TIMEOUT_SECONDS)
+        retries = task.get("retries", settings.COLLECTION_TASK_RETRIES)
+        kwargs = {dependency: self._returns.get(dependency) for dependency in task.get("inputs", [])}
+        started_at = time.perf_counter()
+        outcome = {"status": "error", "attempts": 0, "message": ""}
+
+        for attempt in range(1, retries + 2):
+            outcome["attempts"] = attempt
+            try:
+                result = await self._call_in_executor(task["target"], kwargs, executor, timeout_s)
+                outcome["message"] = _summarize(result)
+                if not _is_failure(result):
+                    outcome["status"] = "success"
+                    self._returns[name] = result
+                    break
+            except asyncio.TimeoutError:
+                # A thread não pode ser interrompida: não há retentativa enquanto ela ainda roda
+                outcome.update(status="timeout", message=f"Sem resposta após {timeout_s}s.")
+                settings.logger.warning(
+                    f"Coleta '{name}': timeout após {timeout_s}s, mas o coletor continua rodando em segundo plano. "
+                    f"Ele ocupa uma das {self.max_workers} threads até terminar, e o processo só encerra quando ele acabar."
+                )
+                break
+            except (ImportError, SystemExit) as e: # Alguns módulos chamam sys.exit quando falta uma dependência
+                outcome["message"] = f"Dependência indisponível: {e!r}"
+                break
+            except Exception as e:
+                outcome["message"] = f"{type(e).__name__}: {e}"
+
+            if attempt <= retries:
+                delay = settings.COLLECTION_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                settings.logger.warning(f"Coleta '{name}' falhou (tentativa {attempt}): {outcome['message']} | Nova tentativa em {delay:.0f}s.")
+                await asyncio.sleep(delay)
+
+        outcome["duration_s"] = round(time.perf_counter() - started_at, 1)
+        return outcome
+
+    async def _run_task(self, name: str, done_events: dict, semaphores: dict, executor: ThreadPoolExecutor):
+        try:
+            dependencies = COLLECTION_TASKS[name].get("depends_on", [])
+            for dependency in dependencies:
+                await done_events[dependency].wait()
+            failed = [dependency for dependency in dependencies if self.results[dependency]["status"] != "success"]
+            if failed:
+                self.results[name] = {"status": "skipped", "attempts": 0, "duration_s": 0.0, "message": f"Dependências sem sucesso: {failed}"}
+                return
+
+            async with semaphores[COLLECTION_TASKS[name]["group"]]:
+                settings.logger.info(f"Coleta '{name}' iniciada.")
+                self.results[name] = await self._run_attempts(name, executor)
+        finally:
+            self.results.setdefault(name, {"status": "error", "attempts": 0, "duration_s": 0.0, "message": "Interrompida."})
+            result = self.results[name]
+            log = settings.logger.info if result["status"] in ("success", "skipped") else settings.logger.error
+            log(f"Coleta '{name}': {result['status']} em {result['duration_s']}s ({result['attempts']} tentativa(s)). {result['message']}")
+            done_events[name].set()
+
+    async def run(self) -> dict[str, dict]:
+        done_events = {name: asyncio.Event() for name in self.task_names}
+        groups = {COLLECTION_TASKS[name]["group"] for name in self.task_names}
+        semaphores = {group: asyncio.Semaphore(settings.COLLECTION_GROUP_LIMITS.get(group, 1)) for group in groups}
+        # Vagas do executor: o timeout de uma tarefa só começa quando ela consegue uma (ver _call_in_executor)
+        self._worker_slots = asyncio.Semaphore(self.max_workers)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="coleta")
+        try:
+            await asyncio.gather(*(self._run_task(name, done_events, semaphores, executor) for name in self.task_names))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True) # Não espera aqui por tarefas que estouraram o timeout
+        return self.results
+
+
+async def main(task_names: list[str]) -> int:
+    settings.logger.info(f"--- INÍCIO DA COLETA AGENDADA: {', '.join(task_names)} ---")
+    started_at = time.perf_counter()
+    results = await CollectionScheduler(task_names).run()
+    elapsed = time.perf_counter() - started_at
+
+    sequential = sum(result["duration_s"] for result in results.values())
+    failures = [name for name, result in results.items() if result["status"] != "success"]
+    settings.logger.info(
+        f"RESUMO DA COLETA: {len(results) - len(failures)}/{len(results)} tarefas com sucesso em {elapsed:.1f}s "
+        f"(soma das tarefas: {sequential:.1f}s)." + (f" Sem sucesso: {', '.join(failures)}." if failures else "")
+    )
+    return len(failures)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Coleta agendada de todas as fontes, em paralelo.")
+    parser.add_argument("--only", action="append", choices=sorted(COLLECTION_TASKS), help="Executa só esta tarefa (pode repetir)")
+    parser.add_argument("--skip", action="append", choices=sorted(COLLECTION_TASKS), default=[], help="Não executa esta tarefa (pode repetir)")
+    parser.add_argument("--list", action="store_true", help="Lista as tarefas e sai")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, task in COLLECTION_TASKS.items():
+            print(f"{name:<12} grupo={task['group']:<12} depende de={task.get('depends_on', [])}")
+        sys.exit(0)
+
+    selected = [name for name in (args.only or COLLECTION_TASKS) if name not in args.skip]
+    sys.exit(1 if asyncio.run(main(selected)) else 0)
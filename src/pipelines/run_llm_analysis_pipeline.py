@@ -3,7 +3,6 @@
 import sys
 import codecs
 
-from diskcache import Cache # Certifique-se de que codecs está importado
 # Tenta forçar sys.stdout e sys.stderr para UTF-8, o mais cedo possível
 try:
     if hasattr(sys.stdout, 'reconfigure'): # Python 3.7+
@@ -15,108 +14,114 @@ except Exception:
     pass
 
 import os
+import socket
 import asyncio
 import time
-import hashlib
-from collections import deque
+from collections import Counter
 import traceback
-from vertexai.language_models import TextEmbeddingModel # Importar aqui
-import vertexai
 
 # ... (seus outros imports permanecem os mesmos) ...
 from config import settings
 from src.agents.agent_utils import run_agent_and_get_final_response
 from src.database.db_utils import (
-    get_articles_pending_analysis,
-    get_db_session,
-    update_article_with_analysis,
-    find_similar_article,
+    claim_articles_for_analysis,
+    release_article_claims,
+    reap_expired_article_leases,
+    session_scope,
+    set_session_statement_timeout,
+    get_pool_metrics,
+    find_similar_article_local,
     batch_update_precomputed_embeddings
 )
-from src.agents.analistas.agente_gerenciador_analise_adk.agent import AgenteGerenciadorAnalise_ADK 
+from src.database.analysis_writer import AnalysisWriteBuffer, journal_path_for_worker
+from src.database.async_db import run_db, shutdown_db_executor, lease_renewer
+from src.database.vector_index import load_local_vector_index, sync_local_vector_index
+from src.agents.analistas.agente_gerenciador_analise_adk.agent import AgenteGerenciadorAnalise_ADK, stage_memo
 from src.agents.analistas.sub_agentes_analise.sub_agente_resumo_adk.agent import SubAgenteResumo_ADK 
 from src.utils.parser_utils import parse_llm_json_response
+from src.utils.rate_limiter import get_rate_limiter, is_rate_limit_error
+from src.utils.embedding_batcher import EmbeddingBatcher
+from src.utils.analysis_cache import AnalysisCache
+from src.utils.model_registry import get_embedding_model
 from google.genai.types import Content, Part
-from config.settings import PROJECT_ID, LOCATION
-
-# --- CLASSE DO RATE LIMITER (NOVA) ---
-class AsyncRateLimiter:
-    def __init__(self, rate_limit: int, period_seconds: int):
-        self.rate_limit = rate_limit
-        self.period_seconds = period_seconds
-        self.timestamps = deque()
-        self.lock = asyncio.Lock()
-
-    async def acquire(self):
-        async with self.lock:
-            while True:
-                now = time.monotonic()
-                while self.timestamps and self.timestamps[0] <= now - self.period_seconds:
-                    self.timestamps.popleft()
-                if len(self.timestamps) < self.rate_limit:
-                    self.timestamps.append(now)
-                    break
-                wait_time = self.timestamps[0] + self.period_seconds - now
-                await asyncio.sleep(wait_time)
-
 
 # --- CONFIGURAÇÕES ---
-MAX_CONCURRENT_TASKS = 3
+MAX_CONCURRENT_TASKS = int(os.getenv("ANALYSIS_MAX_CONCURRENT_TASKS", "3"))
 RAG_SIMILARITY_THRESHOLD = 0.98
-MAX_TOKENS_BEFORE_COMPRESSION = 1500
+MAX_TOKENS_BEFORE_COMPRESSION = settings.ANALYSIS_MAX_TOKENS_BEFORE_COMPRESSION
 MAX_COMPRESSION_DEPTH = 3
-API_CALLS_PER_MINUTE = 5 
-API_TIME_PERIOD_SECONDS = 60
-
-
-settings.logger.info("Inicializando modelos e cache...")
-try:
-    vertexai.init(project=PROJECT_ID, location=LOCATION)
-    settings.logger.info(f"Vertex AI inicializado | Projeto: {PROJECT_ID} | Região: {LOCATION}")
-except Exception as e:
-    settings.logger.error(f"Falha na inicialização do Vertex AI: {str(e)}")
-    # Não é necessário levantar exceção, mas sem isso o embedding não funcionará
-    
-# <<< INÍCIO DO BLOCO DE TRATAMENTO DE ERRO PARA EMBEDDING MODEL >>>
-embedding_model = None # Inicializa como None
-try:
-    embedding_model = TextEmbeddingModel.from_pretrained(settings.TEXT_EMBBEDING) # Tenta carregar o modelo
-    settings.logger.info("Modelo de embedding 'text-embedding-005' inicializado com sucesso.")
-except Exception as e:
-    settings.logger.warning(f"Não foi possível inicializar o modelo de embedding: {e}. O RAG não funcionará corretamente.")
-    # Não levanta a exceção, apenas loga e continua com embedding_model como None
-# <<< FIM DO BLOCO DE TRATAMENTO DE ERRO PARA EMBEDDING MODEL >>>
-
-CACHE_DIR = settings.BASE_DIR / ".analysis_cache"
-cache = Cache(CACHE_DIR)
-rate_limiter = AsyncRateLimiter(API_CALLS_PER_MINUTE, API_TIME_PERIOD_SECONDS) 
-
+STREAM_CHUNK_SIZE = 10 # Artigos buscados por consulta no modo streaming (e embeddings antecipados juntos, ver prefetch_embeddings)
+STREAM_QUEUE_MAXSIZE = MAX_CONCURRENT_TASKS * 2 # Limite da fila entre produtor e consumidores
+EMBEDDING_BATCH_SIZE = 32 # Máximo de textos por chamada à API de embedding
+EMBEDDING_BATCH_MAX_WAIT_MS = 20 # Tempo máximo que um texto espera por companhia no lote
+WORKER_ID = os.getenv("ANALYSIS_WORKER_ID", f"{socket.gethostname()}:{os.getpid()}") # Identifica este processo nas reservas (leases)
+# Só análises com status final vão para o cache: falhas e pendências precisam ser refeitas, não reaproveitadas
+FINAL_CACHE_STATUSES = {"analysis_complete", "analysis_rejected"}
+
+
+# Chaves versionadas pela impressão digital dos prompts/perfis: edições de prompt não servem análises antigas
+analysis_cache = AnalysisCache(
+    settings.ANALYSIS_CACHE_DIR,
+    memory_items=settings.ANALYSIS_CACHE_MEMORY_ITEMS,
+    size_limit_bytes=settings.ANALYSIS_CACHE_SIZE_LIMIT_BYTES,
+    ttl_seconds=settings.ANALYSIS_CACHE_TTL_SECONDS
+)
+# Análises são gravadas em lote (write-behind), com um journal por worker para recuperação após quedas
+analysis_writer = AnalysisWriteBuffer(
+    settings.ANALYSIS_WRITE_JOURNAL or journal_path_for_worker(settings.ANALYSIS_WRITE_JOURNAL_DIR, WORKER_ID),
+    worker_id=WORKER_ID, # Gravações de artigos cuja reserva foi perdida são descartadas
+    max_items=settings.ANALYSIS_WRITE_BATCH_SIZE,
+    max_wait_ms=settings.ANALYSIS_WRITE_FLUSH_MS,
+    legacy_journal_dirs=(settings.ANALYSIS_CACHE_DIR,) # Local antigo dos journals (dentro do cache)
+)
+# Orçamentos de cota separados (ver settings.RATE_LIMITS); os sub-agentes usam o orçamento do próprio modelo
+embedding_rate_limiter = get_rate_limiter("embedding")
 
-def get_text_hash(text: str) -> str:
-    return hashlib.sha256(text.encode()).hexdigest()
 
 def count_tokens(text: str) -> int:
     return len(text) // 4
 
-# <<< MODIFICAÇÃO NA FUNÇÃO generate_embedding >>>
-def generate_embedding(text: str) -> list[float]:
-    """Função síncrona para gerar embedding. Retorna um embedding dummy se o modelo não carregar."""
+def generate_embeddings(texts: list[str]) -> list[list[float]]:
+    """
+    Função síncrona que gera os embeddings de vários textos em uma única chamada à API.
+    Retorna embeddings dummy se o modelo não carregar. Erros de cota (429) são propagados
+    para o EmbeddingBatcher, que reduz a taxa do orçamento e tenta de novo.
+    """
+    embedding_model = get_embedding_model() # Carregado no primeiro lote (ver src/utils/model_registry.py)
     if embedding_model is None:
         settings.logger.warning("Modelo de embedding não carregado. Retornando embedding dummy (zeros) para permitir continuidade.")
-        return [0.0] * 768 
+        return [[0.0] * 768 for _ in texts]
     
     try:
         # <<< AQUI ESTÁ A CORREÇÃO: REMOVER task_type >>>
         embeddings = embedding_model.get_embeddings(
-            texts=[text] 
+            texts=texts 
             # REMOVIDO: task_type="RETRIEVAL_DOCUMENT" - Conforme o erro indica, este argumento não é esperado
         )
-        return embeddings[0].values
+        return [embedding.values for embedding in embeddings]
     except Exception as e:
-        settings.logger.error(f"Erro CRÍTICO ao gerar embedding com modelo carregado: {str(e)}. Retornando embedding dummy para não travar o pipeline.")
-        return [0.0] * 768 # Retorna um vetor dummy para permitir que o pipeline continue em caso de falha.
+        if is_rate_limit_error(e):
+            raise
+        settings.logger.error(f"Erro CRÍTICO ao gerar embeddings com modelo carregado: {str(e)}. Retornando embeddings dummy para não travar o pipeline.")
+        return [[0.0] * 768 for _ in texts] # Retorna vetores dummy para permitir que o pipeline continue em caso de falha.
 
 
+embedding_batcher = EmbeddingBatcher(
+    generate_embeddings,
+    max_batch_size=EMBEDDING_BATCH_SIZE,
+    max_wait_ms=EMBEDDING_BATCH_MAX_WAIT_MS,
+    rate_limiter=embedding_rate_limiter
+)
+
+
+async def embed_text(text: str) -> list[float]:
+    """Gera o embedding via micro-batcher (um slot do orçamento 'embedding' por lote)."""
+    try:
+        return await embedding_batcher.embed(text)
+    except Exception as e:
+        settings.logger.error(f"Cota de embedding esgotada: {e}. Retornando embedding dummy.")
+        return [0.0] * 768
+
 
 async def compress_text(text: str, article_id: int, depth=0) -> str:
     if depth >= MAX_COMPRESSION_DEPTH:
@@ -126,13 +131,17 @@ async def compress_text(text: str, article_id: int, depth=0) -> str:
     if token_count <= MAX_TOKENS_BEFORE_COMPRESSION:
         return text
     try:
-        settings.logger.info(f"Compressão (nível {depth+1}) para artigo {article_id}...")
-        await rate_limiter.acquire()
-        message_to_sub_agent = Content(role='user', parts=[Part(text=text)]) # Passa Content
-        response = await run_agent_and_get_final_response(SubAgenteResumo_ADK, message_to_sub_agent, f"compress_{article_id}_l{depth}")
-        summary_dict = parse_llm_json_response(response)
-        if not summary_dict or "summary" not in summary_dict:
-            raise ValueError("Resposta de compressão inválida")
+        # A compressão também é memoizada: numa reanálise o texto comprimido sai idêntico,
+        # o que permite ao Gerenciador reaproveitar os estágios já memoizados.
+        summary_dict = await stage_memo.aget("Compressao", SubAgenteResumo_ADK, text)
+        if summary_dict is None:
+            settings.logger.info(f"Compressão (nível {depth+1}) para artigo {article_id}...")
+            message_to_sub_agent = Content(role='user', parts=[Part(text=text)]) # Passa Content
+            response = await run_agent_and_get_final_response(SubAgenteResumo_ADK, message_to_sub_agent, f"compress_{article_id}_l{depth}", rate_limit_key="compressao")
+            summary_dict = parse_llm_json_response(response)
+            if not summary_dict or "summary" not in summary_dict:
+                raise ValueError("Resposta de compressão inválida")
+            await stage_memo.aset("Compressao", SubAgenteResumo_ADK, text, summary_dict)
         summary = summary_dict["summary"]
         return await compress_text(summary, article_id, depth+1)
     except Exception as e:
@@ -162,10 +171,11 @@ async def process_article_with_optimizations(article, semaphore: asyncio.Semapho
             
         try:
             # 1. Verificação de Cache
-            text_hash = get_text_hash(text)
-            if text_hash in cache:
+            cached_analysis = await analysis_cache.aget(text)
+            if cached_analysis is not None and cached_analysis.get("processing_status") not in FINAL_CACHE_STATUSES:
+                cached_analysis = None # Entrada antiga com status não final: tratada como miss
+            if cached_analysis is not None:
                 settings.logger.info(f"Cache hit: Artigo {article_id}")
-                cached_analysis = cache[text_hash]
                 
                 cached_analysis["source_credibility"] = source_credibility
                 llm_output_from_cache = cached_analysis.get("llm_analysis_output", {})
@@ -174,17 +184,19 @@ async def process_article_with_optimizations(article, semaphore: asyncio.Semapho
                 cached_analysis["overall_confidence_score"] = calculate_overall_confidence(llm_output_from_cache, conflict_output_from_cache, source_credibility)
                 cached_analysis["overall_confidence_justification"] = "Calculado com base na credibilidade da fonte, entropia de Shannon, relevância financeira e consistência interna da análise."
                 
-                update_article_with_analysis(article_id, cached_analysis) 
-                return {"id": article_id, "status": cached_analysis.get("processing_status", "cached_complete")}
+                await analysis_writer.submit(article_id, cached_analysis)
+                return {"id": article_id, "status": cached_analysis.get("processing_status", "cached_complete"), "persisted": True}
             
             # 2. Compressão Adaptativa
             processed_text = await compress_text(text, article_id)
             
-            # 3. Geração de Embedding com Rate Limiter
-            settings.logger.info(f"Aguardando permissão do Rate Limiter para embedding do artigo {article_id}...")
-            await rate_limiter.acquire() 
-            settings.logger.info(f"Permissão concedida. Gerando embedding para o artigo {article_id}.")
-            embedding = await asyncio.to_thread(generate_embedding, processed_text)
+            # 3. Geração de Embedding com Rate Limiter (já disparada pelo produtor quando o texto não precisa de compressão)
+            embedding_task = article.get("embedding_task")
+            if embedding_task is not None and processed_text == text:
+                embedding = await embedding_task
+            else:
+                settings.logger.info(f"Gerando embedding para o artigo {article_id}.")
+                embedding = await embed_text(processed_text)
             
             if not embedding: 
                 settings.logger.warning(f"Artigo {article_id}: Embedding não pôde ser gerado ou retornou vazio. Pulando RAG.")
@@ -195,7 +207,7 @@ async def process_article_with_optimizations(article, semaphore: asyncio.Semapho
             # 4. Busca RAG
             similar = None # Inicializa similar
             if embedding and len(embedding) == 768: # Só tenta RAG se o embedding for válido
-                similar = find_similar_article(embedding, RAG_SIMILARITY_THRESHOLD)
+                similar = await run_db(find_similar_article_local, embedding, RAG_SIMILARITY_THRESHOLD, exclude_id=article_id)
             
             if similar:
                 settings.logger.info(f"RAG hit: Artigo {article_id} similar ao {similar['id']}")
@@ -208,16 +220,14 @@ async def process_article_with_optimizations(article, semaphore: asyncio.Semapho
                 rag_analysis["overall_confidence_score"] = calculate_overall_confidence(llm_output_from_rag, conflict_output_from_rag, source_credibility)
                 rag_analysis["overall_confidence_justification"] = "Calculado com base na credibilidade da fonte, entropia de Shannon, relevância financeira e consistência interna da análise."
 
-                update_article_with_analysis(article_id, rag_analysis)
-                cache[text_hash] = rag_analysis
-                return {"id": article_id, "embedding": embedding, "status": rag_analysis.get("processing_status", "rag_complete")}
+                await analysis_writer.submit(article_id, rag_analysis)
+                if rag_analysis.get("processing_status") in FINAL_CACHE_STATUSES:
+                    await analysis_cache.aset(text, rag_analysis)
+                return {"id": article_id, "embedding": embedding, "status": rag_analysis.get("processing_status", "rag_complete"), "persisted": True}
             
             # 5. Análise Completa (inclui orquestração e auditoria interna)
             settings.logger.info(f"Iniciando análise completa e auditoria interna para o Artigo {article_id}.")
             
-            settings.logger.warning(f"Pausa de seguran├ºa de {API_TIME_PERIOD_SECONDS * 0.5}s antes da an├ílise completa do artigo {article_id} para respeitar LLM Rate Limit externo.")
-            await asyncio.sleep(API_TIME_PERIOD_SECONDS * 0.5) 
-            
             # Passa Content object para o Agente Gerenciador
             message_to_manager_agent = Content(role='user', parts=[Part(text=processed_text)])
             response = await run_agent_and_get_final_response(
@@ -245,84 +255,206 @@ async def process_article_with_optimizations(article, semaphore: asyncio.Semapho
                 "processing_status": final_article_status
             }
 
-            update_article_with_analysis(article_id, data_to_persist)
-            cache[text_hash] = data_to_persist 
-            return {"id": article_id, "embedding": embedding, "status": final_article_status}
+            await analysis_writer.submit(article_id, data_to_persist)
+            if final_article_status in FINAL_CACHE_STATUSES:
+                await analysis_cache.aset(text, data_to_persist)
+            # "persisted": a gravação já está no analysis_writer, mesmo que o status seja analysis_failed
+            return {"id": article_id, "embedding": embedding, "status": final_article_status, "persisted": True}
 
         except Exception as e:
             settings.logger.exception(f"Falha no processamento completo do artigo {article_id}: {e}")
             return {"id": article_id, "status": "analysis_failed", "reason": str(e)}
 
 
-async def main():
-    settings.logger.info("--- IN├ìCIO DO PIPELINE OTIMIZADO ---")
-    
-    start_time = time.time()
-    total_processed_count = 0
-    total_success_complete = 0
-    total_rejected = 0
-    total_failed = 0
-    total_cached = 0
-    total_rag_hit = 0
-    
+def claim_pending_chunk(limit: int) -> list[dict]:
+    """Recolhe reservas expiradas e reserva (síncrono) o próximo pedaço de artigos pendentes para este worker."""
+    with session_scope() as session:
+        reap_expired_article_leases(session)
+        return claim_articles_for_analysis(session, WORKER_ID, limit=limit)
+
+
+def refresh_vector_index() -> int:
+    """Sincronização incremental do índice vetorial local com os embeddings de outros workers."""
+    with session_scope() as session:
+        return sync_local_vector_index(session)
+
+
+def warm_load_vector_index():
+    """Carrega o índice vetorial local do disco e o completa com o Postgres (fonte da verdade)."""
+    with session_scope() as session:
+        return load_local_vector_index(session)
+
+
+def release_claims(article_ids: list[int], count_as_retry: bool = False) -> int:
+    """Devolve à fila artigos reservados por este worker."""
+    with session_scope() as session:
+        return release_article_claims(session, article_ids, WORKER_ID, count_as_retry=count_as_retry)
+
+
+async def prefetch_embeddings(articles: list[dict]):
+    """
+    Dispara de uma vez os embeddings do pedaço recém-reservado, antes de os artigos entrarem
+    na fila: como os consumidores são limitados a MAX_CONCURRENT_TASKS, pedir o embedding só
+    dentro do semáforo faria os lotes do EmbeddingBatcher nunca passarem desse número.
+    Ficam de fora os textos que ainda passam pela compressão (o embedding é do texto comprimido)
+    e os que já têm análise final no cache. A tarefa fica em article["embedding_task"].
+    """
+    texts = [article.get("article_text_content") for article in articles]
+    candidates = [
+        (article, text) for article, text in zip(articles, texts)
+        if text and count_tokens(text) <= MAX_TOKENS_BEFORE_COMPRESSION
+    ]
+    cached = await asyncio.gather(*(analysis_cache.aget(text) for _, text in candidates))
+    for (article, text), cached_analysis in zip(candidates, cached):
+        if cached_analysis is None or cached_analysis.get("processing_status") not in FINAL_CACHE_STATUSES:
+            # Criadas no mesmo ciclo do event loop: entram todas no mesmo lote do batcher
+            article["embedding_task"] = asyncio.create_task(embed_text(text))
+
+
+async def article_producer(queue: asyncio.Queue, in_flight: set[int]):
+    """
+    Produtor do modo streaming: reserva artigos em pedaços de STREAM_CHUNK_SIZE
+    (SELECT ... FOR UPDATE SKIP LOCKED) e alimenta a fila limitada. Como a fila tem
+    tamanho máximo, o produtor só reserva mais artigos quando os consumidores liberam
+    espaço. Artigos reservados saem de 'pending_llm_analysis', então outros workers
+    (e este mesmo) não os pegam de novo. Encerra quando não há mais nada a reservar.
+    """
     while True:
+        articles = await run_db(claim_pending_chunk, STREAM_CHUNK_SIZE)
+        if not articles:
+            settings.logger.info("Nenhum artigo pendente")
+            return
+        in_flight.update(article["news_article_id"] for article in articles)
+        await prefetch_embeddings(articles)
+        for article in articles:
+            await queue.put(article)
+
+
+async def analysis_worker(queue: asyncio.Queue, semaphore: asyncio.Semaphore,
+                          status_counts: Counter, start_time: float, in_flight: set[int]):
+    """
+    Consumidor do modo streaming: processa um artigo por vez e persiste o embedding
+    logo em seguida, sem esperar o restante do lote.
+    """
+    while True:
+        article = await queue.get()
         try:
-            with get_db_session() as session:
-                articles = get_articles_pending_analysis(session, limit=3000) 
-            
-            if not articles:
-                settings.logger.info("Nenhum artigo pendente")
-                break
-                
-            settings.logger.info(f"Processando {len(articles)} artigos com concorr├¬ncia m├íxima de {MAX_CONCURRENT_TASKS} tarefas.")
-            
-            semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
-            tasks = [process_article_with_optimizations(a, semaphore) for a in articles]
-            
-            results = []
-            for task in asyncio.as_completed(tasks):
+            if article is None:
+                return
+            article_id = article["news_article_id"]
+            result = await process_article_with_optimizations(article, semaphore)
+
+            if result.get("embedding"):
                 try:
-                    result = await task
-                    if result:
-                        results.append(result)
-                    total_processed_count += 1
-                    if total_processed_count % 10 == 0:
-                        elapsed_time = time.time() - start_time
-                        articles_per_minute = (total_processed_count / elapsed_time) * 60 if elapsed_time > 0 else 0
-                        settings.logger.info(f"Progresso: {total_processed_count} artigos processados. (Velocidade: {articles_per_minute:.2f} art/min)")
+                    await run_db(batch_update_precomputed_embeddings, [(article_id, result["embedding"])])
+                except Exception as e:
+                    settings.logger.error(f"Falha ao salvar embedding do artigo {article_id}: {e}")
+
+            if result["status"] in ("analysis_failed", "failed") and not result.get("persisted"):
+                # A análise não gravou nada: devolve o artigo à fila contando como tentativa.
+                # Resultados já enviados ao analysis_writer não são liberados: a liberação
+                # concorreria com a gravação em lote e contaria a tentativa duas vezes.
+                await run_db(release_claims, [article_id], True)
+            status_counts[result["status"]] += 1
+            status_counts["processados"] += 1
 
+            if settings.VECTOR_INDEX_ENABLED and status_counts["processados"] % settings.VECTOR_INDEX_SYNC_EVERY == 0:
+                try:
+                    await run_db(refresh_vector_index)
                 except Exception as e:
-                    settings.logger.error(f"Erro irrecuper├ível em uma task do as_completed: {e}")
-            
-            embeddings_to_update = [(r["id"], r["embedding"]) for r in results if r.get("embedding")]
-            
-            if embeddings_to_update:
-                settings.logger.info(f"Atualizando {len(embeddings_to_update)} embeddings no banco de dados...")
-                batch_update_precomputed_embeddings(embeddings_to_update)
-                
-            for r in results:
-                if r['status'] == 'analysis_complete':
-                    total_success_complete += 1
-                elif r['status'] == 'analysis_rejected':
-                    total_rejected += 1
-                elif r['status'] == 'analysis_failed':
-                    total_failed += 1
-                elif r['status'] == 'cached':
-                    total_cached += 1
-                elif r['status'] == 'rag_hit':
-                    total_rag_hit += 1
-
-            settings.logger.info(
-                f"RESUMO FINAL: Processados={total_processed_count} | "
-                f"An├ílise Completa={total_success_complete} | "
-                f"Rejeitados={total_rejected} | "
-                f"Falhas na An├ílise={total_failed} | "
-                f"Do Cache={total_cached} | "
-                f"Do RAG={total_rag_hit}"
-            )
-        
+                    settings.logger.warning(f"Falha na sincronização incremental do índice vetorial local: {e}")
+
+            if status_counts["processados"] % 10 == 0:
+                elapsed_time = time.time() - start_time
+                articles_per_minute = (status_counts["processados"] / elapsed_time) * 60 if elapsed_time > 0 else 0
+                settings.logger.info(f"Progresso: {status_counts['processados']} artigos processados. (Velocidade: {articles_per_minute:.2f} art/min)")
+        except Exception as e:
+            settings.logger.error(f"Erro irrecuperável no consumidor da fila: {e}")
+        finally:
+            if article is not None:
+                in_flight.discard(article["news_article_id"])
+            queue.task_done()
+
+
+async def main():
+    settings.logger.info("--- INÍCIO DO PIPELINE OTIMIZADO (MODO STREAMING) ---")
+
+    start_time = time.time()
+    status_counts = Counter()
+    set_session_statement_timeout(settings.ANALYSIS_STATEMENT_TIMEOUT_MS) # Só as transações deste pipeline
+
+    try:
+        await run_db(analysis_writer.replay_journal)
+    except Exception as e:
+        settings.logger.error(f"Falha ao regravar o journal de análises ({e}); ele será reaplicado na próxima execução.")
+
+    # Carrega o modelo de embedding antes dos consumidores, em vez de no import do módulo
+    if await asyncio.to_thread(get_embedding_model) is None:
+        settings.logger.warning("Modelo de embedding indisponível. O RAG não funcionará corretamente.")
+
+    vector_index = None
+    if settings.VECTOR_INDEX_ENABLED:
+        try:
+            vector_index = await run_db(warm_load_vector_index)
         except Exception as e:
-            settings.logger.critical(f"Falha catastr├│fica no pipeline: {e}\n{traceback.format_exc()}")
+            settings.logger.warning(f"Índice vetorial local indisponível ({e}). A deduplicação RAG usará o pgvector.")
+
+    queue = asyncio.Queue(maxsize=STREAM_QUEUE_MAXSIZE)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+    settings.logger.info(
+        f"Processando em streaming: pedaços de {STREAM_CHUNK_SIZE} artigos, fila de até {STREAM_QUEUE_MAXSIZE} "
+        f"e {MAX_CONCURRENT_TASKS} consumidores (worker: {WORKER_ID})."
+    )
+
+    in_flight: set[int] = set() # Artigos reservados por este worker e ainda não gravados/liberados
+    renewer = asyncio.create_task(lease_renewer(in_flight, WORKER_ID))
+    workers = [
+        asyncio.create_task(analysis_worker(queue, semaphore, status_counts, start_time, in_flight))
+        for _ in range(MAX_CONCURRENT_TASKS)
+    ]
+
+    try:
+        await article_producer(queue, in_flight)
+        await queue.join()
+    except Exception as e:
+        settings.logger.critical(f"Falha catastrófica no pipeline: {e}\n{traceback.format_exc()}")
+    finally:
+        # Em caso de interrupção, artigos reservados que ficaram na fila voltam para 'pending_llm_analysis'
+        unprocessed_ids = []
+        while not queue.empty():
+            article = queue.get_nowait()
+            queue.task_done()
+            if article is not None:
+                unprocessed_ids.append(article["news_article_id"])
+                if article.get("embedding_task") is not None:
+                    article["embedding_task"].cancel()
+        if unprocessed_ids:
+            released = await run_db(release_claims, unprocessed_ids)
+            settings.logger.warning(f"{released} artigos reservados e não processados foram devolvidos à fila.")
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers, return_exceptions=True)
+        renewer.cancel()
+        await analysis_writer.close()
+        if vector_index is not None:
+            await asyncio.to_thread(vector_index.save)
+        shutdown_db_executor()
+
+    settings.logger.info(
+        f"RESUMO FINAL: Processados={status_counts['processados']} | "
+        f"Análise Completa={status_counts['analysis_complete']} | "
+        f"Rejeitados={status_counts['analysis_rejected']} | "
+        f"Falhas na Análise={status_counts['analysis_failed']} | "
+        f"Do Cache={status_counts['cached']} | "
+        f"Do RAG={status_counts['rag_hit']}"
+    )
+    settings.logger.info(f"Cache de análises (versão {analysis_cache.fingerprint}): {analysis_cache.stats()}")
+    settings.logger.info(f"Memoização de estágios: {stage_memo.stats()}")
+    settings.logger.info(f"Gravação em lote das análises: {analysis_writer.stats()}")
+    try:
+        settings.logger.info(f"Pool de conexões: {get_pool_metrics()}")
+    except Exception as e:
+        settings.logger.warning(f"Métricas do pool indisponíveis: {e}")
 
 
 if __name__ == "__main__":
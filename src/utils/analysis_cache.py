@@ -0,0 +1,209 @@
+# src/utils/analysis_cache.py
+
+import asyncio
+import copy
+import hashlib
+import json
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+from diskcache import Cache
+
+from config import settings
+
+# Incrementar quando o formato do valor em cache mudar (ex: novas chaves no JSON de análise)
+CACHE_SCHEMA_VERSION = 1
+
+# Arquivos cujo conteúdo define o resultado da análise: prompts dos analistas e do auditor
+# e as palavras-chave financeiras usadas pela análise quantitativa.
+FINGERPRINT_GLOBS = (
+    "src/agents/analistas/**/prompt.py",
+    "src/agents/auditores/**/prompt.py",
+    "config/financial_keywords.json",
+)
+
+
+def _describe(value: Any) -> Any:
+    """Converte configurações do ADK/genai (pydantic, BuiltInPlanner) em algo serializável."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if hasattr(value, "thinking_config"): # BuiltInPlanner
+        return {"thinking_config": _describe(value.thinking_config)}
+    return value
+
+
+def _profile_signature(profile: dict) -> dict:
+    """Representação serializável de um perfil de settings.AGENT_PROFILES."""
+    return {key: _describe(value) for key, value in profile.items()}
+
+
+def compute_analysis_fingerprint(base_dir: Optional[Path] = None) -> str:
+    """
+    Impressão digital da "versão" da análise: hash dos prompts dos agentes, do arquivo de
+    palavras-chave, dos perfis de modelo (settings.AGENT_PROFILES) e de CACHE_SCHEMA_VERSION.
+    Qualquer edição em um desses itens muda as chaves do cache e invalida análises antigas.
+    """
+    base_dir = Path(base_dir or settings.BASE_DIR)
+    digest = hashlib.sha256(f"schema:{CACHE_SCHEMA_VERSION}".encode())
+
+    for pattern in FINGERPRINT_GLOBS:
+        for path in sorted(base_dir.glob(pattern)):
+            digest.update(path.relative_to(base_dir).as_posix().encode())
+            digest.update(path.read_bytes())
+
+    profiles = {name: _profile_signature(profile) for name, profile in settings.AGENT_PROFILES.items()}
+    digest.update(json.dumps(profiles, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+
+class AnalysisCache:
+    """
+    Cache de análises em dois níveis: LRU em memória na frente de um diskcache com
+    limite de tamanho (em bytes, com despejo LRU) e expiração (TTL).
+
+    As chaves são `<fingerprint>:<sha256 do texto>`, de modo que uma mudança de prompt ou
+    de perfil de modelo não serve análises antigas. Os valores devolvidos são cópias, para
+    que ajustes feitos pelo chamador (ex: credibilidade da fonte) não contaminem o cache.
+    """
+
+    def __init__(self, directory: Path, memory_items: int = 1000, size_limit_bytes: int = 2 ** 30,
+                 ttl_seconds: Optional[int] = None, fingerprint: Optional[str] = None):
+        self.memory_items = memory_items
+        self.ttl_seconds = ttl_seconds
+        self.fingerprint = fingerprint or compute_analysis_fingerprint()
+        self._disk = Cache(str(directory), size_limit=size_limit_bytes, eviction_policy="least-recently-used")
+        self._memory: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = Counter()
+
+    def make_key(self, text: str) -> str:
+        return f"{self.fingerprint}:{hashlib.sha256(text.encode()).hexdigest()}"
+
+    def _remember(self, key: str, value: Any):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def get(self, text: str) -> Optional[Any]:
+        key = self.make_key(text)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._counters["hits_memoria"] += 1
+                return copy.deepcopy(self._memory[key])
+
+        value = self._disk.get(key)
+        if value is None:
+            self._counters["misses"] += 1
+            return None
+
+        self._counters["hits_disco"] += 1
+        self._remember(key, value)
+        return copy.deepcopy(value)
+
+    def set(self, text: str, value: Any):
+        key = self.make_key(text)
+        value = copy.deepcopy(value)
+        self._disk.set(key, value, expire=self.ttl_seconds)
+        self._remember(key, value)
+        self._counters["gravacoes"] += 1
+
+    async def aget(self, text: str) -> Optional[Any]:
+        """Versão assíncrona de get: acertos em memória são imediatos, o disco é lido em thread."""
+        key = self.make_key(text)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._counters["hits_memoria"] += 1
+                return copy.deepcopy(self._memory[key])
+        return await asyncio.to_thread(self.get, text)
+
+    async def aset(self, text: str, value: Any):
+        await asyncio.to_thread(self.set, text, value)
+
+    def stats(self) -> dict:
+        """Contadores de acertos/erros e ocupação dos dois níveis."""
+        hits = self._counters["hits_memoria"] + self._counters["hits_disco"]
+        lookups = hits + self._counters["misses"]
+        return {
+            "hits_memoria": self._counters["hits_memoria"],
+            "hits_disco": self._counters["hits_disco"],
+            "misses": self._counters["misses"],
+            "gravacoes": self._counters["gravacoes"],
+            "taxa_acerto": round(hits / lookups, 4) if lookups else 0.0,
+            "itens_memoria": len(self._memory),
+            "bytes_disco": self._disk.volume(),
+        }
+
+    def close(self):
+        self._disk.close()
+
+
+def agent_signature(agent) -> str:
+    """
+    Versão de um agente: hash da instrução (prompt), do modelo e das configurações de geração.
+    Agentes procedurais (sem instrução) usam a impressão digital geral da análise.
+    """
+    instruction = getattr(agent, "instruction", None)
+    parts = {
+        "name": agent.name,
+        "instruction": instruction if isinstance(instruction, str) else repr(instruction),
+        "model": str(getattr(agent, "model", None)),
+        "generate_content_config": _describe(getattr(agent, "generate_content_config", None)),
+        "planner": _describe(getattr(agent, "planner", None)),
+    }
+    if not instruction:
+        parts["analysis_fingerprint"] = compute_analysis_fingerprint()
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class StageResultMemo:
+    """
+    Memoização dos resultados de cada estágio (sub-agente) da análise, em diskcache.
+
+    A chave é (estágio, versão do agente, hash da entrada). Quando um artigo volta para a
+    fila (falha de integridade, reanálise de baixa confiança), só os estágios que falharam
+    ou que ainda não têm resultado são executados de novo. Só resultados válidos (sem "erro")
+    são gravados.
+    """
+
+    def __init__(self, directory: Path, size_limit_bytes: int = 2 ** 28, ttl_seconds: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds
+        self._disk = Cache(str(directory), size_limit=size_limit_bytes, eviction_policy="least-recently-used")
+        self._versions: dict[str, str] = {}
+        self._counters = Counter()
+
+    def _key(self, stage: str, agent, input_text: str) -> str:
+        version = self._versions.get(agent.name)
+        if version is None:
+            version = self._versions[agent.name] = agent_signature(agent)
+        return f"{stage}:{version}:{hashlib.sha256(input_text.encode()).hexdigest()}"
+
+    def get(self, stage: str, agent, input_text: str) -> Optional[dict]:
+        value = self._disk.get(self._key(stage, agent, input_text))
+        self._counters["hits" if value is not None else "misses"] += 1
+        return copy.deepcopy(value) if value is not None else None
+
+    def set(self, stage: str, agent, input_text: str, result: dict):
+        if not isinstance(result, dict) or "erro" in result:
+            return
+        self._disk.set(self._key(stage, agent, input_text), copy.deepcopy(result), expire=self.ttl_seconds)
+
+    def delete(self, stage: str, agent, input_text: str):
+        self._disk.delete(self._key(stage, agent, input_text))
+
+    async def aget(self, stage: str, agent, input_text: str) -> Optional[dict]:
+        return await asyncio.to_thread(self.get, stage, agent, input_text)
+
+    async def aset(self, stage: str, agent, input_text: str, result: dict):
+        await asyncio.to_thread(self.set, stage, agent, input_text, result)
+
+    async def adelete(self, stage: str, agent, input_text: str):
+        await asyncio.to_thread(self.delete, stage, agent, input_text)
+
+    def stats(self) -> dict:
+        return dict(self._counters)
@@ -0,0 +1,100 @@
+# src/utils/embedding_batcher.py
+
+import asyncio
+from typing import Callable, Optional
+
+from config import settings
+from src.utils.rate_limiter import TokenBucket, estimate_tokens, is_rate_limit_error
+
+# text-embedding-005 trunca cada texto em 2048 tokens
+MAX_TOKENS_PER_TEXT = 2048
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batcher assíncrono de embeddings.
+
+    Coroutines concorrentes chamam `embed(text)`; os textos são acumulados por até
+    `max_wait_ms` milissegundos (ou até `max_batch_size` itens / `max_batch_tokens` tokens)
+    e enviados em uma única chamada de `embed_batch_fn`, executada em thread. Cada lote
+    consome um único slot do limitador de taxa, e os vetores são devolvidos a cada chamador
+    na mesma ordem dos textos.
+    """
+
+    def __init__(self, embed_batch_fn: Callable[[list[str]], list[list[float]]],
+                 max_batch_size: int = 32, max_wait_ms: float = 20,
+                 max_batch_tokens: int = 18000, rate_limiter: Optional[TokenBucket] = None):
+        self.embed_batch_fn = embed_batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000.0
+        self.max_batch_tokens = max_batch_tokens
+        self.rate_limiter = rate_limiter
+
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running_batches: set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> list[float]:
+        """Enfileira o texto no próximo lote e aguarda o seu vetor."""
+        loop = asyncio.get_running_loop()
+        tokens = min(estimate_tokens(text), MAX_TOKENS_PER_TEXT)
+
+        # Se o texto estouraria o limite de tokens do lote, envia o lote atual antes
+        if self._pending and self._pending_tokens + tokens > self.max_batch_tokens:
+            self._flush()
+
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self._pending_tokens += tokens
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_seconds, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, batch_tokens = self._pending, self._pending_tokens
+        self._pending, self._pending_tokens = [], 0
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch, batch_tokens))
+        self._running_batches.add(task)
+        task.add_done_callback(self._running_batches.discard)
+
+    async def _run_batch(self, batch: list[tuple[str, asyncio.Future]], batch_tokens: int):
+        texts = [text for text, _ in batch]
+        for attempt in range(settings.RATE_LIMIT_MAX_RETRIES + 1):
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(batch_tokens)
+            try:
+                vectors = await asyncio.to_thread(self.embed_batch_fn, texts)
+                if self.rate_limiter:
+                    self.rate_limiter.reward()
+                break
+            except Exception as e:
+                if self.rate_limiter and is_rate_limit_error(e) and attempt < settings.RATE_LIMIT_MAX_RETRIES:
+                    self.rate_limiter.penalize()
+                    continue
+                settings.logger.error(f"Falha no lote de {len(texts)} embeddings: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+        if len(vectors) != len(texts):
+            error = ValueError(f"Lote de embeddings retornou {len(vectors)} vetores para {len(texts)} textos.")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        settings.logger.debug(f"Lote de {len(texts)} embeddings gerado em uma única chamada.")
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
@@ -0,0 +1,79 @@
+# src/utils/model_registry.py
+
+import threading
+import time
+from typing import Any, Optional
+
+from config import settings
+
+# Registro de modelos do processo: o Vertex AI e os modelos só são inicializados no primeiro
+# uso (e uma única vez), para que importar db_utils, coletores ou o dashboard não pague o
+# custo do SDK nem faça chamadas de rede.
+_lock = threading.Lock()
+_vertexai_ready = False
+_embedding_models: dict[str, Any] = {}
+_failed_at: dict[str, float] = {} # Última falha de cada modelo, para não tentar de novo a cada chamada
+
+
+def init_vertexai() -> bool:
+    """Chama vertexai.init (projeto/região de settings) uma vez por processo. Retorna se está pronto."""
+    global _vertexai_ready
+    if _vertexai_ready:
+        return True
+    with _lock:
+        if not _vertexai_ready:
+            try:
+                import vertexai
+                vertexai.init(project=settings.PROJECT_ID, location=settings.LOCATION)
+                _vertexai_ready = True
+                settings.logger.info(f"Vertex AI inicializado | Projeto: {settings.PROJECT_ID} | Região: {settings.LOCATION}")
+            except Exception as e:
+                settings.logger.error(f"Falha na inicialização do Vertex AI: {str(e)}")
+    return _vertexai_ready
+
+
+def get_embedding_model(model_name: Optional[str] = None) -> Optional[Any]:
+    """
+    Retorna o TextEmbeddingModel compartilhado (padrão: settings.TEXT_EMBBEDING), carregado
+    no primeiro uso. Retorna None se não foi possível carregá-lo; nova tentativa só depois de
+    settings.MODEL_INIT_RETRY_SECONDS.
+    """
+    model_name = model_name or settings.TEXT_EMBBEDING
+    model = _embedding_models.get(model_name)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _embedding_models.get(model_name)
+        if model is not None:
+            return model
+        failed_at = _failed_at.get(model_name)
+        if failed_at is not None and time.monotonic() - failed_at < settings.MODEL_INIT_RETRY_SECONDS:
+            return None
+
+    if not init_vertexai():
+        with _lock:
+            _failed_at[model_name] = time.monotonic()
+        return None
+
+    with _lock:
+        model = _embedding_models.get(model_name)
+        if model is None:
+            try:
+                from vertexai.language_models import TextEmbeddingModel
+                model = _embedding_models[model_name] = TextEmbeddingModel.from_pretrained(model_name)
+                _failed_at.pop(model_name, None)
+                settings.logger.info(f"Modelo de embedding '{model_name}' inicializado com sucesso.")
+            except Exception as e:
+                _failed_at[model_name] = time.monotonic()
+                settings.logger.warning(f"Não foi possível inicializar o modelo de embedding '{model_name}': {e}")
+    return model
+
+
+def reset_models():
+    """Descarta os modelos carregados e as falhas registradas (ex: após trocar credenciais)."""
+    global _vertexai_ready
+    with _lock:
+        _vertexai_ready = False
+        _embedding_models.clear()
+        _failed_at.clear()
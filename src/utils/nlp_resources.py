@@ -0,0 +1,143 @@
+# src/utils/nlp_resources.py
+
+import json
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import nltk
+
+from config import settings
+
+# Recursos do NLTK usados pelo projeto e o caminho de cada um dentro de nltk_data
+NLTK_RESOURCES = {
+    "punkt": "tokenizers/punkt",
+    "punkt_tab": "tokenizers/punkt_tab", # Exigido pelo word_tokenize nas versões recentes do NLTK
+    "stopwords": "corpus/stopwords",
+    "rslp": "stemmers/rslp",
+}
+
+_lock = threading.Lock()
+_available: set[str] = set()
+
+if settings.NLTK_DATA_DIR and str(settings.NLTK_DATA_DIR) not in nltk.data.path:
+    nltk.data.path.insert(0, str(settings.NLTK_DATA_DIR))
+
+
+def ensure_nltk_resource(name: str, download: Optional[bool] = None):
+    """
+    Garante que o recurso NLTK `name` existe localmente. Só baixa se `download=True`
+    (ou settings.NLTK_ALLOW_DOWNLOAD); caso contrário levanta LookupError sem tocar na rede.
+    """
+    if name in _available:
+        return
+    with _lock:
+        if name in _available:
+            return
+        try:
+            nltk.data.find(NLTK_RESOURCES[name])
+        except LookupError:
+            allow_download = settings.NLTK_ALLOW_DOWNLOAD if download is None else download
+            if not allow_download:
+                raise LookupError(
+                    f"Recurso NLTK '{name}' não encontrado em {nltk.data.path}. "
+                    f"Rode `python -m src.utils.nlp_resources` ou defina NLTK_ALLOW_DOWNLOAD=true."
+                )
+            settings.logger.info(f"Recurso NLTK '{name}' não encontrado. Baixando agora...")
+            download_dir = str(settings.NLTK_DATA_DIR) if settings.NLTK_DATA_DIR else None
+            if not nltk.download(name, quiet=True, download_dir=download_dir):
+                raise LookupError(f"Falha ao baixar o recurso NLTK '{name}'.")
+            nltk.data.find(NLTK_RESOURCES[name])
+        _available.add(name)
+
+
+def download_nltk_resources():
+    """Baixa (explicitamente) todos os recursos de NLTK_RESOURCES que faltam localmente."""
+    for name in NLTK_RESOURCES:
+        try:
+            ensure_nltk_resource(name, download=True)
+            settings.logger.info(f"Recurso NLTK '{name}' disponível.")
+        except LookupError as e:
+            settings.logger.error(str(e))
+
+
+def word_tokenize(text: str) -> list[str]:
+    """nltk.word_tokenize em português, verificando antes o tokenizador punkt local."""
+    try:
+        ensure_nltk_resource("punkt_tab")
+    except LookupError:
+        ensure_nltk_resource("punkt") # Versões antigas do NLTK usam o pickle do punkt
+    return nltk.word_tokenize(text, language='portuguese')
+
+
+@lru_cache(maxsize=1)
+def get_stop_words() -> frozenset:
+    """Stopwords em português, carregadas uma única vez por processo."""
+    ensure_nltk_resource("stopwords")
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('portuguese'))
+
+
+@lru_cache(maxsize=1)
+def get_stemmer():
+    """RSLPStemmer compartilhado (o construtor lê as regras do disco)."""
+    ensure_nltk_resource("rslp")
+    from nltk.stem import RSLPStemmer
+    return RSLPStemmer()
+
+
+def _keywords_cache_path() -> Path:
+    return Path(settings.NLP_CACHE_DIR) / "financial_keywords_stems.json"
+
+
+@lru_cache(maxsize=1)
+def get_financial_keyword_stems() -> frozenset:
+    """
+    Radicais (RSLP) das palavras-chave de config/financial_keywords.json, de todas as categorias.
+    Construídos no primeiro uso e gravados em cache no disco, associado ao mtime do JSON: os
+    processos seguintes leem o cache e só refazem o stemming quando o JSON muda.
+    """
+    config_path = settings.BASE_DIR / "config" / "financial_keywords.json"
+    try:
+        source_mtime = os.stat(config_path).st_mtime_ns
+    except OSError as e:
+        settings.logger.error(f"Falha ao carregar ou processar o arquivo de keywords: {e}", exc_info=True)
+        return frozenset()
+
+    cache_path = _keywords_cache_path()
+    try:
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+        if cached.get("source_mtime_ns") == source_mtime:
+            return frozenset(cached["stems"])
+    except (OSError, ValueError, KeyError):
+        pass # Sem cache (ou inválido): reconstrói abaixo
+
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            keywords_by_category = json.load(f)
+        all_keywords = [kw for sublist in keywords_by_category.values() for kw in sublist]
+        stemmer = get_stemmer()
+        stems = frozenset(stemmer.stem(kw) for kw in all_keywords)
+    except LookupError:
+        raise
+    except Exception as e:
+        settings.logger.error(f"Falha ao carregar ou processar o arquivo de keywords: {e}", exc_info=True)
+        return frozenset()
+
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"source_mtime_ns": source_mtime, "stems": sorted(stems)}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        settings.logger.warning(f"Não foi possível gravar o cache de keywords processadas em {cache_path}: {e}")
+
+    settings.logger.info(f"Carregadas e processadas {len(stems)} keywords financeiras únicas.")
+    return stems
+
+
+if __name__ == "__main__":
+    # Provisionamento explícito (única forma de este módulo acessar a rede por padrão)
+    download_nltk_resources()
@@ -0,0 +1,134 @@
+# src/utils/rate_limiter.py
+
+import asyncio
+import time
+from typing import Optional
+
+from config import settings
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa grosseira de tokens (~4 caracteres por token), a mesma usada na compressão."""
+    return len(text or "") // 4
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Identifica erros de cota (HTTP 429 / RESOURCE_EXHAUSTED) das APIs do Google."""
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    description = f"{type(error).__name__} {error}"
+    return "429" in description or "RESOURCE_EXHAUSTED" in description or "ResourceExhausted" in description
+
+
+class TokenBucket:
+    """
+    Balde de tokens com duas dimensões (requisições e tokens por minuto) e rajada (burst).
+
+    A espera não usa lock: cada chamada reserva imediatamente sua parte do orçamento
+    (o saldo pode ficar negativo) e dorme apenas o tempo necessário para cobrir o próprio
+    déficit. Como a reserva acontece sem nenhum `await` no meio, ela é atômica dentro do
+    event loop, e os chamadores esperam em paralelo, na ordem em que reservaram.
+
+    Em respostas 429, `penalize()` reduz a taxa efetiva pela metade e aplica um
+    resfriamento exponencial; `reward()` recupera a taxa aos poucos a cada sucesso.
+    """
+
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: Optional[float] = None,
+                 burst_requests: Optional[float] = None, burst_tokens: Optional[float] = None,
+                 output_tokens_estimate: int = 0):
+        self.name = name
+        self.requests_per_second = requests_per_minute / 60.0
+        self.tokens_per_second = tokens_per_minute / 60.0 if tokens_per_minute else None
+        self.burst_requests = burst_requests or max(1.0, self.requests_per_second)
+        self.burst_tokens = burst_tokens or tokens_per_minute
+        self.output_tokens_estimate = output_tokens_estimate
+
+        self._available_requests = float(self.burst_requests)
+        self._available_tokens = float(self.burst_tokens) if self.burst_tokens else 0.0
+        self._last_refill = time.monotonic()
+        self._rate_factor = 1.0
+        self._cooldown_until = 0.0
+        self._consecutive_rate_limits = 0
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._available_requests = min(
+            self.burst_requests,
+            self._available_requests + elapsed * self.requests_per_second * self._rate_factor
+        )
+        if self.tokens_per_second:
+            self._available_tokens = min(
+                self.burst_tokens,
+                self._available_tokens + elapsed * self.tokens_per_second * self._rate_factor
+            )
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserva uma requisição com `tokens` tokens e retorna quantos segundos é preciso esperar."""
+        now = time.monotonic()
+        self._refill(now)
+
+        self._available_requests -= 1
+        wait = -self._available_requests / (self.requests_per_second * self._rate_factor) if self._available_requests < 0 else 0.0
+
+        if self.tokens_per_second:
+            # Uma requisição maior que a rajada inteira nunca caberia no balde: limita à capacidade
+            self._available_tokens -= min(tokens + self.output_tokens_estimate, self.burst_tokens)
+            if self._available_tokens < 0:
+                wait = max(wait, -self._available_tokens / (self.tokens_per_second * self._rate_factor))
+
+        return max(wait, self._cooldown_until - now)
+
+    async def acquire(self, tokens: int = 0):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            settings.logger.debug(f"Rate limiter '{self.name}': aguardando {wait:.2f}s.")
+            await asyncio.sleep(wait)
+
+    def penalize(self):
+        """Chamado ao receber um 429: reduz a taxa e aplica resfriamento exponencial."""
+        self._consecutive_rate_limits += 1
+        self._rate_factor = max(settings.RATE_LIMIT_MIN_RATE_FACTOR, self._rate_factor * 0.5)
+        backoff = min(
+            settings.RATE_LIMIT_BACKOFF_SECONDS * (2 ** (self._consecutive_rate_limits - 1)),
+            settings.RATE_LIMIT_MAX_BACKOFF_SECONDS
+        )
+        self._cooldown_until = max(self._cooldown_until, time.monotonic() + backoff)
+        settings.logger.warning(
+            f"Rate limiter '{self.name}': 429 recebido. Taxa reduzida para {self._rate_factor:.0%} "
+            f"e pausa de {backoff:.0f}s."
+        )
+
+    def reward(self):
+        """Chamado após um sucesso: recupera a taxa de forma aditiva."""
+        self._consecutive_rate_limits = 0
+        if self._rate_factor < 1.0:
+            self._rate_factor = min(1.0, self._rate_factor + 0.05)
+
+
+_limiters: dict[str, TokenBucket] = {}
+
+
+def get_rate_limiter(name: str) -> TokenBucket:
+    """
+    Retorna o limitador compartilhado do orçamento `name` (ex: "embedding", "compressao",
+    ou o nome de um modelo LLM), criando-o a partir de settings.RATE_LIMITS.
+    Orçamentos sem configuração própria usam settings.DEFAULT_LLM_RATE_LIMIT.
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        config = settings.RATE_LIMITS.get(name, settings.DEFAULT_LLM_RATE_LIMIT)
+        limiter = _limiters[name] = TokenBucket(name, **config)
+    return limiter
+
+
+def get_rate_limiter_for_agent(agent_instance, rate_limit_key: Optional[str] = None) -> Optional[TokenBucket]:
+    """
+    Resolve o orçamento de um agente: a chave explícita, se houver, senão o modelo do agente.
+    Agentes procedurais (sem modelo, ex: BaseAgent) não consomem cota e retornam None.
+    """
+    if rate_limit_key:
+        return get_rate_limiter(rate_limit_key)
+    model = getattr(agent_instance, "model", None)
+    model_name = model if isinstance(model, str) else getattr(model, "model", None)
+    return get_rate_limiter(model_name) if model_name else None